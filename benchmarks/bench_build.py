@@ -0,0 +1,337 @@
+"""Benchmark: how the site build scales, stage by stage, on synthetic atriums.
+
+Usage:
+    python benchmarks/bench_build.py [--groups G] [--solutions S] [--versions V]
+                                     [--scenario NAME ...] [--repeat R]
+                                     [--baseline FILE] [--tolerance T] [--update-baseline]
+
+Each scenario generates an atrium of G groups x S solutions x V versions in a
+temporary directory: "minimal" scripts have metadata only, "typical" ones
+also have Typer commands and a cover image, and every tenth solution points
+to an external source. Every stage then runs in a fresh child process, so
+caches start cold and the reported peak RSS belongs to that stage alone:
+
+    metadata     extract_metadata() on every script
+    commands     extract_typer_commands_with_ast() on every script
+    render       rendering solution.html for every solution
+    copy         copy_files() of every solution directory
+    build        generate_static_site() from scratch
+    rebuild      generate_static_site() again with nothing changed
+    mcp          streaming mcp-tools.json from the build manifest
+
+Builds run offline, without locking or precompression, so only the
+generator is measured. Results are compared with the baseline file (by
+scenario, size and stage); the run fails if a stage's throughput drops, or
+its peak RSS grows, by more than the tolerance. Stages that take less than
+MIN_COMPARED_SECONDS are too noisy to compare and are only reported.
+Baselines are machine specific: refresh them with --update-baseline after
+an intended change.
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "template", ".atrium", "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+import generate_index  # noqa: E402
+from generate_index import SOLUTION_EXTENSIONS, STATIC_DIR  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow, covers are a minimal PNG
+    Image = None
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+MIN_COMPARED_SECONDS = 0.01
+STAGES = ["metadata", "commands", "render", "copy", "build", "rebuild", "mcp"]
+SCENARIOS = {
+    "minimal": {"commands": False, "covers": False, "external_every": 0},
+    "typical": {"commands": True, "covers": True, "external_every": 10},
+}
+
+# A 1x1 PNG, used for covers when Pillow is not installed
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360f8cfc0f01f0005000201e2216fbc0000000049454e44ae426082"
+)
+
+METADATA_TEMPLATE = """# /// script
+# title = "Synthetic {group} {solution}"
+# description = "Generated to benchmark the site build ({group}/{solution}, version {version})"
+# author = "Bench Mark <bench@example.com>"
+# license = "MIT"
+# version = "{version}"
+# keywords = ["benchmark", "{group}", "{solution}"]
+# repository = "https://github.com/example/atrium"
+# requires-python = ">=3.10"
+# dependencies = [
+{dependencies}# ]
+{external}# ///
+"""
+
+COMMANDS_TEMPLATE = """
+import typer
+
+app = typer.Typer()
+
+
+@app.command()
+def greet(name: str = "world", count: int = {index}, loud: bool = False):
+    for _ in range(count):
+        typer.echo(f"Hello, {{name}}!")
+
+
+@app.command()
+def convert(source: str, target: str = typer.Option("out.txt"), scale: float = 1.0):
+    typer.echo(f"{{source}} -> {{target}} x{{scale}}")
+
+
+if __name__ == "__main__":
+    app()
+"""
+
+
+def cover_bytes():
+    if Image is None:
+        return TINY_PNG
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), (40, 90, 160)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_atrium(root, groups, solutions, versions, commands=True, covers=True, external_every=0):
+    """Write a synthetic atrium of ``groups`` x ``solutions`` x ``versions`` scripts under ``root``."""
+    cover = cover_bytes() if covers else None
+    for g in range(groups):
+        group = f"group-{g}"
+        for s in range(solutions):
+            solution = f"solution-{s}"
+            solution_dir = os.path.join(root, group, solution)
+            os.makedirs(solution_dir)
+            index = g * solutions + s
+            external = external_every and index % external_every == 0
+            for v in range(versions):
+                version = f"0.{v}.{index % 7}"
+                dependencies = "".join(f'#     "package-{dep}>=1.{dep}",\n' for dep in range(2 + index % 6))
+                source = METADATA_TEMPLATE.format(
+                    group=group,
+                    solution=solution,
+                    version=version,
+                    dependencies=dependencies,
+                    external=f'# external_source = "https://example.com/{group}/{solution}.py"\n' if external else "",
+                )
+                if commands and not external:
+                    source += COMMANDS_TEMPLATE.format(index=index)
+                with open(os.path.join(solution_dir, f"{version}.py"), "w") as f:
+                    f.write(source)
+            if cover is not None:
+                with open(os.path.join(solution_dir, "cover.png"), "wb") as f:
+                    f.write(cover)
+
+
+def solution_dirs(root):
+    for group in sorted(os.listdir(root)):
+        group_dir = os.path.join(root, group)
+        if group.startswith(".") or not os.path.isdir(group_dir):
+            continue
+        for solution in sorted(os.listdir(group_dir)):
+            yield group, os.path.join(group_dir, solution)
+
+
+def script_paths(root):
+    return [
+        os.path.join(solution_dir, file_name)
+        for _, solution_dir in solution_dirs(root)
+        for file_name in sorted(os.listdir(solution_dir))
+        if file_name.endswith(".py")
+    ]
+
+
+def build_options():
+    return {"compress": False, "offline": True, "lock": False, "prefetch": False}
+
+
+def run_stage(stage, root):
+    """Run one stage in the current process (inside ``root``); returns ``(items, seconds)``."""
+    os.chdir(root)
+    generate_index._SCRIPT_RECORDS.clear()
+    started = time.perf_counter()
+
+    if stage == "metadata":
+        paths = script_paths(".")
+        started = time.perf_counter()
+        for path in paths:
+            generate_index.extract_metadata(path)
+        return len(paths), time.perf_counter() - started
+
+    if stage == "commands":
+        paths = [path for path in script_paths(".") if not generate_index.extract_metadata(path).get("external_source")]
+        generate_index._SCRIPT_RECORDS.clear()
+        started = time.perf_counter()
+        for path in paths:
+            generate_index.extract_typer_commands_with_ast(path)
+        return len(paths), time.perf_counter() - started
+
+    if stage == "render":
+        output = tempfile.mkdtemp(prefix=".render-", dir=".")
+        contexts = []
+        for group, solution_dir in solution_dirs("."):
+            metadata = generate_index.extract_metadata(
+                os.path.join(solution_dir, generate_index.latest_script(solution_dir))
+            )
+            contexts.append(generate_index.solution_page_context(
+                metadata, os.path.basename(solution_dir), metadata["script_source"],
+                metadata.get("cover_image", ""), None, {"css": "site.css", "icons": "icons.svg"}, "../../",
+            ))
+        generate_index.jinja_environment()
+        started = time.perf_counter()
+        for index, context in enumerate(contexts):
+            generate_index.render_to_file("solution.html", os.path.join(output, f"{index}.html"), **context)
+        return len(contexts), time.perf_counter() - started
+
+    if stage == "copy":
+        output = tempfile.mkdtemp(prefix=".copy-", dir=".")
+        solutions = list(solution_dirs("."))
+        for group, solution_dir in solutions:
+            generate_index.copy_files(
+                solution_dir, os.path.join(output, group, os.path.basename(solution_dir)), SOLUTION_EXTENSIONS
+            )
+        return len(solutions), time.perf_counter() - started
+
+    if stage in ("build", "rebuild"):
+        if stage == "rebuild":
+            generate_index.generate_static_site(".", STATIC_DIR, **build_options())
+            generate_index._SCRIPT_RECORDS.clear()  # A new process starts with no records
+            started = time.perf_counter()
+        else:
+            shutil.rmtree(".atrium", ignore_errors=True)
+        generate_index.generate_static_site(".", STATIC_DIR, **build_options())
+        return len(list(solution_dirs("."))), time.perf_counter() - started
+
+    if stage == "mcp":
+        generate_index.generate_static_site(".", STATIC_DIR, **build_options())
+        entries = generate_index.read_build_manifest(STATIC_DIR)
+        next(entries)  # Header
+        started = time.perf_counter()
+        tools = generate_index.McpManifestWriter(STATIC_DIR)
+        count = 0
+        for entry in entries:
+            tools.add(entry["record"])
+            count += 1
+        tools.close()
+        return count, time.perf_counter() - started
+
+    raise ValueError(f"Unknown stage {stage!r}")
+
+
+def measure(stage, root, repeat):
+    """Run ``stage`` ``repeat`` times, each in a fresh child process; returns the best run."""
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", stage, root],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def child(stage, root):
+    items, seconds = run_stage(stage, root)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(json.dumps({"items": items, "seconds": seconds, "peak_rss_mb": round(peak_rss_mb, 1)}))
+
+
+def compare(results, baselines, tolerance):
+    """Regression messages for results worse than their baseline by more than ``tolerance``."""
+    failures = []
+    for key, stages in results.items():
+        for stage, result in stages.items():
+            baseline = baselines.get(key, {}).get(stage)
+            if baseline is None:
+                continue
+            timed = min(result["seconds"], baseline.get("seconds", 0)) >= MIN_COMPARED_SECONDS
+            if timed and result["throughput"] < baseline["throughput"] * (1 - tolerance):
+                failures.append(
+                    f"{key} {stage}: {result['throughput']:.1f}/s, baseline {baseline['throughput']:.1f}/s"
+                )
+            if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+                failures.append(
+                    f"{key} {stage}: peak RSS {result['peak_rss_mb']:.0f} MB, baseline {baseline['peak_rss_mb']:.0f} MB"
+                )
+    return failures
+
+
+def main(argv=None):
+    if argv is None and sys.argv[1:2] == ["--child"]:
+        child(*sys.argv[2:4])
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", type=int, default=4)
+    parser.add_argument("--solutions", type=int, default=25)
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--scenario", choices=list(SCENARIOS), nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--stage", choices=STAGES, nargs="+", default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed regression, as a fraction.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline.")
+    args = parser.parse_args(argv)
+
+    size = f"{args.groups}x{args.solutions}x{args.versions}"
+    results = {}
+    print(f"{'scenario':<20} {'stage':<9} {'items':>6} {'time':>10} {'throughput':>12} {'peak RSS':>10}")
+    for scenario in args.scenario:
+        key = f"{scenario}/{size}"
+        results[key] = {}
+        with tempfile.TemporaryDirectory(prefix="atrium-bench-") as root:
+            make_atrium(root, args.groups, args.solutions, args.versions, **SCENARIOS[scenario])
+            for stage in args.stage:
+                result = measure(stage, root, args.repeat)
+                throughput = result["items"] / result["seconds"] if result["seconds"] else float("inf")
+                results[key][stage] = {
+                    "seconds": round(result["seconds"], 4),
+                    "throughput": round(throughput, 1),
+                    "peak_rss_mb": result["peak_rss_mb"],
+                }
+                print(
+                    f"{key:<20} {stage:<9} {result['items']:>6} {result['seconds'] * 1000:>8.1f}ms"
+                    f" {throughput:>10.1f}/s {result['peak_rss_mb']:>7.1f} MB"
+                )
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    if args.update_baseline:
+        for key, stages in results.items():
+            baselines.setdefault(key, {}).update(stages)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    failures = compare(results, baselines, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if not any(key in baselines for key in results):
+        print(f"No baseline for {size} in {args.baseline}; run with --update-baseline to record one")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Benchmark: MCP server startup for catalogs of 10, 1k and 10k tools.
+
+Usage:
+    python benchmarks/bench_mcp_startup.py [--sizes 10 1000 10000] [--repeat R]
+
+Compares the manifest-driven server (mcp_runtime.ToolServer reading
+mcp-tools.json) with the per-tool code generation it replaced. For the
+generated code, the cost measured is compiling and executing the module with
+a no-op ``mcp.tool()`` decorator, so FastMCP's own per-tool work (building a
+pydantic model from every signature) is not included; the real server was
+slower than reported here.
+
+Manifest-driven startup is measured as loading the manifest and serving the
+first tools/list page, plus resolving a call to the last tool.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "template", ".atrium", "scripts"))
+from generate_index import SITE_CONFIG, build_mcp_manifest, sanitize_function_name, write_json_asset  # noqa: E402
+from mcp_runtime import TOOL_MANIFEST, ToolServer  # noqa: E402
+
+LEGACY_TOOL_TEMPLATE = '''\
+@mcp.tool()
+def {function_name}({args_def}):
+    """
+    {title}
+
+    {description}
+    """
+    import subprocess
+    import threading
+
+    def run_command():
+        args = " {args_cmd}"
+        command = "uv run {script_source}" + args
+        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+        if result.returncode != 0:
+            print("Command failed with error: " + result.stderr)
+        else:
+            print("Command output: " + result.stdout.strip())
+
+    thread = threading.Thread(target=run_command, daemon=True)
+    thread.start()
+    return "Command is running in the background."
+'''
+
+
+class NoOpMCP:
+    """Stand-in for FastMCP whose decorator registers nothing."""
+
+    def tool(self):
+        return lambda function: function
+
+
+def synthetic_solutions(count):
+    """Solution records with one Typer command and three options each."""
+    base_url = SITE_CONFIG["base_url"]
+    for index in range(count):
+        link = f"bench/script-{index}"
+        yield {
+            "name": f"Synthetic Script {index}",
+            "description": f"A generated script used to benchmark MCP startup ({index})",
+            "link": link,
+            "external_source": "",
+            "script_source": f"{base_url}/{link}/0.1.0.py",
+            "commands": [{
+                "command_name": "run",
+                "arguments": [
+                    {"name": "name", "type": "str", "default": "world", "kind": "option"},
+                    {"name": "count", "type": "int", "default": 1, "kind": "option"},
+                    {"name": "verbose", "type": "bool", "default": False, "kind": "option"},
+                ],
+            }],
+        }
+
+
+def legacy_server_source(solutions):
+    """The mcp_server.py the per-tool code generator produced, with its broken docstrings fixed."""
+    tools = []
+    for solution in solutions:
+        for command in solution["commands"]:
+            tools.append(LEGACY_TOOL_TEMPLATE.format(
+                function_name=f"{sanitize_function_name(os.path.basename(solution['link']))}_{command['command_name']}",
+                args_def=", ".join(f"{a['name']}: {a['type']} = {a['default']!r}" for a in command["arguments"]),
+                args_cmd=" ".join(f"--{a['name']} {a['name']}" for a in command["arguments"]),
+                title=solution["name"],
+                description=solution["description"],
+                script_source=solution["script_source"],
+            ))
+    return "import subprocess\n\n" + "\n".join(tools)
+
+
+def best_of(repeat, function):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'tools':>7} {'codegen size':>13} {'manifest size':>14} {'codegen startup':>16} {'manifest startup':>17} {'call lookup':>12}")
+    for size in args.sizes:
+        solutions = list(synthetic_solutions(size))
+        legacy_source = legacy_server_source(solutions)
+
+        def legacy_startup():
+            exec(compile(legacy_source, "mcp_server.py", "exec"), {"mcp": NoOpMCP()})
+
+        with tempfile.TemporaryDirectory() as static_dir:
+            write_json_asset(static_dir, TOOL_MANIFEST, build_mcp_manifest(solutions))
+            manifest_path = os.path.join(static_dir, TOOL_MANIFEST)
+            last_tool = f"{sanitize_function_name(f'script-{size - 1}')}_run"
+
+            def manifest_startup():
+                ToolServer(manifest_path).list_tools()
+
+            server = ToolServer(manifest_path)
+            server.list_tools()
+            lookup = best_of(args.repeat, lambda: server.tool_command(last_tool, {"name": "x"}))
+            print(
+                f"{size:>7} {len(legacy_source.encode()) / 1024:>11.0f}KB"
+                f" {os.path.getsize(manifest_path) / 1024:>12.0f}KB"
+                f" {best_of(args.repeat, legacy_startup) * 1000:>14.1f}ms"
+                f" {best_of(args.repeat, manifest_startup) * 1000:>15.1f}ms"
+                f" {lookup * 1e6:>10.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Micro-benchmark: tomllib-based parse_metadata against the legacy line parser.
+
+Usage:
+    python benchmarks/bench_metadata.py [--scripts N] [--repeat R]
+
+Both parsers run over the same synthetic PEP 723 headers. The legacy parser
+prints on every metadata line, so its output is sent to /dev/null (the real
+build wrote it to the console, which is slower still).
+"""
+
+import argparse
+import contextlib
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "template", ".atrium", "scripts"))
+from generate_index import BASE_DIR, SITE_CONFIG, parse_metadata  # noqa: E402
+
+SCRIPT_TEMPLATE = """# /// script
+# title = "Synthetic Script {index}"
+# description = "A generated script used to benchmark metadata parsing ({index})"
+# author = "Bench Mark <bench@example.com>"
+# license = "MIT"
+# version = "0.{index}.0"
+# keywords = ["benchmark", "synthetic", "script-{index}"]
+# repository = "https://github.com/example/atrium"
+# requires-python = ">=3.10"
+# dependencies = [
+{dependencies}# ]
+# ///
+
+import typer
+
+app = typer.Typer()
+
+
+@app.command()
+def run(name: str = "world", count: int = {index}):
+    for _ in range(count):
+        typer.echo(f"Hello, {{name}}!")
+
+
+if __name__ == "__main__":
+    app()
+"""
+
+
+def synthetic_sources(count):
+    """Yield (path, source) pairs with 3-12 dependencies each."""
+    for index in range(count):
+        dependencies = "".join(
+            f'#     "package-{index}-{dep}>=1.{dep}",\n' for dep in range(3 + index % 10)
+        )
+        path = os.path.join(BASE_DIR, "bench", f"script-{index}", "0.1.0.py")
+        yield path, SCRIPT_TEMPLATE.format(index=index, dependencies=dependencies)
+
+
+def legacy_parse_metadata(content, file_path):
+    """The line-by-line parser that tomllib-based parse_metadata replaced, kept for comparison."""
+    metadata = {}
+
+    # Match metadata block between "# /// script" and "# ///"
+    match = re.search(r"# /// script\n(.*?)# ///", content, re.DOTALL)
+    if match:
+        lines = match.group(1).strip().splitlines()
+        key, value = None, None
+
+        for line_no, line in enumerate(lines):
+            line = line.strip()
+            print(f"Line {line_no + 1}: {line}")  # Debugging: Show the raw line being processed
+
+            # Check for key-value pairs (with =)
+            if "=" in line and not (key == "dependencies" and isinstance(value, list)):
+                # Save the previous key-value pair
+                if key is not None and value is not None:
+                    # Remove quotes from string values before saving
+                    if isinstance(value, str):
+                        value = value.strip('"').strip("'")
+                    print(f"Saving metadata: {key} = {value}")  # Debugging
+                    metadata[key] = value
+
+                # Parse the new key-value pair
+                key, value = map(str.strip, line.split("=", 1))
+                key = key.lstrip("# ").strip()
+                value = value.strip()
+
+                print(f"New key detected: {key}, Initial value: {value}")  # Debugging
+
+                # Handle special case for dependencies
+                if key == "dependencies":
+                    if value.startswith("[") and not value.endswith("]"):
+                        # Start of a multiline dependencies list
+                        value = []
+                        print(f"Start of multiline list for {key}")  # Debugging
+                    elif value.startswith("[") and value.endswith("]"):
+                        # Inline dependencies list
+                        try:
+                            value = eval(value)  # Parse inline list
+                            print(f"Parsed inline dependencies for {key}: {value}")  # Debugging
+                        except Exception as e:
+                            print(f"Error parsing dependencies list for {key}: {e}")  # Debugging
+                            value = []
+                elif value.startswith("[") and value.endswith("]"):
+                    # Handle general inline lists
+                    try:
+                        value = eval(value)  # Parse inline list
+                        print(f"Parsed inline list for {key}: {value}")  # Debugging
+                    except Exception as e:
+                        print(f"Error parsing list for {key}: {e}")  # Debugging
+                        value = value.strip('"').strip("'")
+                elif value.startswith("[") and not value.endswith("]"):
+                    # Start of a multiline list for general keys
+                    value = []
+                    print(f"Start of multiline list for {key}")  # Debugging
+            elif key == "dependencies" and isinstance(value, list):
+                # Continuation of a multiline dependencies list
+                line_content = line.lstrip("# ").strip("[],").strip('"').strip("'")
+                if line_content:
+                    value.append(line_content)
+                    print(f"Appending to {key}: {line_content}")  # Debugging
+                if line.endswith("]"):  # End of multiline dependencies list
+                    print(f"Completed multiline dependencies list for {key}: {value}")  # Debugging
+                    metadata[key] = value
+                    key, value = None, None
+            elif key and isinstance(value, list) and line.startswith("#"):
+                # Continuation of a general multiline list
+                line_content = line.lstrip("# ").strip("[],").strip('"').strip("'")
+                if line_content:
+                    value.append(line_content)
+                    print(f"Appending to {key}: {line_content}")  # Debugging
+                if line.endswith("]"):  # End of multiline list
+                    print(f"Completed multiline list for {key}: {value}")  # Debugging
+                    metadata[key] = value
+                    key, value = None, None
+            elif key and not line.startswith("#"):
+                # End of a block or key-value pair
+                # Remove quotes from string values before saving
+                if isinstance(value, str):
+                    value = value.strip('"').strip("'")
+                print(f"Saving key: {key} with value: {value}")  # Debugging
+                metadata[key] = value
+                key, value = None, None
+
+        # Final key-value pair
+        if key and value is not None:
+            # Remove quotes from string values before saving
+            if isinstance(value, str):
+                value = value.strip('"').strip("'")
+            print(f"Final metadata save: {key} = {value}")  # Debugging
+            metadata[key] = value
+
+        # Handle script source links
+        if "external_source" in metadata:
+            # For external scripts, use the original source
+            metadata["script_source"] = metadata["external_source"]
+        else:
+            # For local scripts, use the GitHub Pages URL
+            relative_path = os.path.relpath(file_path, BASE_DIR)
+            metadata["script_source"] = f"{SITE_CONFIG['base_url']}/{relative_path}"
+
+        # Handle cover image
+        if not metadata.get("cover_image"):
+            # Check for local cover.png
+            cover_path = os.path.join(os.path.dirname(file_path), "cover.png")
+            if os.path.exists(cover_path):
+                relative_cover = os.path.relpath(cover_path, BASE_DIR)
+                metadata["cover_image"] = f"{SITE_CONFIG['base_url']}/{relative_cover}"
+
+    print(f"Metadata extracted from {file_path}: {metadata}")
+    return metadata
+
+
+def time_parser(parser, sources, repeat):
+    """Return the best wall time in seconds over ``repeat`` passes."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path, source in sources:
+            parser(source, path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scripts", type=int, default=2000, help="Number of synthetic scripts.")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes per parser; the best is reported.")
+    args = parser.parse_args()
+
+    sources = list(synthetic_sources(args.scripts))
+
+    # Both parsers must agree on the keys the legacy parser understood
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for path, source in sources[:50]:
+            expected = legacy_parse_metadata(source, path)
+            actual = parse_metadata(source, path)
+            for key, value in expected.items():
+                if actual.get(key) != value:
+                    sys.exit(f"Mismatch for {key!r} in {path}: {actual.get(key)!r} != {value!r}")
+
+        legacy = time_parser(legacy_parse_metadata, sources, args.repeat)
+    current = time_parser(parse_metadata, sources, args.repeat)
+
+    for name, seconds in (("legacy", legacy), ("tomllib", current)):
+        per_script = seconds / len(sources) * 1e6
+        print(f"{name:>8}: {seconds * 1e3:8.1f} ms total, {per_script:7.1f} us/script")
+    print(f" speedup: {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
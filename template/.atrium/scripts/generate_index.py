@@ -2,21 +2,1121 @@ import sys
 import os
 import shutil
 import re
-from jinja2 import Template
+import json
+import hashlib
+import argparse
+import base64
+import gzip
+import html
+import io
+import itertools
+import logging
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.parse
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache, pass_context
+from packaging.version import InvalidVersion, Version
 import importlib.util
 from typer.main import get_command
 import ast
 from urllib.request import urlopen
 
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib
+
+try:
+    from PIL import Image, ImageFilter, features
+except ImportError:  # Optional: without Pillow, covers are published unchanged
+    Image = None
+
+try:
+    import pygments
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import PythonLexer
+except ImportError:  # Optional: without Pygments, source pages show plain numbered code
+    pygments = None
+
+try:
+    import brotli
+except ImportError:  # Optional: without brotli, only .gz siblings are written
+    brotli = None
+
 # Import site configuration
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from site_config import SITE_CONFIG
+from mcp_runtime import LOCK_SUFFIX, TOOL_MANIFEST, IntegrityError, ScriptCache
+import preview
 
 # Base directories
 BASE_DIR = "."
 STATIC_DIR = ".atrium/docs"  # Output directory for static site
 COVER_IMAGE = "cover.png"
-MCP_SERVER_PATH = os.path.join(STATIC_DIR, "mcp_server.py")
+# The MCP server and its runtime are published unchanged; only TOOL_MANIFEST
+# (from mcp_runtime) is generated per build
+MCP_SERVER_FILES = ["mcp_server.py", "mcp_runtime.py"]
+CACHE_DIR = ".atrium/cache"  # Build caches that are not published
+BUILD_MANIFEST = ".build-manifest.json"  # Per-solution content hashes, kept inside STATIC_DIR
+SCRIPT_RECORD_CACHE_SIZE = 4096  # ScriptRecords kept in memory between loads (least recently used are dropped)
+PIPELINE_WINDOW = 4  # Solutions or files in flight per worker between streaming build stages
+SOLUTION_EXTENSIONS = [".py", ".png"]  # Files copied verbatim into each solution's output
+
+# PEP 723 inline metadata block, as in the specification's reference implementation
+METADATA_BLOCK_RE = re.compile(
+    r"(?m)^# /// script$\s(?P<content>(^#(| .*)$\s)+)^# ///$"
+)
+
+# Client-side search: a prebuilt inverted index queried by a Web Worker
+SEARCH_INDEX = "search-index.json"
+SEARCH_FIELD_WEIGHTS = {
+    "name": 5,
+    "keywords": 3,
+    "author": 2,
+    "dependencies": 2,
+    "description": 1,
+}
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+")  # Letters and digits; must match tokenize() in the worker
+
+# Index page modes: "full" renders every card; "virtual" renders the first screen
+# and windows the rest from catalog.json in the browser
+INDEX_MODES = ["full", "virtual", "groups"]
+INDEX_FIRST_SCREEN = 24  # Cards rendered server-side in virtual mode, for crawlers and first paint
+CATALOG = "catalog.json"
+SITEMAP = "sitemap.xml"
+SITEMAP_MAX_URLS = 50000  # Per file, the limit of the sitemaps.org protocol
+SITEMAP_FILE_RE = re.compile(r"^sitemap(-[0-9a-f]{12}(-\d+)?|-root)?\.xml$|^sitemap\.txt$")  # Incl. the old text format
+# width, height and lqip describe the thumbnail and come from the solution's cover_images
+CATALOG_FIELDS = ["name", "description", "link", "thumbnail", "width", "height", "lqip", "author", "version"]
+INDEX_CARD_FIELDS = ["name", "description", "link", "cover", "cover_images", "author", "version"]
+
+# Cover images are downscaled to these widths (never upscaled) in each supported
+# modern format plus PNG, and cached in CACHE_DIR/images by source hash
+COVER_WIDTHS = [400, 800, 1600]
+COVER_FORMATS = ["avif", "webp"]  # Used when the installed Pillow can encode them
+COVER_QUALITY = 70
+LQIP_WIDTH = 16  # Width of the blurred placeholder inlined into pages
+
+# Shared static files are published under _assets/ with content-hashed names; the
+# underscore keeps them apart from solution groups, which are published by name
+ASSETS_DIR = "_assets"
+LEGACY_ASSETS_DIRS = ["assets"]  # Used by earlier builds; their fingerprinted files are removed
+ASSET_FILE_RE = re.compile(r"^[\w-]+\.[0-9a-f]{12}\.\w+(\.gz|\.br)?$")  # <stem>.<hash><ext>, as written below
+# Groups and solutions are published under their directory names, so these names
+# (and their families of shards) are reserved for the files the site generates
+RESERVED_NAMES = {
+    ASSETS_DIR, "index.html", CATALOG, SEARCH_INDEX, SITEMAP, TOOL_MANIFEST, BUILD_MANIFEST, *MCP_SERVER_FILES,
+}
+RESERVED_NAME_RE = re.compile(r"^(search-index|catalog|sitemap|mcp).*\.(json|xml|txt|py)$")
+# Whitespace inside these elements is significant (inline scripts may hold template
+# literals) and survives HTML minification
+PRESERVE_WHITESPACE_RE = re.compile(r"<(pre|textarea|script)\b.*?</\1>", re.DOTALL | re.IGNORECASE)
+
+# Build-time highlighting for source.html, cached in CACHE_DIR/highlight by source hash
+HIGHLIGHT_STYLE = "monokai"
+
+# Lockfiles resolved with `uv lock --script`, cached in CACHE_DIR/locks by dependency hash
+# and published next to each script as <script>.py.lock (LOCK_SUFFIX)
+LOCK_TIMEOUT = 300
+LOCK_RETRY_AFTER = 3600  # Seconds a failed lock is remembered before uv runs again (--force retries at once)
+
+# Precompressed .gz/.br siblings for static hosts that serve them directly
+COMPRESSIBLE_EXTENSIONS = [".html", ".css", ".js", ".json", ".svg", ".txt", ".xml", ".py"]
+COMPRESSED_EXTENSIONS = [".gz", ".br"]
+COMPRESSION_MIN_SIZE = 256  # Smaller files are not worth a compressed copy
+
+# MCP tool input schemas: JSON Schema types for Typer annotations; anything else is a string
+SCHEMA_TYPES = {"str": "string", "Path": "string", "int": "integer", "float": "number", "bool": "boolean"}
+OPTIONAL_TYPE_RE = re.compile(r"^(?:typing\.)?Optional\[(.*)\]$|^(.*?)\s*\|\s*None$")
+LIST_TYPE_RE = re.compile(r"^(?:typing\.)?(?:List|list|Sequence|Tuple|tuple)\[(.*?)(?:,\s*\.\.\.)?\]$")
+
+logger = logging.getLogger("atrium")
+
+# Stylesheets, scoped to their page by a class on <body> and combined into one
+# minified, fingerprinted file by site_stylesheet()
+COMMON_CSS = """
+.icon {
+    width: 1em;
+    height: 1em;
+    vertical-align: -0.125em;
+    fill: none;
+    stroke: currentColor;
+    stroke-width: 2;
+    stroke-linecap: round;
+    stroke-linejoin: round;
+}
+"""
+
+INDEX_CSS = """
+:root {
+    --primary-color: #2563eb;
+    --secondary-color: #1d4ed8;
+    --background-color: #f8fafc;
+    --card-background: #ffffff;
+    --text-primary: #1e293b;
+    --text-secondary: #64748b;
+    --border-color: #e2e8f0;
+    --hover-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1);
+}
+
+@media (prefers-color-scheme: dark) {
+    :root {
+        --primary-color: #3b82f6;
+        --secondary-color: #60a5fa;
+        --background-color: #0f172a;
+        --card-background: #1e293b;
+        --text-primary: #f1f5f9;
+        --text-secondary: #94a3b8;
+        --border-color: #334155;
+    }
+}
+
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Oxygen-Sans, Ubuntu, Cantarell, sans-serif;
+    background-color: var(--background-color);
+    color: var(--text-primary);
+    line-height: 1.6;
+}
+
+.header {
+    background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
+    padding: 2.5rem 1rem;
+    text-align: center;
+    color: white;
+}
+
+.header h1 {
+    font-size: 2.5rem;
+    margin-bottom: 1rem;
+}
+
+.header p {
+    font-size: 1.2rem;
+    opacity: 0.9;
+    max-width: 600px;
+    margin: 0 auto;
+}
+
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    padding: 2rem;
+}
+
+.search-container {
+    margin: 1rem auto 2rem;
+    max-width: 600px;
+}
+
+.search-box {
+    width: 100%;
+    padding: 0.75rem 1rem;
+    border: 2px solid var(--border-color);
+    border-radius: 0.5rem;
+    font-size: 1rem;
+    background-color: var(--card-background);
+    color: var(--text-primary);
+}
+
+.grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
+    gap: 2rem;
+    padding: 1rem;
+}
+
+.card {
+    background: var(--card-background);
+    border-radius: 1rem;
+    overflow: hidden;
+    border: 1px solid var(--border-color);
+    transition: transform 0.2s ease, box-shadow 0.2s ease;
+}
+
+.card:hover {
+    transform: translateY(-5px);
+    box-shadow: var(--hover-shadow);
+}
+
+.card-image {
+    width: 100%;
+    height: 200px;
+    object-fit: cover;
+}
+
+.card-content {
+    padding: 1.5rem;
+}
+
+.card-title {
+    font-size: 1.25rem;
+    color: var(--text-primary);
+    margin-bottom: 0.5rem;
+    text-decoration: none;
+}
+
+.card-title:hover {
+    color: var(--primary-color);
+}
+
+.card-metadata {
+    font-size: 0.9rem;
+    color: var(--text-secondary);
+    margin-bottom: 1rem;
+}
+
+.card-metadata .icon {
+    margin-right: 0.5rem;
+}
+
+.card-description {
+    color: var(--text-secondary);
+    margin-bottom: 1rem;
+    font-size: 0.95rem;
+}
+
+.card-source {
+    font-size: 0.85rem;
+    padding: 0.5rem;
+    background-color: var(--background-color);
+    border-radius: 0.5rem;
+    margin-top: 1rem;
+}
+
+.card-source a {
+    color: var(--primary-color);
+    text-decoration: none;
+}
+
+.card-source a:hover {
+    text-decoration: underline;
+}
+
+@media (max-width: 768px) {
+    .grid {
+        grid-template-columns: 1fr;
+    }
+
+    .header h1 {
+        font-size: 2rem;
+    }
+
+    .header p {
+        font-size: 1rem;
+    }
+}
+
+.header-banner {
+    background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
+    padding: 2rem;
+    color: white;
+    position: relative;
+}
+
+.header-content {
+    max-width: 1200px;
+    margin: 0 auto;
+    display: flex;
+    align-items: flex-start;
+    gap: 2rem;
+}
+
+.header-logo {
+    flex-shrink: 0;
+    text-decoration: none;
+}
+
+.logo-image {
+    height: 80px;
+    width: auto;
+}
+
+.header-text {
+    flex-grow: 1;
+}
+
+.header-title {
+    font-size: 2.5rem;
+    margin-bottom: 0.5rem;
+    font-weight: 800;
+}
+
+.header-subtitle {
+    font-size: 1.2rem;
+    opacity: 0.9;
+    line-height: 1.4;
+}
+
+.stat-item {
+    text-align: center;
+}
+
+.stat-value {
+    font-size: 2rem;
+    font-weight: bold;
+    margin-bottom: 0.5rem;
+}
+
+.stat-label {
+    font-size: 0.9rem;
+    opacity: 0.8;
+}
+
+.header-logo {
+    display: block;
+    margin-bottom: 1rem;
+}
+
+.logo-image {
+    height: 80px;
+    width: auto;
+    margin: 0 auto;
+}
+
+.virtual-viewport {
+    position: relative;
+}
+
+.virtual-viewport .grid {
+    will-change: transform;
+}
+
+.virtual-viewport .card {
+    height: 460px;
+}
+
+.virtual-viewport .card-description {
+    display: -webkit-box;
+    -webkit-line-clamp: 3;
+    -webkit-box-orient: vertical;
+    overflow: hidden;
+}
+
+.breadcrumbs {
+    color: var(--text-secondary);
+    margin-bottom: 1rem;
+}
+
+.breadcrumbs a {
+    color: var(--primary-color);
+    text-decoration: none;
+}
+
+.breadcrumbs a:hover {
+    text-decoration: underline;
+}
+
+.group-list {
+    display: grid;
+    grid-template-columns: repeat(auto-fill, minmax(220px, 1fr));
+    gap: 1rem;
+    padding: 1rem;
+}
+
+.group-list[hidden],
+.group-card[hidden] {
+    display: none;
+}
+
+.group-card {
+    display: block;
+    background: var(--card-background);
+    border: 1px solid var(--border-color);
+    border-radius: 1rem;
+    padding: 1.25rem 1.5rem;
+    color: var(--text-primary);
+    text-decoration: none;
+    transition: transform 0.2s ease, box-shadow 0.2s ease;
+}
+
+.group-card:hover {
+    transform: translateY(-3px);
+    box-shadow: var(--hover-shadow);
+    color: var(--primary-color);
+}
+
+.group-card h2 {
+    font-size: 1.15rem;
+}
+
+.group-count {
+    color: var(--text-secondary);
+    font-size: 0.9rem;
+}
+"""
+
+SOLUTION_CSS = """
+:root {
+    --primary-color: #2563eb;
+    --secondary-color: #1d4ed8;
+    --background-color: #f8fafc;
+    --card-background: #ffffff;
+    --text-primary: #1e293b;
+    --text-secondary: #64748b;
+    --border-color: #e2e8f0;
+    --code-background: #f1f5f9;
+    --tag-background: #e2e8f0;
+    --hover-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1);
+}
+
+@media (prefers-color-scheme: dark) {
+    :root {
+        --primary-color: #3b82f6;
+        --secondary-color: #60a5fa;
+        --background-color: #0f172a;
+        --card-background: #1e293b;
+        --text-primary: #f1f5f9;
+        --text-secondary: #94a3b8;
+        --border-color: #334155;
+        --code-background: #1e293b;
+        --tag-background: #334155;
+    }
+}
+
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
+    background-color: var(--background-color);
+    color: var(--text-primary);
+    line-height: 1.6;
+}
+
+.header h1 {
+    font-size: 2.5rem;
+    margin-bottom: 1rem;
+}
+
+.nav-bar {
+    background-color: var(--card-background);
+    padding: 1rem;
+    border-bottom: 1px solid var(--border-color);
+    position: sticky;
+    top: 0;
+    z-index: 100;
+}
+
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    padding: 2rem;
+}
+
+.back-link {
+    display: inline-flex;
+    align-items: center;
+    color: var(--text-secondary);
+    text-decoration: none;
+    gap: 0.5rem;
+    font-size: 0.95rem;
+}
+
+.back-link:hover {
+    color: var(--primary-color);
+}
+
+.script-section {
+    background: var(--card-background);
+    border-radius: 1rem;
+    padding: 2rem;
+    margin: 2rem 0;
+    border: 1px solid var(--border-color);
+}
+
+.script-header {
+    margin-bottom: 2rem;
+}
+
+.script-title {
+    font-size: 2rem;
+    margin-bottom: 0.5rem;
+}
+
+.metadata-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
+    gap: 1.5rem;
+    margin: 2rem 0;
+    padding: 1.5rem;
+    background: var(--code-background);
+    border-radius: 0.5rem;
+}
+
+.metadata-item {
+    display: flex;
+    flex-direction: column;
+    gap: 0.5rem;
+}
+
+.metadata-label {
+    font-size: 0.875rem;
+    color: var(--text-secondary);
+    display: flex;
+    align-items: center;
+    gap: 0.5rem;
+}
+
+.metadata-value {
+    font-size: 1rem;
+    color: var(--text-primary);
+    word-break: break-word;
+}
+
+.tags-container {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 0.5rem;
+    margin-top: 0.5rem;
+}
+
+.tag {
+    background: var(--tag-background);
+    padding: 0.25rem 0.75rem;
+    border-radius: 1rem;
+    font-size: 0.875rem;
+    color: var(--text-primary);
+}
+
+.command-section {
+    background: var(--code-background);
+    padding: 1.5rem;
+    border-radius: 0.5rem;
+    margin: 2rem 0;
+    position: relative;
+}
+
+.command-title {
+    font-size: 1.2rem;
+    margin-bottom: 1rem;
+    color: var(--text-primary);
+}
+
+.command-box {
+    background: rgba(0, 0, 0, 0.1);
+    padding: 1rem;
+    border-radius: 0.5rem;
+    font-family: 'Menlo', 'Monaco', 'Courier New', monospace;
+    margin-bottom: 0.5rem;
+    overflow-x: auto;
+}
+
+.copy-button {
+    position: absolute;
+    top: 1rem;
+    right: 1rem;
+    background: var(--primary-color);
+    color: white;
+    border: none;
+    padding: 0.5rem 1rem;
+    border-radius: 0.5rem;
+    cursor: pointer;
+    display: flex;
+    align-items: center;
+    gap: 0.5rem;
+    font-size: 0.9rem;
+}
+
+.copy-button:hover {
+    background: var(--secondary-color);
+}
+
+.version-notice {
+    background: var(--code-background);
+    border-left: 4px solid var(--primary-color);
+    padding: 0.75rem 1rem;
+    border-radius: 0.5rem;
+    margin-bottom: 1.5rem;
+}
+
+.version-notice a,
+.dependency-item a {
+    color: var(--primary-color);
+}
+
+.description-section {
+    margin: 2rem 0;
+}
+
+.description-content {
+    color: var(--text-secondary);
+    font-size: 1.1rem;
+    line-height: 1.8;
+}
+
+.dependencies-section {
+    margin: 2rem 0;
+}
+
+.dependencies-list {
+    list-style: none;
+    display: grid;
+    grid-template-columns: repeat(auto-fill, minmax(200px, 1fr));
+    gap: 1rem;
+    margin-top: 1rem;
+}
+
+.dependency-item {
+    background: var(--code-background);
+    padding: 0.75rem 1rem;
+    border-radius: 0.5rem;
+    font-family: monospace;
+    font-size: 0.9rem;
+}
+
+.lock-note {
+    color: var(--text-secondary);
+    margin-top: 0.5rem;
+}
+
+.lock-note a {
+    color: var(--primary-color);
+}
+
+.links-section {
+    margin-top: 3rem;
+    padding-top: 2rem;
+    border-top: 1px solid var(--border-color);
+    display: flex;
+    gap: 2rem;
+    flex-wrap: wrap;
+}
+
+.link-item {
+    display: inline-flex;
+    align-items: center;
+    gap: 0.5rem;
+    color: var(--primary-color);
+    text-decoration: none;
+    font-weight: 500;
+}
+
+.link-item:hover {
+    text-decoration: underline;
+}
+
+
+
+        .metadata-section {
+    background: var(--card-background);
+    border-radius: 1rem;
+    padding: 2rem;
+    margin: 2rem 0;
+    border: 1px solid var(--border-color);
+}
+
+.metadata-title {
+    font-size: 1.2rem;
+    margin-bottom: 1.5rem;
+    color: var(--text-primary);
+}
+
+.metadata-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
+    gap: 1.5rem;
+}
+
+.metadata-item {
+    padding: 1rem;
+    background: var(--code-background);
+    border-radius: 0.5rem;
+}
+
+.metadata-label {
+    font-size: 0.875rem;
+    color: var(--text-secondary);
+    margin-bottom: 0.5rem;
+    display: flex;
+    align-items: center;
+    gap: 0.5rem;
+}
+
+.metadata-value {
+    font-size: 1rem;
+    color: var(--text-primary);
+    word-break: break-word;
+}
+
+.tags-container {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 0.5rem;
+}
+
+.tag {
+    background: var(--tag-background);
+    padding: 0.25rem 0.75rem;
+    border-radius: 1rem;
+    font-size: 0.875rem;
+    color: var(--text-primary);
+}
+
+.cover-image-container {
+    margin: 2rem 0;
+    width: 100%;
+    max-width: 800px;
+    margin-left: auto;
+    margin-right: auto;
+}
+
+.card-image {
+    width: 100%;
+    height: auto;
+    border-radius: 0.5rem;
+    box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
+    display: block;  /* Ensure image is block-level */
+    margin: 0 auto;  /* Center the image */
+}
+
+@media (prefers-color-scheme: dark) {
+    .card-image {
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.2), 0 2px 4px -1px rgba(0, 0, 0, 0.1);
+    }
+}        
+
+.logo-image {
+    height: 80px;
+    width: auto;
+    margin: 0 auto;
+}
+
+.header {
+    background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
+    padding: 1rem;
+    color: white;
+    position: relative;
+}
+
+.header-content {
+    max-width: 1200px;
+    margin: 0 auto;
+    display: flex;
+    align-items: center;
+    gap: 2rem;
+}
+
+.header-logo {
+    flex-shrink: 0;
+}
+
+.logo-image {
+    height: 80px;
+    width: auto;
+    display: block;
+}
+
+.header-text {
+    flex-grow: 1;
+    text-align: left;
+}
+
+.header-title {
+    font-size: 2.5rem;
+    margin-bottom: 0;
+    font-weight: 800;
+}    
+
+.header {
+    background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
+    padding: 2rem;
+    color: white;
+    position: relative;
+}
+
+.solution-header-content {
+    max-width: 1200px;
+    margin: 0 auto;
+    display: flex;
+    align-items: flex-start;
+    gap: 2rem;
+}
+
+.solution-header-logo {
+    flex-shrink: 0;
+}
+
+.solution-header-text {
+    flex-grow: 1;
+}
+
+.solution-title {
+    font-size: 2.5rem;
+    margin-bottom: 0.5rem;
+    font-weight: 800;
+}
+
+.solution-subtitle {
+    font-size: 1.2rem;
+    opacity: 0.9;
+    line-height: 1.4;
+    max-width: 800px;
+}
+
+@media (max-width: 768px) {
+    .header-banner,
+    .header {
+        padding: 1.5rem;
+    }
+
+    .header-content,
+    .solution-header-content {
+        flex-direction: column;
+        align-items: center;
+        text-align: center;
+    }
+
+    .header-text,
+    .solution-header-text {
+        text-align: center;
+    }
+
+    .header-title,
+    .solution-title {
+        font-size: 2rem;
+    }
+
+    .header-subtitle,
+    .solution-subtitle {
+        font-size: 1.1rem;
+    }
+
+    .logo-image {
+        height: 60px;
+    }
+}
+"""
+
+SOURCE_CSS = """
+:root {
+    --primary-color: #2563eb;
+    --secondary-color: #1d4ed8;
+    --background-color: #f8fafc;
+    --card-background: #ffffff;
+    --text-primary: #1e293b;
+    --text-secondary: #64748b;
+    --border-color: #e2e8f0;
+    --code-background: #1e1e1e;
+}
+
+@media (prefers-color-scheme: dark) {
+    :root {
+        --primary-color: #3b82f6;
+        --secondary-color: #60a5fa;
+        --background-color: #0f172a;
+        --card-background: #1e293b;
+        --text-primary: #f1f5f9;
+        --text-secondary: #94a3b8;
+        --border-color: #334155;
+        --code-background: #1e1e1e;
+    }
+}
+
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
+    background-color: var(--background-color);
+    color: var(--text-primary);
+    line-height: 1.6;
+}
+
+.header {
+    background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
+    padding: 2rem;
+    color: white;
+}
+
+.header-content {
+    max-width: 1200px;
+    margin: 0 auto;
+    display: flex;
+    align-items: flex-start;
+    gap: 2rem;
+}
+
+.header-logo {
+    flex-shrink: 0;
+    text-decoration: none;
+}
+
+.logo-image {
+    height: 80px;
+    width: auto;
+}
+
+.header-text {
+    flex-grow: 1;
+}
+
+.header-title {
+    font-size: 2rem;
+    margin-bottom: 0.5rem;
+    font-weight: 800;
+}
+
+.nav-bar {
+    background-color: var(--card-background);
+    padding: 1rem;
+    border-bottom: 1px solid var(--border-color);
+    position: sticky;
+    top: 0;
+    z-index: 100;
+}
+
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    padding: 2rem;
+}
+
+.back-link {
+    display: inline-flex;
+    align-items: center;
+    color: var(--text-secondary);
+    text-decoration: none;
+    gap: 0.5rem;
+    font-size: 0.95rem;
+}
+
+.back-link:hover {
+    color: var(--primary-color);
+}
+
+.source-container {
+    background: var(--card-background);
+    border-radius: 1rem;
+    margin: 2rem 0;
+    overflow: hidden;
+    border: 1px solid var(--border-color);
+}
+
+.source-header {
+    padding: 1rem;
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    border-bottom: 1px solid var(--border-color);
+}
+
+.source-title {
+    font-size: 1.2rem;
+    font-weight: 600;
+}
+
+.download-button {
+    background: var(--primary-color);
+    color: white;
+    border: none;
+    padding: 0.5rem 1rem;
+    border-radius: 0.5rem;
+    cursor: pointer;
+    display: flex;
+    align-items: center;
+    gap: 0.5rem;
+    font-size: 0.9rem;
+    text-decoration: none;
+}
+
+.download-button:hover {
+    background: var(--secondary-color);
+}
+
+.highlight pre {
+    margin: 0;
+    padding: 1rem 0;
+    font-family: 'Menlo', 'Monaco', 'Courier New', monospace;
+    font-size: 0.9rem;
+    line-height: 1.5;
+}
+
+.highlighttable {
+    border-collapse: collapse;
+    width: 100%;
+}
+
+.highlighttable td.code {
+    width: 100%;
+    padding-left: 1rem;
+}
+
+td.linenos {
+    user-select: none;
+    text-align: right;
+    border-right: 1px solid #3e3d32;
+}
+
+td.linenos a {
+    color: #75715e;
+    text-decoration: none;
+    padding: 0 0.75rem;
+}
+
+.code-wrapper {
+    max-height: 800px;
+    overflow-y: auto;
+    background: var(--code-background);
+    color: #f8f8f2;
+}
+
+@media (max-width: 768px) {
+    .header-content {
+        flex-direction: column;
+        align-items: center;
+        text-align: center;
+    }
+
+    .logo-image {
+        height: 60px;
+    }
+
+    .header-title {
+        font-size: 1.5rem;
+    }
+
+    .container {
+        padding: 1rem;
+    }
+}
+"""
+
+# Icons used by the templates, published as one SVG sprite (24x24, stroked)
+ICONS = {
+    "user": '<circle cx="12" cy="8" r="4"/><path d="M4 21c0-4 4-6 8-6s8 2 8 6"/>',
+    "code-branch": '<circle cx="6" cy="5" r="2"/><circle cx="6" cy="19" r="2"/><circle cx="18" cy="6" r="2"/><path d="M6 7v10M18 8c0 6-12 3-12 9"/>',
+    "arrow-left": '<path d="M19 12H5M12 19l-7-7 7-7"/>',
+    "balance-scale": '<path d="M12 3v18M6 21h12M4 7h16M7 7l-3 7a3 3 0 0 0 6 0zM17 7l-3 7a3 3 0 0 0 6 0z"/>',
+    "python": '<path d="M12 2C7 2 7 4 7 6v2h5v1H5c-2 0-3 2-3 5s1 5 3 5h2v-3c0-2 2-3 4-3h5c2 0 3-1 3-3V6c0-2-2-4-7-4z"/><path d="M12 22c5 0 5-2 5-4v-2h-5v-1h7c2 0 3-2 3-5s-1-5-3-5h-2"/>',
+    "tags": '<path d="M20.6 13.4l-7.2 7.2a2 2 0 0 1-2.8 0L2 12V2h10l8.6 8.6a2 2 0 0 1 0 2.8z"/><circle cx="7" cy="7" r="1.5"/>',
+    "copy": '<rect x="9" y="9" width="13" height="13" rx="2"/><path d="M5 15H4a2 2 0 0 1-2-2V4a2 2 0 0 1 2-2h9a2 2 0 0 1 2 2v1"/>',
+    "check": '<path d="M20 6L9 17l-5-5"/>',
+    "code": '<path d="M16 18l6-6-6-6M8 6l-6 6 6 6"/>',
+    "github": '<path d="M9 19c-5 1.5-5-2.5-7-3m14 6v-3.9a3.4 3.4 0 0 0-.9-2.6c3.1-.3 6.4-1.5 6.4-7A5.4 5.4 0 0 0 20 4.8 5 5 0 0 0 19.9 1S18.7.7 16 2.5a13.4 13.4 0 0 0-7 0C6.3.7 5.1 1 5.1 1A5 5 0 0 0 5 4.8a5.4 5.4 0 0 0-1.5 3.7c0 5.4 3.3 6.6 6.4 7a3.4 3.4 0 0 0-.9 2.6V22"/>',
+    "book": '<path d="M4 19.5A2.5 2.5 0 0 1 6.5 17H20V2H6.5A2.5 2.5 0 0 0 4 4.5z"/><path d="M4 19.5A2.5 2.5 0 0 0 6.5 22H20v-5"/>',
+    "home": '<path d="M3 10l9-7 9 7v11a1 1 0 0 1-1 1h-5v-7H9v7H4a1 1 0 0 1-1-1z"/>',
+    "external-link": '<path d="M18 13v6a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2V8a2 2 0 0 1 2-2h6M15 3h6v6M10 14L21 3"/>',
+    "download": '<path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4M7 10l5 5 5-5M12 15V3"/>',
+}
 
 # Templates
 INDEX_TEMPLATE = """
@@ -25,246 +1125,14 @@ INDEX_TEMPLATE = """
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{{ '{{ site_config.project_name }}' }} - UV Script Collection</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-    <style>
-        :root {
-            --primary-color: #2563eb;
-            --secondary-color: #1d4ed8;
-            --background-color: #f8fafc;
-            --card-background: #ffffff;
-            --text-primary: #1e293b;
-            --text-secondary: #64748b;
-            --border-color: #e2e8f0;
-            --hover-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1);
-        }
-
-        @media (prefers-color-scheme: dark) {
-            :root {
-                --primary-color: #3b82f6;
-                --secondary-color: #60a5fa;
-                --background-color: #0f172a;
-                --card-background: #1e293b;
-                --text-primary: #f1f5f9;
-                --text-secondary: #94a3b8;
-                --border-color: #334155;
-            }
-        }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Oxygen-Sans, Ubuntu, Cantarell, sans-serif;
-            background-color: var(--background-color);
-            color: var(--text-primary);
-            line-height: 1.6;
-        }
-
-        .header {
-            background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
-            padding: 2.5rem 1rem;
-            text-align: center;
-            color: white;
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            margin-bottom: 1rem;
-        }
-
-        .header p {
-            font-size: 1.2rem;
-            opacity: 0.9;
-            max-width: 600px;
-            margin: 0 auto;
-        }
-
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 2rem;
-        }
-
-        .search-container {
-            margin: 1rem auto 2rem;
-            max-width: 600px;
-        }
-
-        .search-box {
-            width: 100%;
-            padding: 0.75rem 1rem;
-            border: 2px solid var(--border-color);
-            border-radius: 0.5rem;
-            font-size: 1rem;
-            background-color: var(--card-background);
-            color: var(--text-primary);
-        }
-
-        .grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 2rem;
-            padding: 1rem;
-        }
-
-        .card {
-            background: var(--card-background);
-            border-radius: 1rem;
-            overflow: hidden;
-            border: 1px solid var(--border-color);
-            transition: transform 0.2s ease, box-shadow 0.2s ease;
-        }
-
-        .card:hover {
-            transform: translateY(-5px);
-            box-shadow: var(--hover-shadow);
-        }
-
-        .card-image {
-            width: 100%;
-            height: 200px;
-            object-fit: cover;
-        }
-
-        .card-content {
-            padding: 1.5rem;
-        }
-
-        .card-title {
-            font-size: 1.25rem;
-            color: var(--text-primary);
-            margin-bottom: 0.5rem;
-            text-decoration: none;
-        }
-
-        .card-title:hover {
-            color: var(--primary-color);
-        }
-
-        .card-metadata {
-            font-size: 0.9rem;
-            color: var(--text-secondary);
-            margin-bottom: 1rem;
-        }
-
-        .card-metadata i {
-            margin-right: 0.5rem;
-        }
-
-        .card-description {
-            color: var(--text-secondary);
-            margin-bottom: 1rem;
-            font-size: 0.95rem;
-        }
-
-        .card-source {
-            font-size: 0.85rem;
-            padding: 0.5rem;
-            background-color: var(--background-color);
-            border-radius: 0.5rem;
-            margin-top: 1rem;
-        }
-
-        .card-source a {
-            color: var(--primary-color);
-            text-decoration: none;
-        }
-
-        .card-source a:hover {
-            text-decoration: underline;
-        }
-
-        @media (max-width: 768px) {
-            .grid {
-                grid-template-columns: 1fr;
-            }
-            
-            .header h1 {
-                font-size: 2rem;
-            }
-            
-            .header p {
-                font-size: 1rem;
-            }
-        }
-        
-        .header-banner {
-            background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
-            padding: 2rem;
-            color: white;
-            position: relative;
-        }
-
-        .header-content {
-            max-width: 1200px;
-            margin: 0 auto;
-            display: flex;
-            align-items: flex-start;
-            gap: 2rem;
-        }
-
-        .header-logo {
-            flex-shrink: 0;
-            text-decoration: none;
-        }
-
-        .logo-image {
-            height: 80px;
-            width: auto;
-        }
-
-        .header-text {
-            flex-grow: 1;
-        }
-
-        .header-title {
-            font-size: 2.5rem;
-            margin-bottom: 0.5rem;
-            font-weight: 800;
-        }
-
-        .header-subtitle {
-            font-size: 1.2rem;
-            opacity: 0.9;
-            line-height: 1.4;
-        }
-
-        .stat-item {
-            text-align: center;
-        }
-
-        .stat-value {
-            font-size: 2rem;
-            font-weight: bold;
-            margin-bottom: 0.5rem;
-        }
-
-        .stat-label {
-            font-size: 0.9rem;
-            opacity: 0.8;
-        }
-
-        .header-logo {
-            display: block;
-            margin-bottom: 1rem;
-        }
-        
-        .logo-image {
-            height: 80px;
-            width: auto;
-            margin: 0 auto;
-        }
-    </style>
+    <title>{% raw %}{% if group %}{{ group }} - {% endif %}{% endraw %}{{ '{{ site_config.project_name }}' }} - UV Script Collection</title>
+    <link rel="stylesheet" href="{{ '{{ root }}{{ assets.css }}' }}">
 </head>
-<body>
+<body class="page-index">
     <header class="header-banner">
         <div class="header-content">
-            <a href="index.html" class="header-logo">
-                <img src="icon_transparent.png" alt="{{ '{{ site_config.project_name }}' }} Logo" class="logo-image">
+            <a href="{{ '{{ root }}' }}index.html" class="header-logo">
+                <img src="{{ '{{ root }}' }}icon_transparent.png" alt="{{ '{{ site_config.project_name }}' }} Logo" class="logo-image">
             </a>
             <div class="header-text">
                 <h1 class="header-title">{{ '{{ site_config.project_name }}' }}</h1>
@@ -274,39 +1142,68 @@ INDEX_TEMPLATE = """
     </header>
 
     <div class="container">
+        {%- raw %}
+        {% if breadcrumbs %}
+        <nav class="breadcrumbs" aria-label="Breadcrumb">
+            {% for crumb in breadcrumbs %}
+            {% if crumb.url %}<a href="{{ crumb.url }}">{{ crumb.name }}</a> / {% else %}<span aria-current="page">{{ crumb.name }}</span>{% endif %}
+            {% endfor %}
+        </nav>
+        {% endif %}
+        {%- endraw %}
         <div class="search-container">
-            <input type="text" id="searchBox" class="search-box" placeholder="Search scripts..." 
-                   onkeyup="filterCards()">
+            <input type="search" id="searchBox" class="search-box" placeholder="Search scripts..."
+                   autocomplete="off">
+        </div>
+
+        {%- raw %}
+        {% if groups %}
+        <div class="group-list" id="groupList">
+            {% for group in groups %}
+            <a class="group-card" href="{{ group.url }}" data-group="{{ group.name }}" data-shard="{{ group.shard }}">
+                <h2>{{ group.name }}</h2>
+                <p class="group-count">{{ group.count }} script{{ "" if group.count == 1 else "s" }}</p>
+            </a>
+            {% endfor %}
         </div>
+        {% endif %}
+        {%- endraw %}
 
-        <div class="grid" id="scriptsGrid">
+        <div class="grid" id="scriptsGrid" data-search-index="{{ '{{ search_index_url }}' }}" data-search-worker="{{ '{{ root }}{{ assets.search_worker }}' }}">
             {%- raw -%}
             {% for solution in solutions %}
-            <div class="card">
+            <div class="card" data-doc="{{ loop.index0 }}">
                 
                 <div class="card-content">
-                    <a href="{{ solution.link }}/index.html" class="card-title">
+                    <a href="{{ root }}{{ solution.link }}/index.html" class="card-title">
                         <h2>{{ solution.name }}</h2>
                     </a>
 
-                    {% if solution.cover %}
-                    <img class="card-image" src="{{ solution.cover }}" alt="{{ solution.name }}">
+                    {% if solution.cover_images %}
+                    <picture>
+                        {% for source in solution.cover_images.sources %}
+                        <source type="{{ source.type }}" srcset="{{ source.srcset }}" sizes="(max-width: 768px) 100vw, 400px">
+                        {% endfor %}
+                        <img class="card-image" src="{{ solution.cover_images.src }}" srcset="{{ solution.cover_images.srcset }}" sizes="(max-width: 768px) 100vw, 400px" width="{{ solution.cover_images.width }}" height="{{ solution.cover_images.height }}" alt="{{ solution.name }}" loading="lazy" decoding="async" style="background: url({{ solution.cover_images.lqip }}) center / cover no-repeat">
+                    </picture>
+                    {% elif solution.cover %}
+                    <img class="card-image" src="{{ solution.cover }}" alt="{{ solution.name }}" loading="lazy" decoding="async">
                     {% endif %}
 
                     
                     <div class="card-metadata">
                         {% if solution.author %}
-                        <p><i class="fas fa-user"></i> {{ solution.author }}</p>
+                        <p>{{ icon('user') }} {{ solution.author }}</p>
                         {% endif %}
                         {% if solution.version %}
-                        <p><i class="fas fa-code-branch"></i> {{ solution.version }}</p>
+                        <p>{{ icon('code-branch') }} {{ solution.version }}</p>
                         {% endif %}
                     </div>
 
                     <p class="card-description">{{ solution.description }}</p>
 
                     <div class="card-source">
-                        <a href="{{ solution.link }}/source.html">View Source</a>
+                        <a href="{{ root }}{{ solution.link }}/source.html">View Source</a>
                     </div>
                 </div>
             </div>
@@ -315,459 +1212,451 @@ INDEX_TEMPLATE = """
         </div>
     </div>
 
+    {%- raw %}
+    {% if index_mode in ("virtual", "groups") %}
+    <script src="{{ root }}{{ assets.cards }}" data-icons="{{ root }}{{ assets.icons }}"></script>
+    {% endif %}
+    {% if index_mode == "virtual" %}
+    <script src="{{ root }}{{ assets.virtual_grid }}" data-catalog="{{ catalog_url }}" data-root="{{ root }}"></script>
+    {% elif index_mode == "groups" %}
+    <script src="{{ root }}{{ assets.group_search }}"></script>
+    {% endif %}
+    {%- endraw %}
     <script>
+        const searchBox = document.getElementById('searchBox');
+        const grid = document.getElementById('scriptsGrid');
+        const cards = Array.from(grid.querySelectorAll('.card'));
+        let visible = null;  // Set of shown card indices, or null when every card is shown
+        let latestQuery = 0;
+        let debounceTimer;
+        let worker = null;
+
+        // Show the ranked results, touching only cards whose state changes
+        function showResults(results, links) {
+            if (window.atriumGroupSearch) {
+                window.atriumGroupSearch.show(results === null ? null : links || []);
+                return;
+            }
+            if (window.atriumVirtualGrid) {
+                window.atriumVirtualGrid.show(results);
+                return;
+            }
+            if (results === null) {
+                if (visible !== null) {
+                    cards.forEach(card => {
+                        card.style.display = '';
+                        card.style.order = '';
+                    });
+                    visible = null;
+                }
+                return;
+            }
+            const next = new Set(results);
+            const previous = visible === null ? cards.map((card, doc) => doc) : visible;
+            previous.forEach(doc => {
+                if (!next.has(doc)) {
+                    cards[doc].style.display = 'none';
+                    cards[doc].style.order = '';
+                }
+            });
+            results.forEach((doc, rank) => {
+                cards[doc].style.display = '';
+                cards[doc].style.order = rank;
+            });
+            visible = next;
+        }
+
+        // Fallback when Web Workers or the index are unavailable (e.g. file:// URLs)
         function filterCards() {
-            const searchText = document.getElementById('searchBox').value.toLowerCase();
-            const cards = document.getElementsByClassName('card');
-            
-            Array.from(cards).forEach(card => {
+            const searchText = searchBox.value.toLowerCase();
+            if (window.atriumGroupSearch) {
+                window.atriumGroupSearch.filterGroups(searchText);
+                return;
+            }
+            if (!searchText) {
+                showResults(null);
+                return;
+            }
+            if (window.atriumVirtualGrid) {
+                showResults(window.atriumVirtualGrid.match(searchText));
+                return;
+            }
+            showResults(cards.map((card, doc) => doc).filter(doc => {
+                const card = cards[doc];
                 const title = card.querySelector('.card-title').textContent.toLowerCase();
                 const description = card.querySelector('.card-description').textContent.toLowerCase();
-                const shouldShow = title.includes(searchText) || description.includes(searchText);
-                card.style.display = shouldShow ? 'block' : 'none';
-            });
+                return title.includes(searchText) || description.includes(searchText);
+            }));
         }
+
+        // Group pages have no search index; they filter their own catalog shard
+        if (window.Worker && grid.dataset.searchIndex) {
+            try {
+                worker = new Worker(grid.dataset.searchWorker);
+                worker.onmessage = event => {
+                    if (event.data.type === 'error') {
+                        worker = null;
+                        filterCards();
+                    } else if (event.data.type === 'results' && event.data.id === latestQuery) {
+                        showResults(event.data.results, event.data.links);
+                    }
+                };
+                worker.onerror = () => {
+                    worker = null;
+                    filterCards();
+                };
+                // Resolve against the page: the worker lives under _assets/
+                worker.postMessage({ type: 'load', url: new URL(grid.dataset.searchIndex, document.baseURI).href });
+            } catch (error) {
+                worker = null;
+            }
+        }
+
+        searchBox.addEventListener('input', () => {
+            clearTimeout(debounceTimer);
+            debounceTimer = setTimeout(() => {
+                latestQuery += 1;
+                if (worker) {
+                    worker.postMessage({
+                        type: 'query',
+                        id: latestQuery,
+                        query: searchBox.value,
+                        links: window.atriumGroupSearch ? window.atriumGroupSearch.limit : 0,
+                    });
+                } else {
+                    filterCards();
+                }
+            }, 150);
+        });
     </script>
 </body>
 </html>
 """
 
-SOLUTION_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{{ '{{ title }}' }} - {{ '{{ site_config.project_name }}' }}</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-    <style>
-        :root {
-            --primary-color: #2563eb;
-            --secondary-color: #1d4ed8;
-            --background-color: #f8fafc;
-            --card-background: #ffffff;
-            --text-primary: #1e293b;
-            --text-secondary: #64748b;
-            --border-color: #e2e8f0;
-            --code-background: #f1f5f9;
-            --tag-background: #e2e8f0;
-            --hover-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1);
+SEARCH_WORKER_JS = """\
+// Answers search queries from the prebuilt inverted index (see SearchIndexWriter).
+let index = null;
+let terms = [];
+let loading = null;
+
+function tokenize(text) {
+    return text.toLowerCase().match(/[\\p{L}\\p{N}]+/gu) || [];
+}
+
+// First position in the sorted term list that is >= prefix
+function lowerBound(prefix) {
+    let lo = 0;
+    let hi = terms.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (terms[mid] < prefix) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
         }
-
-        @media (prefers-color-scheme: dark) {
-            :root {
-                --primary-color: #3b82f6;
-                --secondary-color: #60a5fa;
-                --background-color: #0f172a;
-                --card-background: #1e293b;
-                --text-primary: #f1f5f9;
-                --text-secondary: #94a3b8;
-                --border-color: #334155;
-                --code-background: #1e293b;
-                --tag-background: #334155;
+    }
+    return lo;
+}
+
+// Every query token must prefix-match a term of the document; exact matches score double
+function search(query) {
+    const tokens = tokenize(query);
+    if (!tokens.length) {
+        return null;
+    }
+    let scores = null;
+    for (const token of tokens) {
+        const tokenScores = new Map();
+        for (let i = lowerBound(token); i < terms.length && terms[i].startsWith(token); i++) {
+            const postings = index.terms[terms[i]];
+            const boost = terms[i] === token ? 2 : 1;
+            for (let j = 0; j < postings.length; j += 2) {
+                const doc = postings[j];
+                tokenScores.set(doc, (tokenScores.get(doc) || 0) + postings[j + 1] * boost);
             }
         }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
-            background-color: var(--background-color);
-            color: var(--text-primary);
-            line-height: 1.6;
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            margin-bottom: 1rem;
-        }
-
-        .nav-bar {
-            background-color: var(--card-background);
-            padding: 1rem;
-            border-bottom: 1px solid var(--border-color);
-            position: sticky;
-            top: 0;
-            z-index: 100;
-        }
-
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 2rem;
-        }
-
-        .back-link {
-            display: inline-flex;
-            align-items: center;
-            color: var(--text-secondary);
-            text-decoration: none;
-            gap: 0.5rem;
-            font-size: 0.95rem;
-        }
-
-        .back-link:hover {
-            color: var(--primary-color);
-        }
-
-        .script-section {
-            background: var(--card-background);
-            border-radius: 1rem;
-            padding: 2rem;
-            margin: 2rem 0;
-            border: 1px solid var(--border-color);
-        }
-
-        .script-header {
-            margin-bottom: 2rem;
-        }
-
-        .script-title {
-            font-size: 2rem;
-            margin-bottom: 0.5rem;
-        }
-
-        .metadata-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 1.5rem;
-            margin: 2rem 0;
-            padding: 1.5rem;
-            background: var(--code-background);
-            border-radius: 0.5rem;
-        }
-
-        .metadata-item {
-            display: flex;
-            flex-direction: column;
-            gap: 0.5rem;
-        }
-
-        .metadata-label {
-            font-size: 0.875rem;
-            color: var(--text-secondary);
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }
-
-        .metadata-value {
-            font-size: 1rem;
-            color: var(--text-primary);
-            word-break: break-word;
-        }
-
-        .tags-container {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 0.5rem;
-            margin-top: 0.5rem;
-        }
-
-        .tag {
-            background: var(--tag-background);
-            padding: 0.25rem 0.75rem;
-            border-radius: 1rem;
-            font-size: 0.875rem;
-            color: var(--text-primary);
-        }
-
-        .command-section {
-            background: var(--code-background);
-            padding: 1.5rem;
-            border-radius: 0.5rem;
-            margin: 2rem 0;
-            position: relative;
-        }
-
-        .command-title {
-            font-size: 1.2rem;
-            margin-bottom: 1rem;
-            color: var(--text-primary);
-        }
-
-        .command-box {
-            background: rgba(0, 0, 0, 0.1);
-            padding: 1rem;
-            border-radius: 0.5rem;
-            font-family: 'Menlo', 'Monaco', 'Courier New', monospace;
-            margin-bottom: 0.5rem;
-            overflow-x: auto;
-        }
-
-        .copy-button {
-            position: absolute;
-            top: 1rem;
-            right: 1rem;
-            background: var(--primary-color);
-            color: white;
-            border: none;
-            padding: 0.5rem 1rem;
-            border-radius: 0.5rem;
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            font-size: 0.9rem;
-        }
-
-        .copy-button:hover {
-            background: var(--secondary-color);
-        }
-
-        .description-section {
-            margin: 2rem 0;
-        }
-
-        .description-content {
-            color: var(--text-secondary);
-            font-size: 1.1rem;
-            line-height: 1.8;
-        }
-
-        .dependencies-section {
-            margin: 2rem 0;
-        }
-
-        .dependencies-list {
-            list-style: none;
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(200px, 1fr));
-            gap: 1rem;
-            margin-top: 1rem;
-        }
-
-        .dependency-item {
-            background: var(--code-background);
-            padding: 0.75rem 1rem;
-            border-radius: 0.5rem;
-            font-family: monospace;
-            font-size: 0.9rem;
-        }
-
-        .links-section {
-            margin-top: 3rem;
-            padding-top: 2rem;
-            border-top: 1px solid var(--border-color);
-            display: flex;
-            gap: 2rem;
-            flex-wrap: wrap;
-        }
-
-        .link-item {
-            display: inline-flex;
-            align-items: center;
-            gap: 0.5rem;
-            color: var(--primary-color);
-            text-decoration: none;
-            font-weight: 500;
-        }
-
-        .link-item:hover {
-            text-decoration: underline;
-        }
-
-
-
-                .metadata-section {
-            background: var(--card-background);
-            border-radius: 1rem;
-            padding: 2rem;
-            margin: 2rem 0;
-            border: 1px solid var(--border-color);
-        }
-
-        .metadata-title {
-            font-size: 1.2rem;
-            margin-bottom: 1.5rem;
-            color: var(--text-primary);
-        }
-
-        .metadata-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 1.5rem;
-        }
-
-        .metadata-item {
-            padding: 1rem;
-            background: var(--code-background);
-            border-radius: 0.5rem;
-        }
-
-        .metadata-label {
-            font-size: 0.875rem;
-            color: var(--text-secondary);
-            margin-bottom: 0.5rem;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-        }
-
-        .metadata-value {
-            font-size: 1rem;
-            color: var(--text-primary);
-            word-break: break-word;
-        }
-
-        .tags-container {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 0.5rem;
-        }
-
-        .tag {
-            background: var(--tag-background);
-            padding: 0.25rem 0.75rem;
-            border-radius: 1rem;
-            font-size: 0.875rem;
-            color: var(--text-primary);
-        }
-
-        .cover-image-container {
-            margin: 2rem 0;
-            width: 100%;
-            max-width: 800px;
-            margin-left: auto;
-            margin-right: auto;
-        }
-
-        .card-image {
-            width: 100%;
-            height: auto;
-            border-radius: 0.5rem;
-            box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-            display: block;  /* Ensure image is block-level */
-            margin: 0 auto;  /* Center the image */
-        }
-
-        @media (prefers-color-scheme: dark) {
-            .card-image {
-                box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.2), 0 2px 4px -1px rgba(0, 0, 0, 0.1);
+        if (scores === null) {
+            scores = tokenScores;
+        } else {
+            for (const [doc, score] of scores) {
+                if (tokenScores.has(doc)) {
+                    scores.set(doc, score + tokenScores.get(doc));
+                } else {
+                    scores.delete(doc);
+                }
             }
-        }        
-        
-        .logo-image {
-            height: 80px;
-            width: auto;
-            margin: 0 auto;
-        }
-
-        .header {
-            background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
-            padding: 1rem;
-            color: white;
-            position: relative;
-        }
-
-        .header-content {
-            max-width: 1200px;
-            margin: 0 auto;
-            display: flex;
-            align-items: center;
-            gap: 2rem;
         }
-
-        .header-logo {
-            flex-shrink: 0;
-        }
-
-        .logo-image {
-            height: 80px;
-            width: auto;
-            display: block;
+        if (!scores.size) {
+            break;
         }
-
-        .header-text {
-            flex-grow: 1;
-            text-align: left;
-        }
-
-        .header-title {
-            font-size: 2.5rem;
-            margin-bottom: 0;
-            font-weight: 800;
-        }    
-
-        .header {
-            background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
-            padding: 2rem;
-            color: white;
-            position: relative;
+    }
+    return Array.from(scores)
+        .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+        .map(entry => entry[0]);
+}
+
+self.onmessage = async event => {
+    const message = event.data;
+    if (message.type === 'load') {
+        loading = fetch(message.url)
+            .then(response => response.json())
+            .then(data => {
+                index = data;
+                terms = Object.keys(index.terms).sort();
+            })
+            .catch(() => self.postMessage({ type: 'error' }));
+        await loading;
+    } else if (message.type === 'query') {
+        await loading;
+        if (index !== null) {
+            const results = search(message.query);
+            const reply = { type: 'results', id: message.id, results: results };
+            if (message.links && results !== null) {
+                // The group index has no cards to rank, so it looks the best hits up by link
+                reply.links = results.slice(0, message.links).map(doc => index.docs[doc]);
+            }
+            self.postMessage(reply);
         }
+    }
+};
+"""
 
-        .solution-header-content {
-            max-width: 1200px;
-            margin: 0 auto;
-            display: flex;
-            align-items: flex-start;
-            gap: 2rem;
-        }
+CARDS_JS = """\
+// Script cards rendered in the browser, shared by the windowed grid and group search.
+(function () {
+    const script = document.currentScript;
+
+    function escapeHtml(value) {
+        return String(value || '')
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;');
+    }
+
+    function iconHtml(name) {
+        return '<svg class="icon" aria-hidden="true"><use href="' + script.dataset.icons + '#' + name + '"></use></svg>';
+    }
+
+    window.atriumCards = {
+        // Rows of a catalog (see CatalogWriter) as objects keyed by field
+        items(catalog) {
+            return catalog.items.map(row => {
+                const item = {};
+                catalog.fields.forEach((field, i) => {
+                    item[field] = row[i];
+                });
+                return item;
+            });
+        },
+        // Same markup as the server-rendered cards in INDEX_TEMPLATE; links are relative to ``root``
+        html(item, doc, root) {
+            const link = escapeHtml(root + item.link);
+            const name = escapeHtml(item.name);
+            let html = '<div class="card" data-doc="' + doc + '"><div class="card-content">';
+            html += '<a href="' + link + '/index.html" class="card-title"><h2>' + name + '</h2></a>';
+            if (item.thumbnail) {
+                html += '<img class="card-image" src="' + escapeHtml(item.thumbnail) + '"';
+                if (item.width && item.height) {
+                    html += ' width="' + escapeHtml(item.width) + '" height="' + escapeHtml(item.height) + '"';
+                }
+                html += ' alt="' + name + '" loading="lazy" decoding="async"';
+                if (item.lqip) {
+                    html += ' style="background: url(' + escapeHtml(item.lqip) + ') center / cover no-repeat"';
+                }
+                html += '>';
+            }
+            html += '<div class="card-metadata">';
+            if (item.author) {
+                html += '<p>' + iconHtml('user') + ' ' + escapeHtml(item.author) + '</p>';
+            }
+            if (item.version) {
+                html += '<p>' + iconHtml('code-branch') + ' ' + escapeHtml(item.version) + '</p>';
+            }
+            html += '</div><p class="card-description">' + escapeHtml(item.description) + '</p>';
+            html += '<div class="card-source"><a href="' + link + '/source.html">View Source</a></div>';
+            return html + '</div></div>';
+        },
+    };
+})();
+"""
 
-        .solution-header-logo {
-            flex-shrink: 0;
+VIRTUAL_GRID_JS = """\
+// Windowed index grid: renders only the rows of catalog.json that are near the viewport.
+(function () {
+    const script = document.currentScript;
+    const OVERSCAN_ROWS = 3;
+    const MIN_CARD_WIDTH = 300;
+    let grid;
+    let viewport;
+    let items = null;
+    let order = null;  // Catalog positions to list, in rank order; null lists everything
+    let columns = 1;
+    let rowHeight = 0;
+    let version = 0;
+    let rendered = '';
+    let scheduled = false;
+
+    function cardHtml(doc) {
+        return window.atriumCards.html(items[doc], doc, script.dataset.root || '');
+    }
+
+    function measure() {
+        const style = getComputedStyle(grid);
+        const gap = parseFloat(style.rowGap) || 0;
+        const width = grid.clientWidth - parseFloat(style.paddingLeft) - parseFloat(style.paddingRight);
+        columns = window.matchMedia('(max-width: 768px)').matches
+            ? 1
+            : Math.max(1, Math.floor((width + gap) / (MIN_CARD_WIDTH + gap)));
+        grid.style.gridTemplateColumns = 'repeat(' + columns + ', 1fr)';
+        const card = grid.querySelector('.card');
+        rowHeight = (card ? card.offsetHeight : 460) + gap;
+    }
+
+    function render() {
+        scheduled = false;
+        const count = order === null ? items.length : order.length;
+        const rows = Math.ceil(count / columns);
+        viewport.style.height = rows * rowHeight + 'px';
+        const top = viewport.getBoundingClientRect().top;
+        const firstRow = Math.max(0, Math.floor(-top / rowHeight) - OVERSCAN_ROWS);
+        const lastRow = Math.min(rows, Math.ceil((window.innerHeight - top) / rowHeight) + OVERSCAN_ROWS);
+        const key = [firstRow, lastRow, columns, version].join(':');
+        if (key === rendered) {
+            return;
         }
-
-        .solution-header-text {
-            flex-grow: 1;
+        rendered = key;
+        let html = '';
+        const end = Math.min(count, lastRow * columns);
+        for (let i = firstRow * columns; i < end; i++) {
+            html += cardHtml(order === null ? i : order[i]);
         }
-
-        .solution-title {
-            font-size: 2.5rem;
-            margin-bottom: 0.5rem;
-            font-weight: 800;
+        grid.innerHTML = html;
+        grid.style.transform = 'translateY(' + firstRow * rowHeight + 'px)';
+    }
+
+    function schedule() {
+        if (items !== null && !scheduled) {
+            scheduled = true;
+            requestAnimationFrame(render);
         }
+    }
+
+    window.atriumVirtualGrid = {
+        show(results) {
+            order = results;
+            version += 1;
+            schedule();
+        },
+        match(text) {
+            const matches = [];
+            (items || []).forEach((item, doc) => {
+                if ((item.name + ' ' + item.description).toLowerCase().includes(text)) {
+                    matches.push(doc);
+                }
+            });
+            return matches;
+        },
+    };
+
+    document.addEventListener('DOMContentLoaded', () => {
+        grid = document.getElementById('scriptsGrid');
+        viewport = document.createElement('div');
+        viewport.className = 'virtual-viewport';
+        grid.parentNode.insertBefore(viewport, grid);
+        viewport.appendChild(grid);
+        fetch(script.dataset.catalog)
+            .then(response => response.json())
+            .then(catalog => {
+                items = window.atriumCards.items(catalog);
+                measure();
+                schedule();
+                window.addEventListener('scroll', schedule, { passive: true });
+                window.addEventListener('resize', () => {
+                    measure();
+                    rendered = '';
+                    schedule();
+                });
+            });
+    });
+})();
+"""
 
-        .solution-subtitle {
-            font-size: 1.2rem;
-            opacity: 0.9;
-            line-height: 1.4;
-            max-width: 800px;
+GROUP_SEARCH_JS = """\
+// Search results on the group index: each hit's card comes from the catalog shard
+// of its top-level group, fetched the first time one of its scripts matches.
+(function () {
+    const script = document.currentScript;
+    const MAX_RESULTS = 60;
+    const shards = new Map();  // Group name -> promise of a Map from link to item
+    let version = 0;
+
+    function shard(group) {
+        if (!shards.has(group)) {
+            const card = Array.from(document.querySelectorAll('.group-card'))
+                .find(element => element.dataset.group === group);
+            const loaded = card
+                ? fetch(card.dataset.shard).then(response => response.json())
+                : Promise.resolve({ fields: [], items: [] });
+            shards.set(group, loaded
+                .then(catalog => new Map(window.atriumCards.items(catalog).map(item => [item.link, item])))
+                .catch(() => new Map()));
         }
-
-        @media (max-width: 768px) {
-            .header-banner,
-            .header {
-                padding: 1.5rem;
-            }
-            
-            .header-content,
-            .solution-header-content {
-                flex-direction: column;
-                align-items: center;
-                text-align: center;
+        return shards.get(group);
+    }
+
+    window.atriumGroupSearch = {
+        limit: MAX_RESULTS,
+        // Links of the ranked hits, or null to list the groups again
+        show(links) {
+            const groupList = document.getElementById('groupList');
+            const grid = document.getElementById('scriptsGrid');
+            const current = ++version;
+            if (links === null) {
+                if (groupList) {
+                    groupList.hidden = false;
+                }
+                grid.innerHTML = '';
+                return;
             }
-            
-            .header-text,
-            .solution-header-text {
-                text-align: center;
-            }
-            
-            .header-title,
-            .solution-title {
-                font-size: 2rem;
-            }
-            
-            .header-subtitle,
-            .solution-subtitle {
-                font-size: 1.1rem;
-            }
-            
-            .logo-image {
-                height: 60px;
-            }
-        }
-    </style>
+            Promise.all(links.map(link => shard(link.split('/')[0]).then(items => items.get(link))))
+                .then(items => {
+                    if (current !== version) {
+                        return;
+                    }
+                    if (groupList) {
+                        groupList.hidden = true;
+                    }
+                    grid.innerHTML = items
+                        .filter(Boolean)
+                        .map((item, doc) => window.atriumCards.html(item, doc, ''))
+                        .join('');
+                });
+        },
+        // Fallback without the search index: narrow the group list by name
+        filterGroups(text) {
+            document.querySelectorAll('.group-card').forEach(card => {
+                card.hidden = !card.dataset.group.toLowerCase().includes(text);
+            });
+        },
+    };
+})();
+"""
+
+SOLUTION_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{ '{{ title }}' }} - {{ '{{ site_config.project_name }}' }}</title>
+    <link rel="stylesheet" href="{{ '{{ root }}{{ assets.css }}' }}">
 </head>
-<body>
+<body class="page-solution">
     <header class="header">
         <div class="solution-header-content">
-            <a href="../../index.html" class="solution-header-logo">
-                <img src="../../icon_transparent.png" alt="{{ title }} Logo" class="logo-image">
+            <a href="{{ '{{ root }}' }}index.html" class="solution-header-logo">
+                <img src="{{ '{{ root }}' }}icon_transparent.png" alt="{{ title }} Logo" class="logo-image">
             </a>
             <div class="solution-header-text">
                 <h1 class="solution-title">{{ title }}</h1>
@@ -778,8 +1667,8 @@ SOLUTION_TEMPLATE = """
 
     <nav class="nav-bar">
         <div class="container">
-            <a href="../../index.html" class="back-link">
-                <i class="fas fa-arrow-left"></i>
+            <a href="{{ '{{ root }}' }}index.html" class="back-link">
+                {{ '{{' }} icon('arrow-left') }}
                 Back to Scripts
             </a>
         </div>
@@ -791,7 +1680,22 @@ SOLUTION_TEMPLATE = """
                 <h1 class="script-title">{{ '{{ title }}' }}</h1>
                 
                 {%- raw -%}
-                {% if cover_image %}
+                {% if pinned_version %}
+                <p class="version-notice">
+                    This is version {{ pinned_version }}, which never changes.
+                    <a href="../">See the latest version and all versions</a>.
+                </p>
+                {% endif %}
+                {% if cover_images %}
+                <div class="cover-image-container">
+                    <picture>
+                        {% for source in cover_images.sources %}
+                        <source type="{{ source.type }}" srcset="{{ source.srcset }}" sizes="(max-width: 800px) 100vw, 800px">
+                        {% endfor %}
+                        <img src="{{ cover_images.src }}" srcset="{{ cover_images.srcset }}" sizes="(max-width: 800px) 100vw, 800px" width="{{ cover_images.width }}" height="{{ cover_images.height }}" alt="{{ title }} cover image" class="card-image" decoding="async" style="background: url({{ cover_images.lqip }}) center / cover no-repeat">
+                    </picture>
+                </div>
+                {% elif cover_image %}
                 <div class="cover-image-container">
                     <img src="{{ cover_image }}" alt="{{ title }} cover image" class="card-image">
                 </div>
@@ -807,7 +1711,7 @@ SOLUTION_TEMPLATE = """
                     {% if version %}
                     <div class="metadata-item">
                         <div class="metadata-label">
-                            <i class="fas fa-code-branch"></i>
+                            {{ icon('code-branch') }}
                             Version
                         </div>
                         <div class="metadata-value">{{ version }}</div>
@@ -817,7 +1721,7 @@ SOLUTION_TEMPLATE = """
                     {% if author %}
                     <div class="metadata-item">
                         <div class="metadata-label">
-                            <i class="fas fa-user"></i>
+                            {{ icon('user') }}
                             Author
                         </div>
                         <div class="metadata-value">{{ author }}</div>
@@ -827,7 +1731,7 @@ SOLUTION_TEMPLATE = """
                     {% if license %}
                     <div class="metadata-item">
                         <div class="metadata-label">
-                            <i class="fas fa-balance-scale"></i>
+                            {{ icon('balance-scale') }}
                             License
                         </div>
                         <div class="metadata-value">{{ license }}</div>
@@ -837,7 +1741,7 @@ SOLUTION_TEMPLATE = """
                     {% if requires_python %}
                     <div class="metadata-item">
                         <div class="metadata-label">
-                            <i class="fab fa-python"></i>
+                            {{ icon('python') }}
                             Python Version
                         </div>
                         <div class="metadata-value">{{ requires_python }}</div>
@@ -847,7 +1751,7 @@ SOLUTION_TEMPLATE = """
                     {% if keywords %}
                     <div class="metadata-item">
                         <div class="metadata-label">
-                            <i class="fas fa-tags"></i>
+                            {{ icon('tags') }}
                             Keywords
                         </div>
                         <div class="tags-container">
@@ -866,7 +1770,7 @@ SOLUTION_TEMPLATE = """
                     <code>uv run {{ script_source }}</code>
                 </div>
                 <button class="copy-button" onclick="copyCommand()">
-                    <i class="fas fa-copy"></i>
+                    {{ icon('copy') }}
                     Copy Command
                 </button>
             </div>
@@ -882,36 +1786,66 @@ SOLUTION_TEMPLATE = """
             </div>
             {% endif %}
 
+            {% if lock_file %}
+            <div class="dependencies-section">
+                <h2>Locked Dependencies</h2>
+                <p class="lock-note">
+                    Resolved when this site was built. Save <a href="./{{ lock_file }}" download>{{ lock_file }}</a>
+                    next to the script and <code>uv run</code> installs exactly these versions.
+                </p>
+                {% if locked_dependencies %}
+                <ul class="dependencies-list">
+                    {% for package in locked_dependencies %}
+                    <li class="dependency-item">{{ package.name }}=={{ package.version }}</li>
+                    {% endfor %}
+                </ul>
+                {% endif %}
+            </div>
+            {% endif %}
+
+            {% if versions %}
+            <div class="dependencies-section">
+                <h2>Versions</h2>
+                <ul class="dependencies-list">
+                    {% for release in versions %}
+                    <li class="dependency-item">
+                        <a href="{{ release.url }}">{{ release.version }}</a>{% if release.latest %} (latest){% endif %}
+                    </li>
+                    {% endfor %}
+                </ul>
+            </div>
+            {% endif %}
+
             <div class="links-section">
                 <a href="./source.html" class="link-item">
-                    <i class="fas fa-code"></i>
+                    {{ icon('code') }}
                     View Source Code
                 </a>
 
                 {% if repository %}
                 <a href="{{ repository }}" target="_blank" class="link-item">
-                    <i class="fab fa-github"></i>
+                    {{ icon('github') }}
                     Repository
                 </a>
                 {% endif %}
 
                 {% if documentation %}
                 <a href="{{ documentation }}" target="_blank" class="link-item">
-                    <i class="fas fa-book"></i>
+                    {{ icon('book') }}
                     Documentation
                 </a>
                 {% endif %}
 
                 {% if homepage %}
                 <a href="{{ homepage }}" target="_blank" class="link-item">
-                    <i class="fas fa-home"></i>
+                    {{ icon('home') }}
                     Homepage
                 </a>
                 {% endif %}
 
                 {% if external_source %}
                 <a href="{{ external_source }}" target="_blank" class="link-item">
-                    <i class="fas fa-external-link-alt"></i>
+                    {{ icon('external-link') }}
                     View Source
                 </a>
                 {% endif %}
@@ -920,13 +1854,14 @@ SOLUTION_TEMPLATE = """
         </section>
     </main>
 
+    <template id="copiedLabel">{{ '{{' }} icon('check') }} Copied!</template>
     <script>
         function copyCommand() {
             const command = document.querySelector('.command-box code').textContent;
             navigator.clipboard.writeText(command).then(() => {
                 const button = document.querySelector('.copy-button');
                 const originalText = button.innerHTML;
-                button.innerHTML = '<i class="fas fa-check"></i> Copied!';
+                button.innerHTML = document.getElementById('copiedLabel').innerHTML;
                 setTimeout(() => {
                     button.innerHTML = originalText;
                 }, 2000);
@@ -944,185 +1879,13 @@ SOURCE_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{{ title }} - Source Code</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/themes/prism-tomorrow.min.css">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/plugins/line-numbers/prism-line-numbers.min.css">
-    <style>
-        :root {
-            --primary-color: #2563eb;
-            --secondary-color: #1d4ed8;
-            --background-color: #f8fafc;
-            --card-background: #ffffff;
-            --text-primary: #1e293b;
-            --text-secondary: #64748b;
-            --border-color: #e2e8f0;
-            --code-background: #1e1e1e;
-        }
-
-        @media (prefers-color-scheme: dark) {
-            :root {
-                --primary-color: #3b82f6;
-                --secondary-color: #60a5fa;
-                --background-color: #0f172a;
-                --card-background: #1e293b;
-                --text-primary: #f1f5f9;
-                --text-secondary: #94a3b8;
-                --border-color: #334155;
-                --code-background: #1e1e1e;
-            }
-        }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
-            background-color: var(--background-color);
-            color: var(--text-primary);
-            line-height: 1.6;
-        }
-
-        .header {
-            background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
-            padding: 2rem;
-            color: white;
-        }
-
-        .header-content {
-            max-width: 1200px;
-            margin: 0 auto;
-            display: flex;
-            align-items: flex-start;
-            gap: 2rem;
-        }
-
-        .header-logo {
-            flex-shrink: 0;
-            text-decoration: none;
-        }
-
-        .logo-image {
-            height: 80px;
-            width: auto;
-        }
-
-        .header-text {
-            flex-grow: 1;
-        }
-
-        .header-title {
-            font-size: 2rem;
-            margin-bottom: 0.5rem;
-            font-weight: 800;
-        }
-
-        .nav-bar {
-            background-color: var(--card-background);
-            padding: 1rem;
-            border-bottom: 1px solid var(--border-color);
-            position: sticky;
-            top: 0;
-            z-index: 100;
-        }
-
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 2rem;
-        }
-
-        .back-link {
-            display: inline-flex;
-            align-items: center;
-            color: var(--text-secondary);
-            text-decoration: none;
-            gap: 0.5rem;
-            font-size: 0.95rem;
-        }
-
-        .back-link:hover {
-            color: var(--primary-color);
-        }
-
-        .source-container {
-            background: var(--card-background);
-            border-radius: 1rem;
-            margin: 2rem 0;
-            overflow: hidden;
-            border: 1px solid var(--border-color);
-        }
-
-        .source-header {
-            padding: 1rem;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            border-bottom: 1px solid var(--border-color);
-        }
-
-        .source-title {
-            font-size: 1.2rem;
-            font-weight: 600;
-        }
-
-        .download-button {
-            background: var(--primary-color);
-            color: white;
-            border: none;
-            padding: 0.5rem 1rem;
-            border-radius: 0.5rem;
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            font-size: 0.9rem;
-            text-decoration: none;
-        }
-
-        .download-button:hover {
-            background: var(--secondary-color);
-        }
-
-        pre[class*="language-"] {
-            margin: 0;
-            border-radius: 0;
-        }
-
-        .code-wrapper {
-            max-height: 800px;
-            overflow-y: auto;
-            background: var(--code-background);
-        }
-
-        @media (max-width: 768px) {
-            .header-content {
-                flex-direction: column;
-                align-items: center;
-                text-align: center;
-            }
-
-            .logo-image {
-                height: 60px;
-            }
-
-            .header-title {
-                font-size: 1.5rem;
-            }
-
-            .container {
-                padding: 1rem;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ '{{ root }}{{ assets.css }}' }}">
 </head>
-<body>
+<body class="page-source">
     <header class="header">
         <div class="header-content">
-            <a href="../../index.html" class="header-logo">
-                <img src="../../icon_transparent.png" alt="{{ title }} Logo" class="logo-image">
+            <a href="{{ '{{ root }}' }}index.html" class="header-logo">
+                <img src="{{ '{{ root }}' }}icon_transparent.png" alt="{{ title }} Logo" class="logo-image">
             </a>
             <div class="header-text">
                 <h1 class="header-title">{{ title }} - Source Code</h1>
@@ -1135,137 +1898,157 @@ SOURCE_TEMPLATE = """
             <div class="source-header">
                 <div class="source-title">{{ filename }}</div>
                 <a href="{{ script_source }}" download="{{ filename }}" class="download-button">
-                    <i class="fas fa-download"></i>
+                    {{ '{{' }} icon('download') }}
                     Download Source
                 </a>
             </div>
             <div class="code-wrapper">
-                <pre class="line-numbers"><code class="language-python">{{ '{{' }} source_code }}</code></pre>
+                {{ '{{' }} source_html }}
             </div>
         </div>
     </main>
 
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/prism.min.js"></script>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/components/prism-python.min.js"></script>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/prism/1.29.0/plugins/line-numbers/prism-line-numbers.min.js"></script>
 </body>
 </html>
 """
 
+@dataclass
+class ScriptRecord:
+    """A script read from disk once per build, with its parsed metadata and commands.
+
+    ``metadata`` and ``commands`` are parsed lazily on first access and then
+    kept, so every build stage shares a single read and a single parse.
+    """
+    path: str
+    mtime_ns: int
+    size: int
+    sha256: str
+    source: str
+    _metadata: dict = field(default=None, repr=False)
+    _commands: list = field(default=None, repr=False)
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = parse_metadata(self.source, self.path)
+        return self._metadata
+
+    @property
+    def commands(self):
+        if self._commands is None:
+            self._commands = parse_typer_commands(self.source, self.path)
+        return self._commands
+
+# ScriptRecords keyed by path, in least recently used order; an entry is reused
+# while the file's mtime and size are unchanged
+_SCRIPT_RECORDS = OrderedDict()
+
+def load_script_record(file_path):
+    """Return the ScriptRecord for a script, reading it only if it changed since the last load.
+
+    At most SCRIPT_RECORD_CACHE_SIZE records are kept, so the sources of a
+    large atrium are not all held in memory at once.
+    """
+    stat = os.stat(file_path)
+    record = _SCRIPT_RECORDS.get(file_path)
+    if record is not None and record.mtime_ns == stat.st_mtime_ns and record.size == stat.st_size:
+        _SCRIPT_RECORDS.move_to_end(file_path)
+        return record
+
+    with open(file_path, "rb") as f:
+        data = f.read()
+    # Decode like text-mode open() so rendered pages are unchanged
+    source = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    record = ScriptRecord(
+        path=file_path,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        sha256=hashlib.sha256(data).hexdigest(),
+        source=source,
+    )
+    _SCRIPT_RECORDS[file_path] = record
+    _SCRIPT_RECORDS.move_to_end(file_path)
+    if len(_SCRIPT_RECORDS) > SCRIPT_RECORD_CACHE_SIZE:
+        _SCRIPT_RECORDS.popitem(last=False)
+    return record
+
+class MetadataError(ValueError):
+    """Invalid inline script metadata, located by file and line."""
+
+    def __init__(self, message, file_path, line=None):
+        self.file_path = file_path
+        self.line = line
+        location = file_path if line is None else f"{file_path}:{line}"
+        super().__init__(f"{location}: {message}")
+
 def extract_metadata(file_path):
-    """Extract metadata from a Python script with robust handling of multiline lists."""
-    metadata = {}
-    with open(file_path, "r") as f:
-        content = f.read()
+    """Extract metadata from a Python script, using the cached ScriptRecord."""
+    return load_script_record(file_path).metadata
 
-    # Match metadata block between "# /// script" and "# ///"
-    match = re.search(r"# /// script\n(.*?)# ///", content, re.DOTALL)
-    if match:
-        lines = match.group(1).strip().splitlines()
-        key, value = None, None
-
-        for line_no, line in enumerate(lines):
-            line = line.strip()
-            print(f"Line {line_no + 1}: {line}")  # Debugging: Show the raw line being processed
-
-            # Check for key-value pairs (with =)
-            if "=" in line and not (key == "dependencies" and isinstance(value, list)):
-                # Save the previous key-value pair
-                if key is not None and value is not None:
-                    # Remove quotes from string values before saving
-                    if isinstance(value, str):
-                        value = value.strip('"').strip("'")
-                    print(f"Saving metadata: {key} = {value}")  # Debugging
-                    metadata[key] = value
-
-                # Parse the new key-value pair
-                key, value = map(str.strip, line.split("=", 1))
-                key = key.lstrip("# ").strip()
-                value = value.strip()
-
-                print(f"New key detected: {key}, Initial value: {value}")  # Debugging
-
-                # Handle special case for dependencies
-                if key == "dependencies":
-                    if value.startswith("[") and not value.endswith("]"):
-                        # Start of a multiline dependencies list
-                        value = []
-                        print(f"Start of multiline list for {key}")  # Debugging
-                    elif value.startswith("[") and value.endswith("]"):
-                        # Inline dependencies list
-                        try:
-                            value = eval(value)  # Parse inline list
-                            print(f"Parsed inline dependencies for {key}: {value}")  # Debugging
-                        except Exception as e:
-                            print(f"Error parsing dependencies list for {key}: {e}")  # Debugging
-                            value = []
-                elif value.startswith("[") and value.endswith("]"):
-                    # Handle general inline lists
-                    try:
-                        value = eval(value)  # Parse inline list
-                        print(f"Parsed inline list for {key}: {value}")  # Debugging
-                    except Exception as e:
-                        print(f"Error parsing list for {key}: {e}")  # Debugging
-                        value = value.strip('"').strip("'")
-                elif value.startswith("[") and not value.endswith("]"):
-                    # Start of a multiline list for general keys
-                    value = []
-                    print(f"Start of multiline list for {key}")  # Debugging
-            elif key == "dependencies" and isinstance(value, list):
-                # Continuation of a multiline dependencies list
-                line_content = line.lstrip("# ").strip("[],").strip('"').strip("'")
-                if line_content:
-                    value.append(line_content)
-                    print(f"Appending to {key}: {line_content}")  # Debugging
-                if line.endswith("]"):  # End of multiline dependencies list
-                    print(f"Completed multiline dependencies list for {key}: {value}")  # Debugging
-                    metadata[key] = value
-                    key, value = None, None
-            elif key and isinstance(value, list) and line.startswith("#"):
-                # Continuation of a general multiline list
-                line_content = line.lstrip("# ").strip("[],").strip('"').strip("'")
-                if line_content:
-                    value.append(line_content)
-                    print(f"Appending to {key}: {line_content}")  # Debugging
-                if line.endswith("]"):  # End of multiline list
-                    print(f"Completed multiline list for {key}: {value}")  # Debugging
-                    metadata[key] = value
-                    key, value = None, None
-            elif key and not line.startswith("#"):
-                # End of a block or key-value pair
-                # Remove quotes from string values before saving
-                if isinstance(value, str):
-                    value = value.strip('"').strip("'")
-                print(f"Saving key: {key} with value: {value}")  # Debugging
-                metadata[key] = value
-                key, value = None, None
-
-        # Final key-value pair
-        if key and value is not None:
-            # Remove quotes from string values before saving
-            if isinstance(value, str):
-                value = value.strip('"').strip("'")
-            print(f"Final metadata save: {key} = {value}")  # Debugging
-            metadata[key] = value
-
-        # Handle script source links
-        if "external_source" in metadata:
-            # For external scripts, use the original source
-            metadata["script_source"] = metadata["external_source"]
-        else:
-            # For local scripts, use the GitHub Pages URL
-            relative_path = os.path.relpath(file_path, BASE_DIR)
-            metadata["script_source"] = f"{SITE_CONFIG['base_url']}/{relative_path}"
-
-        # Handle cover image
-        if not metadata.get("cover_image"):
-            # Check for local cover.png
-            cover_path = os.path.join(os.path.dirname(file_path), "cover.png")
-            if os.path.exists(cover_path):
-                relative_cover = os.path.relpath(cover_path, BASE_DIR)
-                metadata["cover_image"] = f"{SITE_CONFIG['base_url']}/{relative_cover}"
-
-    print(f"Metadata extracted from {file_path}: {metadata}")
+def parse_metadata(content, file_path):
+    """Parse the PEP 723 ``# /// script`` block of a script's source with tomllib.
+
+    Raises MetadataError, carrying the file and line, if the block is not valid TOML.
+    """
+    # Fast path: skip the regex entirely for scripts without a metadata block
+    if "# /// script" not in content:
+        logger.debug("No metadata block in %s", file_path)
+        return {}
+
+    matches = list(METADATA_BLOCK_RE.finditer(content))
+    if not matches:
+        logger.debug("No well-formed metadata block in %s", file_path)
+        return {}
+    if len(matches) > 1:
+        line = content.count("\n", 0, matches[1].start()) + 1
+        raise MetadataError("multiple '# /// script' blocks", file_path, line)
+
+    match = matches[0]
+    first_line = content.count("\n", 0, match.start("content")) + 1
+    toml_text = "".join(
+        line[2:] if line.startswith("# ") else line[1:]
+        for line in match.group("content").splitlines(keepends=True)
+    )
+    try:
+        metadata = tomllib.loads(toml_text)
+    except tomllib.TOMLDecodeError as e:
+        message = getattr(e, "msg", None) or str(e)
+        toml_line = getattr(e, "lineno", None)
+        location = re.search(r" \(at line (\d+), column \d+\)$", message)
+        if location:
+            toml_line = toml_line or int(location.group(1))
+            message = message[:location.start()]
+        line = first_line + toml_line - 1 if toml_line else first_line
+        raise MetadataError(message, file_path, line) from e
+
+    # Opt-in memoization of MCP tool results (see ResultCache in mcp_runtime.py)
+    if not isinstance(metadata.get("cacheable", False), bool):
+        key_line = re.search(r"(?m)^cacheable\s*=", toml_text)
+        line = first_line + toml_text.count("\n", 0, key_line.start()) if key_line else first_line
+        raise MetadataError("'cacheable' must be true or false", file_path, line)
+
+    # PEP 723 spells it requires-python; the templates use an identifier-friendly name
+    if "requires-python" in metadata:
+        metadata.setdefault("requires_python", metadata["requires-python"])
+
+    # Handle script source links
+    if "external_source" in metadata:
+        # For external scripts, use the original source
+        metadata["script_source"] = metadata["external_source"]
+    else:
+        # For local scripts, use the GitHub Pages URL
+        relative_path = os.path.relpath(file_path, BASE_DIR)
+        metadata["script_source"] = f"{SITE_CONFIG['base_url']}/{relative_path}"
+
+    # Handle cover image
+    if not metadata.get("cover_image"):
+        # Check for local cover.png
+        cover_path = os.path.join(os.path.dirname(file_path), "cover.png")
+        if os.path.exists(cover_path):
+            relative_cover = os.path.relpath(cover_path, BASE_DIR)
+            metadata["cover_image"] = f"{SITE_CONFIG['base_url']}/{relative_cover}"
+
+    logger.debug("Metadata extracted from %s: %s", file_path, metadata)
     return metadata
 
 
@@ -1276,15 +2059,13 @@ def copy_files(source_dir, target_dir, extensions=None):
         extensions = []
     os.makedirs(target_dir, exist_ok=True)
     
-    # Add debug logging
-    print(f"Debug: Copying files from {source_dir} to {target_dir}")
-    print(f"Debug: Looking for extensions: {extensions}")
-    
+    logger.debug("Copying %s files from %s to %s", extensions, source_dir, target_dir)
+
     for file_name in os.listdir(source_dir):
         if any(file_name.endswith(ext) for ext in extensions):
             source_path = os.path.join(source_dir, file_name)
             target_path = os.path.join(target_dir, file_name)
-            print(f"Debug: Copying {source_path} to {target_path}")
+            logger.debug("Copying %s to %s", source_path, target_path)
             shutil.copy2(source_path, target_path)
 
 def format_metadata(metadata):
@@ -1300,16 +2081,354 @@ def format_metadata(metadata):
         formatted[formatted_key] = formatted_value
     return formatted
 
-def generate_sitemap_txt(solutions, static_dir):
-    sitemap_path = os.path.join(static_dir, "sitemap.txt")
-    with open(sitemap_path, "w") as f:
-        for solution in solutions:
-            group_name = solution["link"].split("/")[0]
-            solution_name = solution["name"]
-            description = solution["description"]
-            url = f"{SITE_CONFIG['base_url']}/{solution['link']}"
-            f.write(f"Group: {group_name}\nName: {solution_name}\nDescription: {description}\nURL: {url}\n\n")
+def search_index_text(solution, field):
+    """Return the searchable text of one field of a solution record."""
+    value = solution.get(field) or ""
+    if field == "dependencies":
+        # Index package names only, not version specifiers
+        value = [re.split(r"[\s<>=!~;\[(]", dependency, maxsplit=1)[0] for dependency in value]
+    if isinstance(value, list):
+        value = " ".join(str(item) for item in value)
+    return str(value).lower()
+
+def compact_json(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def write_json_asset(static_dir, name, data):
+    """Write compact JSON to static_dir; returns its URL with a cache-busting version."""
+    text = compact_json(data)
+    with open(os.path.join(static_dir, name), "w", encoding="utf-8") as f:
+        f.write(text)
+    version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    return f"{name}?v={version}"
+
+class StreamedAsset:
+    """A generated file written piece by piece and published atomically by close().
+
+    close() returns the file's URL with a cache-busting version, like
+    write_json_asset() does for the same content.
+    """
+
+    def __init__(self, static_dir, name):
+        self.name = name
+        self.path = os.path.join(static_dir, name)
+        self._file = open(self.path + ".tmp", "w", encoding="utf-8")
+        self._digest = hashlib.sha256()
+
+    def write(self, text):
+        self._file.write(text)
+        self._digest.update(text.encode("utf-8"))
+
+    def close(self):
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+        return f"{self.name}?v={self._digest.hexdigest()[:12]}"
+
+def published_asset_url(directory, name):
+    """The URL StreamedAsset returned for ``name`` when an earlier build wrote it."""
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        return name
+    return f"{name}?v={hash_file(path)[:12]}"
+
+class RecordSpool:
+    """Records appended to a temporary JSON Lines file; iterating reads them back in order."""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+    def append(self, record):
+        self._file.write(compact_json(record) + "\n")
+
+    def __iter__(self):
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+class SitemapWriter:
+    """Streams sitemap.xml: the home page, every group page and every solution page.
+
+    Each solution page's lastmod is the time its content last changed, and a
+    group's (or the home page's) is the latest of the solutions below it.
+    Solutions arrive in link order, so the URLs of each top-level group are
+    contiguous; they are spooled as one shard per group, split every
+    SITEMAP_MAX_URLS. Up to SITEMAP_MAX_URLS URLs in all, sitemap.xml lists
+    them; beyond that it is a sitemap index of the shards, whose names are
+    stable, so a change only touches its own group's shard. A file whose
+    content did not change is not rewritten.
+    """
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self._spool = tempfile.TemporaryFile()
+        self._shards = []  # {"key", "part", "start", "end", "count", "lastmod"}
+        self._groups = []  # [name, lastmod] of the groups on the current path
+        self._lastmod = ""
+        self._count = 0
+
+    def add(self, solution):
+        path = solution["link"].split("/")[:-1]
+        lastmod = solution.get("lastmod", "")
+        depth = 0
+        while depth < min(len(path), len(self._groups)) and self._groups[depth][0] == path[depth]:
+            depth += 1
+        while len(self._groups) > depth:
+            self._close_group()
+        while len(self._groups) < len(path):
+            self._groups.append([path[len(self._groups)], ""])
+        for group in self._groups:
+            group[1] = max(group[1], lastmod)
+        self._lastmod = max(self._lastmod, lastmod)
+        self._add_url(f"{solution['link']}/", lastmod, path[0])
+
+    def _close_group(self):
+        names = [name for name, _ in self._groups]
+        _, lastmod = self._groups.pop()
+        self._add_url("/".join(names) + "/", lastmod, names[0])
+
+    def _add_url(self, path, lastmod, key):
+        shard = self._shards[-1] if self._shards else None
+        if shard is None or shard["key"] != key or shard["count"] >= SITEMAP_MAX_URLS:
+            part = shard["part"] + 1 if shard is not None and shard["key"] == key else 1
+            shard = {"key": key, "part": part, "start": self._spool.tell(), "count": 0, "lastmod": ""}
+            self._shards.append(shard)
+        url = f"{SITE_CONFIG['base_url']}/{urllib.parse.quote(path)}"
+        entry = f"<url><loc>{html.escape(url)}</loc>"
+        if lastmod:
+            entry += f"<lastmod>{lastmod}</lastmod>"
+        self._spool.write(f"{entry}</url>\n".encode("utf-8"))
+        shard["end"] = self._spool.tell()
+        shard["count"] += 1
+        shard["lastmod"] = max(shard["lastmod"], lastmod)
+        self._count += 1
+
+    def _shard_name(self, shard):
+        if shard["key"] is None:
+            return "sitemap-root.xml"
+        name = hashlib.sha256(shard["key"].encode()).hexdigest()[:12]
+        return f"sitemap-{name}.xml" if shard["part"] == 1 else f"sitemap-{name}-{shard['part']}.xml"
+
+    def _urls(self, shards):
+        for shard in shards:
+            self._spool.seek(shard["start"])
+            remaining = shard["end"] - shard["start"]
+            while remaining:
+                chunk = self._spool.read(min(remaining, 1 << 16))
+                remaining -= len(chunk)
+                yield chunk
+
+    def _publish(self, name, chunks):
+        """Write ``name`` unless its content is unchanged; returns whether it was written."""
+        path = os.path.join(self.static_dir, name)
+        digest = hashlib.sha256()
+        with open(path + ".tmp", "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+        if os.path.exists(path) and hash_file(path) == digest.hexdigest():
+            os.remove(path + ".tmp")
+            return False
+        os.replace(path + ".tmp", path)
+        return True
+
+    def close(self):
+        """Publish the sitemap; returns the names of the files left as they were."""
+        while self._groups:
+            self._close_group()
+        self._add_url("", self._lastmod, None)  # The home page
+
+        urlset_start = b'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        urlset_end = b"</urlset>\n"
+        files = {}  # File name -> the shards it lists, or the text of the sitemap index
+        if self._count <= SITEMAP_MAX_URLS:
+            files[SITEMAP] = self._shards
+        else:
+            index = []
+            for shard in self._shards:
+                name = self._shard_name(shard)
+                files[name] = [shard]
+                url = html.escape(f"{SITE_CONFIG['base_url']}/{name}")
+                lastmod = f"<lastmod>{shard['lastmod']}</lastmod>" if shard["lastmod"] else ""
+                index.append(f"<sitemap><loc>{url}</loc>{lastmod}</sitemap>\n")
+            files[SITEMAP] = (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                + "".join(index) + "</sitemapindex>\n"
+            )
+
+        unchanged = set()
+        for name, content in files.items():
+            if isinstance(content, str):
+                chunks = [content.encode("utf-8")]
+            else:
+                chunks = itertools.chain([urlset_start], self._urls(content), [urlset_end])
+            if not self._publish(name, chunks):
+                unchanged.add(name)
+        self._spool.close()
+
+        # Shards of groups that are gone, and the text sitemap of earlier versions
+        for file_name in os.listdir(self.static_dir):
+            if SITEMAP_FILE_RE.match(file_name) and file_name not in files:
+                os.remove(os.path.join(self.static_dir, file_name))
+        logger.info("Sitemap lists %d URLs in %d file(s), %d unchanged", self._count, len(files), len(unchanged))
+        return unchanged
+
+class SearchIndexWriter:
+    """Streams the inverted index from tokens to (card, weight) postings.
+
+    Postings are flattened as ``[doc, weight, doc, weight, ...]`` where ``doc``
+    is the position of the solution on the index page and ``weight`` is the
+    highest SEARCH_FIELD_WEIGHTS value of a field containing the token. Docs are
+    written as solutions arrive; postings are kept as compact integer arrays
+    until close() writes the terms in sorted order.
+    """
 
+    def __init__(self, static_dir):
+        self._asset = StreamedAsset(static_dir, SEARCH_INDEX)
+        self._asset.write('{"docs":[')
+        self._terms = {}
+        self._docs = 0
+
+    def add(self, solution):
+        weights = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for token in SEARCH_TOKEN_RE.findall(search_index_text(solution, field)):
+                weights[token] = max(weights.get(token, 0), weight)
+        for token, weight in weights.items():
+            self._terms.setdefault(token, array("I")).extend((self._docs, weight))
+        self._asset.write(("," if self._docs else "") + compact_json(solution["link"]))
+        self._docs += 1
+
+    def close(self):
+        self._asset.write('],"terms":{')
+        for position, token in enumerate(sorted(self._terms)):
+            postings = self._terms.pop(token).tolist()
+            self._asset.write(("," if position else "") + f"{compact_json(token)}:{compact_json(postings)}")
+        self._asset.write("}}")
+        return self._asset.close()
+
+class CatalogWriter:
+    """Streams catalog.json, one row of CATALOG_FIELDS per card."""
+
+    def __init__(self, static_dir):
+        self._asset = StreamedAsset(static_dir, CATALOG)
+        self._asset.write('{"fields":' + compact_json(CATALOG_FIELDS) + ',"items":[')
+        self._items = 0
+
+    def add(self, solution):
+        images = solution.get("cover_images") or {}
+        row = [solution.get(field) or images.get(field) or "" for field in CATALOG_FIELDS]
+        self._asset.write(("," if self._items else "") + compact_json(row))
+        self._items += 1
+
+    def close(self):
+        self._asset.write("]}")
+        return self._asset.close()
+
+class GroupPages:
+    """Writes an index page and a catalog shard for every group as the build leaves it.
+
+    Solutions arrive in link order, so those of a group, nested groups
+    included, are contiguous, and only the groups on the path to the current
+    solution are open. A group page links its direct subgroups with their
+    counts and lists every solution below it: the first screen of cards is in
+    the HTML and the rest is windowed from the group's catalog.json shard,
+    like the "virtual" index mode. close() returns the top-level groups.
+
+    With ``only``, a set of group paths, the pages of other groups are left as
+    the previous build wrote them; those groups are still counted.
+    """
+
+    def __init__(self, static_dir, assets, compressor=None, only=None):
+        self.static_dir = static_dir
+        self.assets = assets
+        self.compressor = compressor
+        self.only = only
+        self._open = []
+        self._groups = []
+
+    def add(self, solution):
+        path = solution["link"].split("/")[:-1]
+        depth = 0
+        while depth < min(len(path), len(self._open)) and self._open[depth]["name"] == path[depth]:
+            depth += 1
+        while len(self._open) > depth:
+            self._close_group()
+        while len(self._open) < len(path):
+            self._open_group("/".join(path[:len(self._open) + 1]))
+        for group in self._open:
+            group["count"] += 1
+            if group["catalog"] is None:
+                continue
+            group["catalog"].add(solution)
+            if len(group["cards"]) < INDEX_FIRST_SCREEN:
+                group["cards"].append({field: solution.get(field) for field in INDEX_CARD_FIELDS})
+
+    def close(self):
+        while self._open:
+            self._close_group()
+        return self._groups
+
+    def _open_group(self, group_path):
+        group_output = os.path.join(self.static_dir, group_path)
+        catalog = None
+        if self.only is None or group_path in self.only:
+            os.makedirs(group_output, exist_ok=True)
+            catalog = CatalogWriter(group_output)
+        self._open.append({
+            "path": group_path,
+            "name": group_path.rsplit("/", 1)[-1],
+            "catalog": catalog,
+            "cards": [],
+            "subgroups": [],
+            "count": 0,
+        })
+
+    def _close_group(self):
+        group = self._open.pop()
+        group_output = os.path.join(self.static_dir, group["path"])
+        if group["catalog"] is not None:
+            catalog_url = group["catalog"].close()
+            self._render(group, group_output, catalog_url)
+        elif self._open and self._open[-1]["catalog"] is None:
+            return  # Only listed on its parent's page, which is not written either
+        else:
+            catalog_url = published_asset_url(group_output, CATALOG)
+        summary = {
+            "name": group["name"],
+            "url": f"{group['name']}/index.html",
+            "count": group["count"],
+            "shard": f"{group['name']}/{catalog_url}",
+        }
+        (self._open[-1]["subgroups"] if self._open else self._groups).append(summary)
+
+    def _render(self, group, group_output, catalog_url):
+        parts = group["path"].split("/")
+        root = root_path(group["path"])
+        breadcrumbs = [{"name": "Home", "url": f"{root}index.html"}]
+        for depth, name in enumerate(parts[:-1], start=1):
+            breadcrumbs.append({"name": name, "url": "../" * (len(parts) - depth) + "index.html"})
+        breadcrumbs.append({"name": group["name"], "url": ""})
+        render_to_file(
+            "index.html",
+            os.path.join(group_output, "index.html"),
+            solutions=group["cards"],
+            groups=group["subgroups"],
+            breadcrumbs=breadcrumbs,
+            group=group["path"],
+            site_config=SITE_CONFIG,
+            root=root,
+            assets=self.assets,
+            search_index_url="",
+            index_mode="virtual",
+            catalog_url=catalog_url,
+        )
+        if self.compressor is not None:
+            for file_name in ("index.html", CATALOG):
+                self.compressor.add(os.path.join(group_output, file_name))
 
 def sanitize_function_name(name):
     """Sanitize a string to make it a valid Python function name."""
@@ -1328,10 +2447,13 @@ def extract_typer_commands_with_ast(file_path):
     Returns:
         list: List of dictionaries containing command name and arguments.
     """
+    return load_script_record(file_path).commands
+
+def parse_typer_commands(source, file_path):
+    """Extract Typer commands from already-read source; see extract_typer_commands_with_ast."""
     commands = []
 
-    with open(file_path, "r") as f:
-        tree = ast.parse(f.read(), filename=file_path)
+    tree = ast.parse(source, filename=file_path)
 
     for node in ast.walk(tree):
         # Look for function definitions with Typer `@app.command()` decorators
@@ -1355,6 +2477,7 @@ def extract_typer_commands_with_ast(file_path):
                         arg_name = arg.arg
                         arg_type = "str"  # Default to `str` if no type annotation
                         default_value = None
+                        kind = "argument"  # Typer: parameters without a default are CLI arguments
 
                         if arg.annotation:
                             try:
@@ -1364,9 +2487,22 @@ def extract_typer_commands_with_ast(file_path):
 
                         # Match argument with default if within range
                         if i >= defaults_start:
+                            default_node = node.args.defaults[i - defaults_start]
+                            kind = "option"
+                            # typer.Option(default, ...) / typer.Argument(default, ...)
+                            if isinstance(default_node, ast.Call):
+                                func = default_node.func
+                                func_name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", "")
+                                if func_name == "Argument":
+                                    kind = "argument"
+                                if default_node.args:
+                                    default_node = default_node.args[0]
+                                else:
+                                    default_node = next(
+                                        (k.value for k in default_node.keywords if k.arg == "default"), None
+                                    )
                             try:
-                                default_index = i - defaults_start
-                                default_value = ast.literal_eval(node.args.defaults[default_index])
+                                default_value = ast.literal_eval(default_node)
                             except Exception:
                                 default_value = None  # Fallback if evaluation fails
 
@@ -1374,6 +2510,7 @@ def extract_typer_commands_with_ast(file_path):
                             "name": arg_name,
                             "type": arg_type,
                             "default": default_value,
+                            "kind": kind,
                         })
 
                     commands.append({
@@ -1383,246 +2520,1696 @@ def extract_typer_commands_with_ast(file_path):
 
     return commands
 
-def generate_mcp_tool_definitions_with_ast(solutions):
-    tool_definitions = []
-    base_url = SITE_CONFIG['base_url']
-
+def annotation_schema(annotation):
+    """JSON Schema for a Typer parameter annotation, e.g. ``Optional[List[int]]``."""
+    match = OPTIONAL_TYPE_RE.match(annotation.strip())
+    if match:
+        annotation = match.group(1) or match.group(2)
+    match = LIST_TYPE_RE.match(annotation.strip())
+    if match:
+        return {"type": "array", "items": annotation_schema(match.group(1))}
+    return {"type": SCHEMA_TYPES.get(annotation.strip().rsplit(".", 1)[-1], "string")}
+
+def tool_input_schema(arguments):
+    """JSON Schema of a tool's input, from the arguments extracted by parse_typer_commands."""
+    properties = {}
+    required = []
+    for arg in arguments:
+        schema = annotation_schema(arg["type"])
+        if arg["default"] is not None:
+            schema["default"] = arg["default"]
+        elif arg.get("kind", "option") == "argument":
+            required.append(arg["name"])
+        properties[arg["name"]] = schema
+    schema = {"type": "object", "properties": properties}
+    if required:
+        schema["required"] = required
+    return schema
+
+def mcp_manifest_entries(solution, script):
+    """The script entry and tools a solution contributes to the tool manifest.
+
+    ``script`` is the position of the script entry, which the tools refer to.
+    Local scripts get one tool per Typer command. External scripts get a single
+    ``<name>_run`` tool that runs the script from the server's script cache.
+    Commands were extracted once when each solution was built (or come from the
+    build manifest), so no script is parsed again here.
+    """
+    sanitized_function_name = sanitize_function_name(os.path.basename(solution["link"]))
+
+    if solution.get("external_source"):
+        entry = {
+            "url": solution["external_source"],
+            "sha256": solution.get("external_sha256") or None,
+            "external": True,
+            "cacheable": solution.get("cacheable", False),
+        }
+        return entry, [{
+            "name": f"{sanitized_function_name}_run",
+            "description": (
+                f"Run external script: {solution['name']}\n\n"
+                f"This script is sourced from: {solution['external_source']}"
+            ),
+            "inputSchema": {"type": "object", "properties": {}},
+            "script": script,
+            "command": None,
+            "arguments": [],
+        }]
+
+    # The published script is this exact file, so its hash doubles as a pin
+    # and lets the server run a verified local copy (see ScriptCache.fetch)
+    entry = {
+        "url": solution["script_source"],
+        "path": solution.get("script_path"),
+        "sha256": solution.get("script_sha256"),
+        "external": False,
+        "cacheable": solution.get("cacheable", False),
+    }
+    commands = solution.get("commands", [])
+    tools = []
+    for command in commands:
+        tools.append({
+            "name": f"{sanitized_function_name}_{command['command_name']}",
+            "description": f"{solution['name']}\n\n{solution['description']}",
+            "inputSchema": tool_input_schema(command["arguments"]),
+            "script": script,
+            # Typer runs a lone command directly; with several, the name selects one
+            "command": command["command_name"].replace("_", "-") if len(commands) > 1 else None,
+            "arguments": [
+                {"name": arg["name"], "kind": arg.get("kind", "option")}
+                for arg in command["arguments"]
+            ],
+        })
+    return entry, tools
+
+def build_mcp_manifest(solutions, source_root="."):
+    """The tool manifest served by mcp_server.py.
+
+    ``source_root`` is the source checkout relative to the site, where the
+    server also looks for local scripts. See mcp_manifest_entries().
+    """
+    scripts = []
+    tools = []
     for solution in solutions:
-        if 'external_source' in solution and solution['external_source']:
-            solution_name = os.path.basename(os.path.dirname(solution['link']))
-            sanitized_function_name = sanitize_function_name(solution_name)
-            
-            tool_definition = f"""\\
-@mcp.tool()
-def {sanitized_function_name}_run():
-    \\"\\"\\"
-    Run external script: {solution['name']}
-    
-    This script is sourced from: {solution['external_source']}
-    \\"\\"\\"
-    import subprocess
-    import threading
-    import tempfile
-    import urllib.request
-    
-    def run_command():
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as tmp:
-            try:
-                urllib.request.urlretrieve('{solution['external_source']}', tmp.name)
-                command = "uv run " + tmp.name
-                result = subprocess.run(command, shell=True, capture_output=True, text=True)
-                if result.returncode != 0:
-                    print("Command failed with error: " + result.stderr) 
-                else:
-                    print("Command output: " + result.stdout.strip())
-            finally:
-                os.unlink(tmp.name)
-    
-    thread = threading.Thread(target=run_command, daemon=True)
-    thread.start()
-    return "Command is running in the background."
-"""
-            tool_definitions.append(tool_definition)
-            continue
+        entry, solution_tools = mcp_manifest_entries(solution, len(scripts))
+        scripts.append(entry)
+        tools.extend(solution_tools)
+
+    return {
+        "name": SITE_CONFIG["project_name"],
+        "source_root": source_root,
+        "scripts": scripts,
+        "tools": tools,
+    }
+
+class McpManifestWriter:
+    """Streams the same tool manifest as build_mcp_manifest(), one solution at a time.
+
+    Script entries are written as solutions arrive; tools, which follow all
+    scripts in the file, are spooled to disk until close().
+    """
+
+    def __init__(self, static_dir, source_root="."):
+        self._asset = StreamedAsset(static_dir, TOOL_MANIFEST)
+        self._asset.write(
+            '{"name":' + compact_json(SITE_CONFIG["project_name"])
+            + ',"source_root":' + compact_json(source_root) + ',"scripts":['
+        )
+        self._tools = RecordSpool()
+        self._scripts = 0
+
+    def add(self, solution):
+        entry, tools = mcp_manifest_entries(solution, self._scripts)
+        self._asset.write(("," if self._scripts else "") + compact_json(entry))
+        self._scripts += 1
+        for tool in tools:
+            self._tools.append(tool)
+
+    def close(self):
+        self._asset.write('],"tools":[')
+        for position, tool in enumerate(self._tools):
+            self._asset.write(("," if position else "") + compact_json(tool))
+        self._tools.close()
+        self._asset.write("]}")
+        return self._asset.close()
+
+def external_script_cache(offline=False):
+    """The build's cache of external scripts, shared with the MCP server runtime."""
+    return ScriptCache(os.path.join(CACHE_DIR, "external"), offline=offline)
+
+def download_external_script(url, output_path, original_metadata):
+    """Copy an external script to ``output_path`` through the script cache, honouring a sha256 pin."""
+    path = external_script_cache().fetch(url, sha256=original_metadata.get("sha256"))
+    shutil.copyfile(path, output_path)
+
+def prefetch_external_scripts(solutions, offline=False):
+    """Download or revalidate every external script concurrently, verifying sha256 pins.
 
-        # Use script_source instead of uv_command
-        solution_dir = os.path.dirname(solution["script_source"].replace(f"{base_url}/", ""))
-        solution_path = os.path.join(BASE_DIR, solution_dir)
-        
-        if not os.path.exists(solution_path):
-            print(f"Directory not found: {solution_path}. Skipping.")
+    Failures are logged rather than raised, so a build does not depend on the
+    availability of third-party hosts.
+    """
+    sources = {
+        s["external_source"]: s.get("external_sha256") or None
+        for s in solutions
+        if s.get("external_source")
+    }
+    if not sources:
+        return
+    results = external_script_cache(offline=offline).prefetch(sources.items())
+    failed = 0
+    for result in results.values():
+        if isinstance(result, IntegrityError):
+            logger.error("%s", result)
+        elif isinstance(result, Exception):
+            logger.warning("%s", result)
+        else:
             continue
+        failed += 1
+    logger.info("Prefetched %d of %d external scripts", len(sources) - failed, len(sources))
+
+def get_cover_image_path(solution_path, group_name, solution_name, metadata, site_config):
+    """Helper function to consistently resolve cover image paths."""
+    if os.path.exists(os.path.join(solution_path, COVER_IMAGE)):
+        return f"{site_config['base_url']}/{group_name}/{solution_name}/{COVER_IMAGE}"
+    elif "cover_image" in metadata:
+        return metadata["cover_image"]
+    return None
 
-        python_files = sorted(
-            [f for f in os.listdir(solution_path) if f.endswith(".py")],
-            reverse=True,
+# Compiled templates shared by every page of a build (one per worker process)
+_ENVIRONMENT = None
+
+def jinja_environment():
+    """Return the shared Environment, compiling each template once and caching bytecode on disk."""
+    global _ENVIRONMENT
+    if _ENVIRONMENT is None:
+        bytecode_dir = os.path.join(CACHE_DIR, "jinja")
+        os.makedirs(bytecode_dir, exist_ok=True)
+        _ENVIRONMENT = Environment(
+            # Minifying the template text minifies every page without buffering it
+            loader=DictLoader({
+                "index.html": minify_html(INDEX_TEMPLATE),
+                "solution.html": minify_html(SOLUTION_TEMPLATE),
+                "source.html": minify_html(SOURCE_TEMPLATE),
+            }),
+            bytecode_cache=FileSystemBytecodeCache(bytecode_dir),
+            trim_blocks=True,
+        )
+        _ENVIRONMENT.globals["icon"] = render_icon
+    return _ENVIRONMENT
+
+def render_to_file(template_name, output_path, **context):
+    """Stream a template into output_path without building the whole page in memory."""
+    template = jinja_environment().get_template(template_name)
+    with open(output_path, "w") as f:
+        template.stream(**context).dump(f)
+
+def supported_cover_formats():
+    """Return the COVER_FORMATS the installed Pillow can encode."""
+    formats = []
+    for image_format in COVER_FORMATS:
+        try:
+            if features.check_module(image_format):
+                formats.append(image_format)
+        except ValueError:  # Feature unknown to this Pillow version
+            pass
+    return formats
+
+def encode_cover_variants(cover_path, output_dir, settings):
+    """Write resized variants of a cover into output_dir and return their description."""
+    os.makedirs(output_dir, exist_ok=True)
+    with Image.open(cover_path) as image:
+        image.load()
+        width, height = image.size
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    stem = os.path.splitext(COVER_IMAGE)[0]
+    variants = []
+    widths = sorted({min(w, width) for w in settings["widths"]})
+    for variant_width in widths:
+        variant_height = max(1, round(height * variant_width / width))
+        resized = image if variant_width == width else image.resize(
+            (variant_width, variant_height), Image.LANCZOS
+        )
+        # A single PNG thumbnail is enough for browsers without modern formats
+        fallback = ["png"] if variant_width == widths[0] else []
+        for image_format in settings["formats"] + fallback:
+            file_name = f"{stem}-{variant_width}w.{image_format}"
+            options = {"optimize": True} if image_format == "png" else {"quality": settings["quality"]}
+            resized.save(os.path.join(output_dir, file_name), format=image_format.upper(), **options)
+            variants.append({"file": file_name, "format": image_format, "width": variant_width})
+
+    # Low-quality placeholder, inlined as a data URI and shown until the real image loads
+    lqip_height = max(1, round(height * settings["lqip"] / width))
+    placeholder = image.resize((settings["lqip"], lqip_height), Image.BILINEAR)
+    placeholder = placeholder.filter(ImageFilter.GaussianBlur(1))
+    lqip_format = "webp" if "webp" in settings["formats"] else "png"
+    buffer = io.BytesIO()
+    placeholder.save(buffer, format=lqip_format.upper(), quality=30)
+    lqip = f"data:image/{lqip_format};base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    return {"width": width, "height": height, "variants": variants, "lqip": lqip}
+
+def build_cover_images(cover_path, solution_output, cover_url_base):
+    """Publish thumbnails and modern-format variants of a cover image.
+
+    Encoding happens once per source image and settings: the results are cached
+    in CACHE_DIR/images under their hash and only copied on later builds.
+    Returns the template context for the image (sources, srcset, size and
+    placeholder), or None when Pillow is unavailable or the image is unreadable.
+    """
+    if Image is None:
+        return None
+
+    settings = {
+        "widths": COVER_WIDTHS,
+        "formats": supported_cover_formats(),
+        "quality": COVER_QUALITY,
+        "lqip": LQIP_WIDTH,
+    }
+    key = hashlib.sha256(
+        (hash_file(cover_path) + json.dumps(settings, sort_keys=True)).encode()
+    ).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, "images", key)
+    info_path = os.path.join(cache_path, "info.json")
+
+    if os.path.exists(info_path):
+        with open(info_path, "r") as f:
+            info = json.load(f)
+    else:
+        # Encode into a private directory, then publish it atomically
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            info = encode_cover_variants(cover_path, tmp_path, settings)
+        except (OSError, ValueError) as e:
+            logger.error("Could not process cover image %s: %s", cover_path, e)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return None
+        with open(os.path.join(tmp_path, "info.json"), "w") as f:
+            json.dump(info, f)
+        try:
+            os.rename(tmp_path, cache_path)
+        except OSError:  # Another worker published the same image first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        logger.debug("Encoded %d cover variants for %s", len(info["variants"]), cover_path)
+
+    # Drop variants of a previous cover that this one does not produce
+    published = {variant["file"] for variant in info["variants"]}
+    stem = re.escape(os.path.splitext(COVER_IMAGE)[0])
+    for file_name in os.listdir(solution_output):
+        if re.fullmatch(rf"{stem}-\d+w\.\w+", file_name) and file_name not in published:
+            os.remove(os.path.join(solution_output, file_name))
+
+    srcsets = {}
+    for variant in info["variants"]:
+        shutil.copy2(os.path.join(cache_path, variant["file"]), solution_output)
+        srcsets.setdefault(variant["format"], []).append(
+            f"{cover_url_base}/{variant['file']} {variant['width']}w"
         )
-        if not python_files:
-            continue
 
-        latest_python_file = os.path.join(solution_path, python_files[0])
-        
+    # The single PNG variant is the smallest width; client-rendered cards show it
+    # in a plain <img>, so it is also the thumbnail
+    fallback = [v for v in info["variants"] if v["format"] == "png"]
+    return {
+        "width": info["width"],
+        "height": info["height"],
+        "sources": [
+            {"type": f"image/{image_format}", "srcset": ", ".join(srcsets[image_format])}
+            for image_format in settings["formats"]
+            if image_format in srcsets
+        ],
+        "src": f"{cover_url_base}/{fallback[0]['file']}",
+        "srcset": ", ".join(srcsets["png"]),
+        "thumbnail": f"{cover_url_base}/{fallback[0]['file']}",
+        "lqip": info["lqip"],
+    }
+
+def source_formatter():
+    """The Pygments formatter used for source.html: a line-number table with linkable lines."""
+    return HtmlFormatter(
+        linenos="table",
+        lineanchors="L",
+        anchorlinenos=True,
+        wrapcode=True,
+        style=HIGHLIGHT_STYLE,
+    )
+
+def minify_css(css):
+    """Strip comments and insignificant whitespace from a stylesheet."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+def scope_selector(selector, scope):
+    """Restrict one selector to pages whose <body> has the scope class."""
+    if selector in (":root", "html"):
+        return scope
+    if selector == "*":
+        return f"{scope},{scope} *"
+    if selector.startswith("body"):
+        return "body" + scope + selector[len("body"):]
+    return f"{scope} {selector}"
+
+def scope_css(css, scope):
+    """Prefix every selector of a minified stylesheet, recursing into @media blocks."""
+    scoped = []
+    depth = 0
+    start = 0
+    prelude_end = 0
+    for i, char in enumerate(css):
+        if char == "{":
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                prelude = css[start:prelude_end]
+                body = css[prelude_end + 1:i]
+                if prelude.startswith("@"):
+                    body = scope_css(body, scope)
+                else:
+                    prelude = ",".join(
+                        scope_selector(selector.strip(), scope) for selector in prelude.split(",")
+                    )
+                scoped.append(prelude + "{" + body + "}")
+                start = i + 1
+    return "".join(scoped)
+
+def site_stylesheet():
+    """Combine every page's CSS into one minified stylesheet.
+
+    Each page keeps exactly the rules it had inline, scoped by the class on its
+    <body>, so pages with conflicting rules can share a file.
+    """
+    parts = [minify_css(COMMON_CSS)]
+    for scope, css in (
+        (".page-index", INDEX_CSS),
+        (".page-solution", SOLUTION_CSS),
+        (".page-source", SOURCE_CSS + highlight_css()),
+    ):
+        parts.append(scope_css(minify_css(css), scope))
+    return "\n".join(parts) + "\n"
+
+def used_icons():
+    """Names of the ICONS referenced by the templates and scripts."""
+    sources = [INDEX_TEMPLATE, SOLUTION_TEMPLATE, SOURCE_TEMPLATE, CARDS_JS]
+    pattern = re.compile(r"icon(?:Html)?\(\s*['\"]([\w-]+)['\"]")
+    return sorted({name for source in sources for name in pattern.findall(source)})
+
+def icon_sprite(names):
+    """An SVG sprite with one <symbol> per icon, referenced as sprite.svg#name."""
+    symbols = "".join(
+        f'<symbol id="{name}" viewBox="0 0 24 24">{ICONS[name]}</symbol>' for name in names
+    )
+    return f'<svg xmlns="http://www.w3.org/2000/svg">{symbols}</svg>\n'
+
+def minify_html(text):
+    """Drop indentation and blank lines, leaving <pre>, <textarea> and <script> contents intact."""
+    minified = []
+    position = 0
+    for match in PRESERVE_WHITESPACE_RE.finditer(text):
+        minified.append(re.sub(r"\s*\n\s*", "\n", text[position:match.start()]))
+        minified.append(match.group(0))
+        position = match.end()
+    minified.append(re.sub(r"\s*\n\s*", "\n", text[position:]))
+    return "".join(minified)
+
+def write_fingerprinted_asset(static_dir, file_name, content, compressor=None):
+    """Write content as _assets/<stem>.<hash><ext>; returns the path relative to the site root.
+
+    The name changes with the content, so an existing file is left alone and a
+    new one is handed to ``compressor``, if any, once.
+    """
+    stem, ext = os.path.splitext(file_name)
+    data = content.encode("utf-8")
+    name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+    path = os.path.join(static_dir, ASSETS_DIR, name)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+        if compressor is not None:
+            compressor.add(path)
+    return f"{ASSETS_DIR}/{name}"
+
+def generate_assets(static_dir, compressor=None):
+    """Publish the shared stylesheet, icon sprite and scripts; returns their URLs by role.
+
+    File names carry a content hash, so they can be cached indefinitely; files
+    from earlier builds that are no longer referenced are removed. New files
+    are precompressed with ``compressor``, if given.
+    """
+    os.makedirs(os.path.join(static_dir, ASSETS_DIR), exist_ok=True)
+    sources = {
+        "css": ("site.css", site_stylesheet()),
+        "icons": ("icons.svg", icon_sprite(used_icons())),
+        "search_worker": ("search-worker.js", SEARCH_WORKER_JS),
+        "cards": ("cards.js", CARDS_JS),
+        "virtual_grid": ("virtual-grid.js", VIRTUAL_GRID_JS),
+        "group_search": ("group-search.js", GROUP_SEARCH_JS),
+    }
+    assets = {
+        role: write_fingerprinted_asset(static_dir, file_name, content, compressor)
+        for role, (file_name, content) in sources.items()
+    }
+    published = {os.path.basename(url) for url in assets.values()}
+    prune_assets(os.path.join(static_dir, ASSETS_DIR), published)
+    for assets_dir in LEGACY_ASSETS_DIRS:
+        prune_assets(os.path.join(static_dir, assets_dir), set())
+    return assets
+
+def prune_assets(assets_dir, published):
+    """Remove the fingerprinted files of ``assets_dir`` that are not in ``published``.
+
+    Anything else, such as the pages of a group that took over a legacy assets
+    directory, is left alone; the directory itself goes once it is empty.
+    """
+    if not os.path.isdir(assets_dir):
+        return
+    for entry in os.scandir(assets_dir):
+        if not entry.is_file(follow_symlinks=False) or not ASSET_FILE_RE.match(entry.name):
+            continue
+        stem, ext = os.path.splitext(entry.name)
+        if ext in COMPRESSED_EXTENSIONS:
+            source_name = stem  # Precompressed siblings live as long as their source
+        else:
+            source_name = entry.name
+        if source_name not in published:
+            os.remove(entry.path)
+    if not published and not os.listdir(assets_dir):
+        os.rmdir(assets_dir)
+
+@pass_context
+def render_icon(context, name):
+    """Template global: an inline reference to an icon of the published sprite."""
+    href = f"{context['root']}{context['assets']['icons']}#{name}"
+    return f'<svg class="icon" aria-hidden="true"><use href="{href}"></use></svg>'
+
+def highlight_css():
+    """Return the stylesheet for highlighted source, or an empty string without Pygments."""
+    if pygments is None:
+        return ""
+    return source_formatter().get_style_defs(".highlight")
+
+def plain_source_html(source):
+    """Numbered, escaped source in the same table layout Pygments produces."""
+    lines = source.splitlines() or [""]
+    numbers = "\n".join(
+        f'<span class="normal"><a href="#L-{n}">{n}</a></span>' for n in range(1, len(lines) + 1)
+    )
+    code = "\n".join(
+        f'<a id="L-{n}" name="L-{n}"></a>{html.escape(line, quote=False)}'
+        for n, line in enumerate(lines, start=1)
+    )
+    return (
+        '<div class="highlight"><table class="highlighttable"><tr>'
+        f'<td class="linenos"><div class="linenodiv"><pre>{numbers}</pre></div></td>'
+        f'<td class="code"><div><pre><code>{code}\n</code></pre></div></td>'
+        "</tr></table></div>"
+    )
+
+def highlight_source(record):
+    """Return the highlighted HTML for a script, reusing the cached copy when the source is unchanged."""
+    if pygments is None:
+        return plain_source_html(record.source)
+
+    key = hashlib.sha256(
+        f"{record.sha256}:{pygments.__version__}:{HIGHLIGHT_STYLE}".encode()
+    ).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, "highlight", f"{key}.html")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        pass
+
+    source_html = highlight(record.source, PythonLexer(), source_formatter())
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(source_html)
+    os.replace(tmp_path, cache_path)
+    logger.debug("Highlighted %s", record.path)
+    return source_html
+
+def lock_key(metadata, locking):
+    """Hash of everything a script's lock is resolved from."""
+    inputs = {
+        "requires-python": metadata.get("requires-python", ""),
+        "dependencies": metadata.get("dependencies", []),
+        "tool": metadata.get("tool", {}).get("uv", {}),
+        "index_url": locking.get("index_url") or "",
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+def lock_script(record, metadata, locking):
+    """Return the uv lockfile for a script, resolving it only if its dependencies changed.
+
+    The script's metadata block is locked on its own, so scripts that declare
+    the same dependencies share one cached lock in CACHE_DIR/locks. ``locking``
+    holds ``index_url`` (a package index URL or local directory used instead of
+    PyPI) and ``offline``. Returns None if uv cannot resolve the dependencies.
+    Such a failure is cached next to the locks for LOCK_RETRY_AFTER seconds,
+    or until a --force build, so uv does not run again on every build.
+    """
+    match = METADATA_BLOCK_RE.search(record.source)
+    if match is None:
+        return None
+    key = lock_key(metadata, locking)
+    cache_path = os.path.join(CACHE_DIR, "locks", f"{key}.lock")
+    failure_path = os.path.join(CACHE_DIR, "locks", f"{key}.failed")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        pass
+    try:
+        if time.time() - os.path.getmtime(failure_path) < LOCK_RETRY_AFTER:
+            with open(failure_path, "r", encoding="utf-8") as f:
+                logger.warning("Could not lock %s: %s (cached failure)", record.path, f.read())
+            return None
+    except OSError:
+        pass
+
+    lock, error = resolve_lock(match.group(0), locking)
+    if lock is None:
+        logger.warning("Could not lock %s: %s", record.path, error)
+        # Offline failures only mean uv's cache lacks a package
+        if not locking.get("offline"):
+            write_text_atomic(failure_path, error)
+        return None
+    write_text_atomic(cache_path, lock)
+    if os.path.exists(failure_path):
+        os.remove(failure_path)
+    logger.debug("Locked %s", record.path)
+    return lock
+
+def resolve_lock(block, locking):
+    """Run ``uv lock --script`` on a metadata block; returns ``(lock, None)`` or ``(None, error)``."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stub_path = os.path.join(tmp_dir, "script.py")
+        with open(stub_path, "w", encoding="utf-8") as f:
+            f.write(block + "\n")
+        command = ["uv", "lock", "--quiet", "--script", stub_path]
+        if locking.get("index_url"):
+            command += ["--default-index", locking["index_url"]]
+        if locking.get("offline"):
+            command.append("--offline")
         try:
-            metadata = extract_metadata(latest_python_file)
-            script_title = metadata.get("title", "Untitled Script")
-            script_description = metadata.get("description", "No description provided.")
-            solution_name = os.path.basename(solution_dir)
-            sanitized_function_name = sanitize_function_name(solution_name)
-            typer_commands = extract_typer_commands_with_ast(latest_python_file)
-
-            for command in typer_commands:
-                command_name = command["command_name"]
-                args_def = ", ".join(
-                    f"{arg['name']}: {arg['type']} = {repr(arg['default'])}" if arg["default"] is not None
-                    else f"{arg['name']}: {arg['type']}"
-                    for arg in command["arguments"]
-                )
-                args_cmd = " ".join(
-                    f"--{arg['name']} " + arg['name']
-                    for arg in command["arguments"]
-                )
-                
-                tool_definition = f"""\\
-@mcp.tool()
-def {sanitized_function_name}_{command_name}({args_def}):
-    \\"\\"\\"
-    {script_title}
-
-    {script_description}
-    \\"\\"\\"
-    import subprocess
-    import threading
-
-    def run_command():
-        args = " {args_cmd}"
-        command = "uv run {solution['script_source']}" + args
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+            result = subprocess.run(command, capture_output=True, text=True, timeout=LOCK_TIMEOUT)
+        except (OSError, subprocess.SubprocessError) as e:
+            return None, str(e)
         if result.returncode != 0:
-            print("Command failed with error: " + result.stderr)
-        else:
-            print("Command output: " + result.stdout.strip())
+            return None, result.stderr.strip()
+        try:
+            with open(stub_path + LOCK_SUFFIX, "r", encoding="utf-8") as f:
+                return f.read(), None
+        except OSError:  # uv too old to lock scripts
+            return None, "uv wrote no lockfile"
+
+def write_text_atomic(path, text):
+    """Write ``text`` to ``path`` through a temporary file, so concurrent workers never see partial content."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def clear_lock_failures():
+    """Forget the cached lock failures, so a --force build runs uv for them again."""
+    locks_dir = os.path.join(CACHE_DIR, "locks")
+    if os.path.isdir(locks_dir):
+        for entry in os.scandir(locks_dir):
+            if entry.name.endswith(".failed"):
+                os.remove(entry.path)
+
+def retry_lock(solution_path, locking):
+    """Lock the latest script of a solution whose last build could not; True once it resolves.
+
+    Only the lock step runs, so a solution that still cannot be locked is not
+    rebuilt (see lock_script() for how failures are cached).
+    """
+    most_recent_file = latest_script(solution_path)
+    if locking is None or most_recent_file is None:
+        return False
+    record = load_script_record(os.path.join(solution_path, most_recent_file))
+    try:
+        return lock_script(record, record.metadata, locking) is not None
+    except MetadataError:
+        return False
+
+def locked_packages(lock):
+    """The ``name``/``version`` pairs pinned by a uv lockfile, sorted by name."""
+    packages = tomllib.loads(lock).get("package", [])
+    return sorted(
+        ({"name": package["name"], "version": package.get("version", "")} for package in packages),
+        key=lambda package: package["name"],
+    )
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def generator_version():
+    """Fingerprint of this generator; editing templates or code invalidates every cached solution."""
+    return hash_file(os.path.abspath(__file__))
+
+def build_key(site_config, locking=None):
+    """Hash of everything outside a solution directory that affects its generated pages."""
+    config = json.dumps(site_config, sort_keys=True)
+    lock_config = json.dumps(locking, sort_keys=True)
+    return hashlib.sha256(f"{generator_version()}:{config}:{lock_config}".encode()).hexdigest()
+
+def solution_content(solution_path, extensions=None):
+    """Hash the files of a solution (scripts and cover image); returns ``(digest, lastmod)``.
+
+    ``lastmod`` is the W3C datetime of the most recently modified of those
+    files, used in the sitemap when the content changes.
+    """
+    if extensions is None:
+        extensions = SOLUTION_EXTENSIONS
+    digest = hashlib.sha256()
+    mtime = 0
+    for file_name in sorted(os.listdir(solution_path)):
+        if any(file_name.endswith(ext) for ext in extensions):
+            file_path = os.path.join(solution_path, file_name)
+            if file_name.endswith(".py"):
+                # Loads the ScriptRecord so the build stage does not read the script again
+                record = load_script_record(file_path)
+                file_digest = record.sha256
+                mtime = max(mtime, record.mtime_ns / 1e9)
+            else:
+                file_digest = hash_file(file_path)
+                mtime = max(mtime, os.path.getmtime(file_path))
+            digest.update(file_name.encode())
+            digest.update(file_digest.encode())
+    return digest.hexdigest(), time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(mtime))
+
+def read_build_manifest(static_dir):
+    """Stream the manifest written by the previous build.
+
+    The manifest is JSON Lines: a header (generator version, whether outputs
+    were precompressed) followed by one ``{"link", "hash", "record"}`` entry
+    per solution, in link order. Yields the header, then the entries; a
+    missing or unreadable manifest yields an empty header only.
+    """
+    manifest_path = os.path.join(static_dir, BUILD_MANIFEST)
+    try:
+        f = open(manifest_path, "r", encoding="utf-8")
+    except OSError:
+        yield {}
+        return
+    with f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or "generator" not in header:
+            yield {}
+            return
+        yield header
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning("Ignoring the rest of the truncated build manifest %s", manifest_path)
+                return
+            yield entry
+
+class BuildManifestWriter:
+    """Writes the build manifest entry by entry; close() replaces the previous one atomically."""
+
+    def __init__(self, static_dir, header):
+        self.path = os.path.join(static_dir, BUILD_MANIFEST)
+        self._file = open(self.path + ".tmp", "w", encoding="utf-8")
+        self._file.write(json.dumps(header, sort_keys=True) + "\n")
+
+    def add(self, link, digest, record):
+        self._file.write(json.dumps({"link": link, "hash": digest, "record": record}, sort_keys=True) + "\n")
+
+    def close(self):
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+def link_key(link):
+    """Sort key of a solution link; discovery and the build manifest both follow it."""
+    return tuple(link.split("/"))
+
+class ManifestCursor:
+    """Looks up the previous build's entries while discovery walks solutions in link order.
+
+    Both are sorted by link_key(), so they are merged in a single pass without
+    loading the manifest. Entries passed over belong to solutions that no
+    longer exist; entries out of order are ignored, so those solutions are
+    simply rebuilt.
+    """
 
-    thread = threading.Thread(target=run_command, daemon=True)  
-    thread.start()
-    return "Command is running in the background."
-"""
-                tool_definitions.append(tool_definition)
-        except Exception as e:
-            print(f"Error processing {latest_python_file}: {e}")
+    def __init__(self, entries):
+        self._entries = iter(entries)
+        self._head = next(self._entries, None)
+        self._last = None
+
+    def take(self, link):
+        """Return the entry for ``link`` (or None) and the links of removed solutions before it."""
+        key = link_key(link)
+        removed = []
+        while self._head is not None and link_key(self._head["link"]) <= key:
+            entry, self._head = self._head, next(self._entries, None)
+            entry_key = link_key(entry["link"])
+            if entry_key == key:
+                self._last = key
+                return entry, removed
+            if self._last is None or entry_key > self._last:
+                removed.append(entry["link"])
+        self._last = key
+        return None, removed
+
+    def rest(self):
+        """Links of removed solutions after the last one taken."""
+        while self._head is not None:
+            entry, self._head = self._head, next(self._entries, None)
+            if self._last is None or link_key(entry["link"]) > self._last:
+                yield entry["link"]
+
+def is_solution_fresh(cached, digest, solution_output):
+    """True if the cached record matches the current hash and its pages still exist.
+
+    A solution where the metadata of any version could not be parsed is
+    rebuilt, reporting the error again, until it is fixed. One whose lock
+    could not be resolved stays fresh; plan_solution() retries just its lock.
+    """
+    record = (cached or {}).get("record", {})
+    return (
+        cached is not None
+        and cached.get("hash") == digest
+        and not record.get("metadata_error")
+        and not any(version.get("metadata_error") for version in record.get("versions", []))
+        and os.path.exists(os.path.join(solution_output, "index.html"))
+        and os.path.exists(os.path.join(solution_output, "source.html"))
+    )
+
+def version_sort_key(file_name):
+    """Sort key ordering script files by the PEP 440 version in their name.
+
+    Names that are not valid versions sort before every version, by name.
+    """
+    try:
+        return (1, Version(os.path.splitext(file_name)[0]), file_name)
+    except InvalidVersion:
+        return (0, None, file_name)
+
+def script_versions(solution_path):
+    """Filenames of the scripts in a solution directory, newest version first."""
+    return sorted(
+        (f for f in os.listdir(solution_path) if f.endswith(".py")),
+        key=version_sort_key,
+        reverse=True,
+    )
+
+def latest_script(solution_path):
+    """Return the filename of the most recent script in a solution directory, or None."""
+    solution_files = script_versions(solution_path)
+    return solution_files[0] if solution_files else None
+
+def root_path(link):
+    """Relative URL of the site root from the directory of ``link``, such as ``"../../"``."""
+    return "../" * len(link.split("/"))
+
+def solution_page_context(metadata, solution_name, script_source, cover_image_path, cover_images, assets, root):
+    """Template variables shared by a solution page and its per-version pages."""
+    return {
+        'title': metadata.get("title", solution_name),
+        'root': root,
+        'assets': assets,
+        'project_name': SITE_CONFIG['project_name'],
+        'site_config': SITE_CONFIG,
+        'cover_image': cover_image_path,
+        'cover_images': cover_images,
+        'description': metadata.get("description", "No description provided."),
+        'author': metadata.get("author", ""),
+        'version': metadata.get("version", ""),
+        'license': metadata.get("license", ""),
+        'dependencies': metadata.get("dependencies", []),
+        'external_source': metadata.get("external_source", ""),
+        'script_source': script_source,
+        'keywords': metadata.get("keywords", []),
+        'requires_python': metadata.get("requires_python", ""),
+        'repository': metadata.get("repository", ""),
+        'documentation': metadata.get("documentation", ""),
+        'homepage': metadata.get("homepage", "")
+    }
+
+def build_version_pages(
+    group_name, solution_path, solution_output, cover_image_path, cover_images, assets, key, published=None
+):
+    """Render the pages of every version of a solution; returns version records, newest first.
+
+    Version ``X`` is published as ``X/index.html`` and ``X/source.html`` next to
+    its raw ``X.py``. A published version never changes, so its pages are only
+    rendered once: ``published`` maps script files to the hashes recorded when
+    their pages were last rendered (see the build manifest), and a version is
+    skipped while its hash, computed from ``key``, its script and the cover
+    image, is unchanged. Outputs of versions whose script was removed are deleted.
+    """
+    published = published or {}
+    solution_name = os.path.basename(solution_path)
+    base_url = SITE_CONFIG['base_url']
+    cover_path = os.path.join(solution_path, COVER_IMAGE)
+    cover_hash = hash_file(cover_path) if os.path.exists(cover_path) else ""
+    root = root_path(f"{group_name}/{solution_name}") + "../"  # Versions are a level below their solution
+
+    versions = []
+    files = script_versions(solution_path)
+    for file_name in files:
+        version = os.path.splitext(file_name)[0]
+        record = load_script_record(os.path.join(solution_path, file_name))
+        digest = hashlib.sha256(f"{key}:{record.sha256}:{cover_hash}".encode()).hexdigest()
+        versions.append({"version": version, "file": file_name, "hash": digest})
+
+        version_output = os.path.join(solution_output, version)
+        if (
+            published.get(file_name) == digest
+            and os.path.exists(os.path.join(version_output, "index.html"))
+            and os.path.exists(os.path.join(version_output, "source.html"))
+        ):
             continue
+        try:
+            metadata = record.metadata
+        except MetadataError as e:
+            logger.error("%s", e)
+            metadata = {}
+            versions[-1]["metadata_error"] = str(e)
+        script_source = f"{base_url}/{group_name}/{solution_name}/{file_name}"
+        os.makedirs(version_output, exist_ok=True)
+        render_to_file(
+            "source.html",
+            os.path.join(version_output, "source.html"),
+            title=metadata.get("title", solution_name),
+            filename=file_name,
+            source_html=highlight_source(record),
+            root=root,
+            assets=assets,
+            script_source=script_source,
+            site_config=SITE_CONFIG,
+        )
+        template_vars = solution_page_context(
+            metadata, solution_name, script_source, cover_image_path, cover_images, assets, root
+        )
+        template_vars['pinned_version'] = version
+        render_to_file("solution.html", os.path.join(version_output, "index.html"), **template_vars)
+        logger.debug("Rendered version %s of %s/%s", version, group_name, solution_name)
+
+    for file_name in published.keys() - set(files):
+        stale_output = os.path.join(solution_output, os.path.splitext(file_name)[0])
+        if os.path.isdir(stale_output):
+            shutil.rmtree(stale_output)
+        stale_script = os.path.join(solution_output, file_name)
+        for path in [stale_script, stale_script + LOCK_SUFFIX]:
+            for stale_path in [path] + [path + ext for ext in COMPRESSED_EXTENSIONS]:
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+    return versions
+
+def build_solution(
+    group_name, solution_path, solution_output, record=None, assets=None, locking=None, page_key="", published=None,
+    stamp=None,
+):
+    """Parse, copy and render a single solution. Returns its index record, or None.
+
+    ``record`` is the ScriptRecord of the latest script when the caller already
+    loaded it; it is passed along to worker processes so they do not re-read it.
+    ``assets`` are the shared asset URLs returned by generate_assets().
+    With ``locking`` (see lock_script()), a local script's lock is published
+    next to it and its resolved packages are listed on the solution page.
+    ``page_key`` and ``published`` are passed to build_version_pages().
+    ``stamp`` (the solution's content hash and lastmod) is kept in the record.
+    """
+    solution_name = os.path.basename(solution_path)
+    most_recent_file = latest_script(solution_path)
+    if most_recent_file is None:
+        return None
+
+    file_path = os.path.join(solution_path, most_recent_file)
+    if record is None or record.path != file_path:
+        record = load_script_record(file_path)
+    metadata_error = ""
+    try:
+        metadata = record.metadata
+    except MetadataError as e:
+        logger.error("%s", e)
+        metadata = {}
+        metadata_error = str(e)
+
+    os.makedirs(solution_output, exist_ok=True)
+
+    # Copy local files including cover image
+    copy_files(solution_path, solution_output, extensions=SOLUTION_EXTENSIONS)
+
+    # Get cover image path consistently
+    cover_image_path = get_cover_image_path(
+        solution_path, group_name, solution_name, metadata, SITE_CONFIG
+    )
 
-    return "\n".join(tool_definitions)
+    base_url = SITE_CONFIG['base_url']
 
-def download_external_script(url, output_path, original_metadata):
-    """Download external script and preserve original metadata."""
-    with urlopen(url) as response:
-        content = response.read().decode('utf-8')
-        with open(output_path, 'w') as f:
-            f.write(content)
+    # Resized and re-encoded variants of a local cover image
+    cover_images = None
+    if os.path.exists(os.path.join(solution_path, COVER_IMAGE)):
+        cover_images = build_cover_images(
+            os.path.join(solution_path, COVER_IMAGE),
+            solution_output,
+            f"{base_url}/{group_name}/{solution_name}",
+        )
+    script_path = f"{group_name}/{solution_name}/{most_recent_file}"
+    root = root_path(f"{group_name}/{solution_name}")
+
+    # Generate source code viewer page
+    source_template_vars = {
+        'title': metadata.get("title", solution_name),
+        'filename': most_recent_file,
+        'source_html': highlight_source(record),
+        'root': root,
+        'assets': assets,
+        'script_source': f"{base_url}/{script_path}",
+        'site_config': SITE_CONFIG
+    }
+
+    render_to_file("source.html", os.path.join(solution_output, "source.html"), **source_template_vars)
 
-def get_cover_image_path(solution_entry, entry, solution_name, metadata, site_config):
-    """Helper function to consistently resolve cover image paths."""
-    if os.path.exists(os.path.join(solution_entry.path, COVER_IMAGE)):
-        return f"{site_config['base_url']}/{entry.name}/{solution_name}/{COVER_IMAGE}"
-    elif "cover_image" in metadata:
-        return metadata["cover_image"]
-    return None
+    commands = []
+    if not metadata.get("external_source"):
+        try:
+            commands = record.commands
+        except Exception as e:
+            logger.error("Error extracting commands from %s: %s", file_path, e)
+
+    # External scripts declare their own dependencies, so only local ones are locked
+    lock = None
+    lock_path = os.path.join(solution_output, most_recent_file + LOCK_SUFFIX)
+    if locking is not None and metadata and not metadata.get("external_source"):
+        lock = lock_script(record, metadata, locking)
+    if lock is not None:
+        with open(lock_path, "w", encoding="utf-8") as f:
+            f.write(lock)
+    elif os.path.exists(lock_path):
+        os.remove(lock_path)  # Left over from a build that could lock the script
+
+    solution_metadata = {
+        "name": metadata.get("title", solution_name),
+        "description": metadata.get("description", "No description provided."),
+        "link": f"{group_name}/{solution_name}",
+        "cover": cover_image_path,
+        "cover_images": cover_images,
+        "thumbnail": cover_images["thumbnail"] if cover_images else cover_image_path,
+        "author": metadata.get("author", ""),
+        "version": metadata.get("version", ""),
+        "external_source": metadata.get("external_source", ""),
+        "external_sha256": metadata.get("sha256", ""),
+        "script_path": script_path,
+        "script_sha256": record.sha256,
+        "cacheable": metadata.get("cacheable", False),
+        "script_source": f"{base_url}/{script_path}",
+        "lock": f"{base_url}/{script_path}{LOCK_SUFFIX}" if lock is not None else "",
+        "lock_failed": locking is not None and bool(metadata) and not metadata.get("external_source") and lock is None,
+        "keywords": metadata.get("keywords", []),
+        "dependencies": metadata.get("dependencies", []),
+        "commands": commands,
+        "metadata_error": metadata_error,
+    }
+    solution_metadata.update(stamp or {})
+
+    solution_metadata["versions"] = build_version_pages(
+        group_name, solution_path, solution_output, cover_image_path, cover_images, assets, page_key, published
+    )
+
+    # Generate solution page with consistent cover image path
+    template_vars = solution_page_context(
+        metadata, solution_name, solution_metadata["script_source"], cover_image_path, cover_images, assets, root
+    )
+    template_vars['lock_file'] = most_recent_file + LOCK_SUFFIX if lock is not None else ""
+    template_vars['locked_dependencies'] = locked_packages(lock) if lock is not None else []
+    template_vars['versions'] = [
+        {"version": v["version"], "url": f"./{v['version']}/", "latest": v["file"] == most_recent_file}
+        for v in solution_metadata["versions"]
+    ]
+
+    render_to_file("solution.html", os.path.join(solution_output, "index.html"), **template_vars)
+    return solution_metadata
+
+class ReservedNameError(ValueError):
+    """A group or solution directory whose output would clash with a file the site generates."""
+
+    def __init__(self, path):
+        self.path = path
+        super().__init__(
+            f"{path}: this name is reserved for the site's own files; rename the directory"
+        )
 
-def generate_static_site(base_dir, static_dir):
-    """Generate the static site with proper site_config handling."""
-    os.makedirs(static_dir, exist_ok=True)
-    solutions = []
-
-    for entry in os.scandir(base_dir):
-        if entry.is_dir() and not entry.name.startswith(".") and entry.name != "docs":
-            group_path = os.path.join(static_dir, entry.name)
-            os.makedirs(group_path, exist_ok=True)
-
-            for solution_entry in os.scandir(entry.path):
-                if solution_entry.is_dir():
-                    solution_name = solution_entry.name
-                    solution_files = sorted(
-                        [f for f in os.listdir(solution_entry.path) if f.endswith(".py")],
-                        reverse=True,
-                    )
-                    if not solution_files:
-                        continue
+def is_reserved_name(name):
+    """True if a group or solution named ``name`` would be published over a generated file.
 
-                    most_recent_file = solution_files[0]
-                    file_path = os.path.join(solution_entry.path, most_recent_file)
-                    metadata = extract_metadata(file_path)
+    Groups and solutions are published under their directory names, next to
+    the aggregate files of the site root and the pages of their group, so the
+    same names are reserved at every depth, with their temporary and
+    precompressed variants.
+    """
+    for suffix in [".tmp"] + COMPRESSED_EXTENSIONS:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return name in RESERVED_NAMES or bool(RESERVED_NAME_RE.match(name))
+
+def discover_solutions(base_dir):
+    """Yield ``(group_name, solution_path)`` for every solution directory, in link order.
+
+    Top-level directories are groups. Below them, a directory holding scripts
+    is a solution and any other directory is a nested group, to any depth, so
+    ``group_name`` is a path such as ``"images/filters"``. Raises
+    ReservedNameError for a directory named like a generated file (see
+    is_reserved_name()).
+    """
+    for group in sorted(os.scandir(base_dir), key=lambda entry: entry.name):
+        if group.is_dir() and not group.name.startswith(".") and group.name != "docs":
+            if is_reserved_name(group.name):
+                raise ReservedNameError(group.path)
+            yield from discover_group(group.name, group.path)
+
+def discover_group(group_name, group_path):
+    for entry in sorted(os.scandir(group_path), key=lambda entry: entry.name):
+        if not entry.is_dir() or entry.name.startswith("."):
+            continue
+        if is_reserved_name(entry.name):
+            raise ReservedNameError(entry.path)
+        if script_versions(entry.path):
+            yield group_name, entry.path
+        else:
+            yield from discover_group(f"{group_name}/{entry.name}", entry.path)
 
-                    solution_output = os.path.join(group_path, solution_name)
-                    os.makedirs(solution_output, exist_ok=True)
+def prune_output(static_dir, link, emptied):
+    """Remove the generated pages of a solution that no longer exists.
 
-                    # Copy local files including cover image
-                    copy_files(solution_entry.path, solution_output, extensions=[".py", ".png"])
+    Its group is added to the set ``emptied`` rather than removed here: worker
+    processes may still be writing other solutions into it, so prune_groups()
+    runs once every solution is built.
+    """
+    stale_output = os.path.join(static_dir, link)
+    if os.path.isdir(stale_output):
+        shutil.rmtree(stale_output)
+    emptied.add(link.rsplit("/", 1)[0])
+
+def prune_groups(static_dir, emptied):
+    """Remove the groups in ``emptied`` that are left without solutions or subgroups, and their empty parents."""
+    for group in sorted(emptied, key=link_key, reverse=True):  # Subgroups first
+        group_output = os.path.join(static_dir, group)
+        while os.path.normpath(group_output) != os.path.normpath(static_dir) and os.path.isdir(group_output):
+            if any(entry.is_dir() for entry in os.scandir(group_output)):
+                break
+            shutil.rmtree(group_output)  # Only the group's own page and shard are left
+            group_output = os.path.dirname(group_output)
+
+def plan_solutions(
+    base_dir, static_dir, previous, key, assets, locking=None, page_key="", force=False, emptied=None,
+):
+    """Yield ``(link, digest, cached, task)`` for every solution, in link order.
+
+    ``previous`` is a ManifestCursor over the last build. ``cached`` is the
+    solution's entry in it, if any; ``task`` is None when that entry is still
+    fresh, and otherwise holds the build_solution() arguments, with the latest
+    script already loaded. Outputs of solutions that no longer exist are
+    removed as discovery passes them; their groups are collected in the set
+    ``emptied`` for publish_site() (see prune_output()).
+    """
+    if emptied is None:
+        emptied = set()
+    for group_name, solution_path in discover_solutions(base_dir):
+        link = f"{group_name}/{os.path.basename(solution_path)}"
+        cached, removed = previous.take(link)
+        for removed_link in removed:
+            prune_output(static_dir, removed_link, emptied)
+        digest, task = plan_solution(
+            group_name, solution_path, static_dir, cached, key, assets, locking, page_key, force
+        )
+        yield link, digest, cached, task
 
-                    # Get cover image path consistently
-                    cover_image_path = get_cover_image_path(
-                        solution_entry, entry, solution_name, metadata, SITE_CONFIG
-                    )
-                    
-                    base_url = SITE_CONFIG['base_url']
-                    script_path = f"{entry.name}/{solution_name}/{most_recent_file}"
-                    
-                    # Generate source code viewer page
-                    with open(file_path, 'r') as f:
-                        source_code = f.read()
-                    
-                    source_template_vars = {
-                        'title': metadata.get("title", solution_name),
-                        'filename': most_recent_file,
-                        'source_code': source_code,
-                        'script_source': f"{base_url}/{script_path}",
-                        'site_config': SITE_CONFIG
-                    }
-                    
-                    with open(os.path.join(solution_output, "source.html"), "w") as f:
-                        f.write(Template(SOURCE_TEMPLATE).render(**source_template_vars))
-                    
-                    solution_metadata = {
-                        "name": metadata.get("title", solution_name),
-                        "description": metadata.get("description", "No description provided."),
-                        "link": f"{entry.name}/{solution_name}",
-                        "cover": cover_image_path,
-                        "author": metadata.get("author", ""),
-                        "version": metadata.get("version", ""),
-                        "external_source": metadata.get("external_source", ""),
-                        "script_source": f"{base_url}/{script_path}",
-                    }
+    for removed_link in previous.rest():
+        prune_output(static_dir, removed_link, emptied)
 
-                    # Generate solution page with consistent cover image path
-                    template_vars = {
-                        'title': solution_metadata["name"],
-                        'project_name': SITE_CONFIG['project_name'],
-                        'site_config': SITE_CONFIG,
-                        'cover_image': cover_image_path,
-                        'description': solution_metadata["description"],
-                        'author': metadata.get("author", ""),
-                        'version': metadata.get("version", ""),
-                        'license': metadata.get("license", ""),
-                        'dependencies': metadata.get("dependencies", []),
-                        'external_source': solution_metadata["external_source"],
-                        'script_source': solution_metadata["script_source"],
-                        'keywords': metadata.get("keywords", []),
-                        'requires_python': metadata.get("requires_python", ""),
-                        'repository': metadata.get("repository", ""),
-                        'documentation': metadata.get("documentation", ""),
-                        'homepage': metadata.get("homepage", "")
-                    }
-                    
-                    with open(os.path.join(solution_output, "index.html"), "w") as f:
-                        f.write(Template(SOLUTION_TEMPLATE).render(**template_vars))
-                    solutions.append(solution_metadata)
+def plan_solution(group_name, solution_path, static_dir, cached, key, assets, locking=None, page_key="", force=False):
+    """Hash one solution against its manifest entry ``cached``; returns ``(digest, task)``.
 
-    # Generate index page and sitemap
-    with open(os.path.join(static_dir, "index.html"), "w") as f:
-        context = {
-            'solutions': solutions,
-            'site_config': SITE_CONFIG,
-            'categories': list(set(s["link"].split("/")[0] for s in solutions))
-        }
-        f.write(Template(INDEX_TEMPLATE).render(**context))
-    
-    generate_sitemap_txt(solutions, static_dir)
-    
-    # Generate MCP server code
-    tool_definitions = generate_mcp_tool_definitions_with_ast(solutions)
-    with open(MCP_SERVER_PATH, "w") as f:
-        f.write(Template("""
-from fastmcp import FastMCP
-from typing import Optional, List, Union
-import subprocess
+    ``task`` is None when the entry is still fresh, and otherwise holds the
+    build_solution() arguments (see plan_solutions()).
+    """
+    solution_output = os.path.join(static_dir, group_name, os.path.basename(solution_path))
+    content, lastmod = solution_content(solution_path)
+    # The build key is part of the hash, so a new generator or config rebuilds every page
+    digest = hashlib.sha256(f"{key}:{content}".encode()).hexdigest()
+    if not force and is_solution_fresh(cached, digest, solution_output):
+        # The pages are rebuilt, to list the locked packages, only once the lock resolves
+        if not (cached["record"].get("lock_failed") and retry_lock(solution_path, locking)):
+            return digest, None
+    most_recent_file = latest_script(solution_path)
+    record = None
+    if most_recent_file is not None:
+        record = load_script_record(os.path.join(solution_path, most_recent_file))
+    cached_record = (cached or {}).get("record", {})
+    # Versions whose metadata was invalid match no hash, so they are rendered again to report it
+    published = {} if force else {
+        version["file"]: "" if version.get("metadata_error") else version["hash"]
+        for version in cached_record.get("versions", [])
+    }
+    # Pages re-rendered for another reason than their content keep their date
+    if cached_record.get("content_hash") == content and cached_record.get("lastmod"):
+        lastmod = cached_record["lastmod"]
+    stamp = {"content_hash": content, "lastmod": lastmod}
+    return digest, (
+        group_name, solution_path, solution_output, record, assets, locking, page_key, published, stamp,
+    )
+
+def build_solutions(planned, jobs=1):
+    """Build the stale solutions of plan_solutions(); yields ``(link, digest, record, rebuilt)`` in order.
+
+    Fresh solutions pass through with their cached record. With ``jobs > 1``
+    the solutions are built in a process pool, submitted at most
+    PIPELINE_WINDOW per worker ahead of the one being yielded, so only a
+    bounded number of records is held at any time. Each task only writes
+    inside its own output directory, and results are yielded in plan order,
+    so the output is identical to a serial build.
+    """
+    if jobs <= 1:
+        for link, digest, cached, task in planned:
+            if task is None:
+                yield link, digest, cached["record"], False
+            else:
+                yield link, digest, build_solution(*task), True
+        return
+
+    def completed(link, digest, cached, future):
+        if future is None:
+            return link, digest, cached["record"], False
+        return link, digest, future.result(), True
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for link, digest, cached, task in planned:
+            future = None if task is None else pool.submit(build_solution, *task)
+            pending.append((link, digest, cached, future))
+            if len(pending) > jobs * PIPELINE_WINDOW:
+                yield completed(*pending.popleft())
+        while pending:
+            yield completed(*pending.popleft())
+
+def compressed_siblings(path):
+    """Paths of the precompressed copies of ``path`` written by this build."""
+    siblings = [f"{path}.gz"]
+    if brotli is not None:
+        siblings.append(f"{path}.br")
+    return siblings
+
+def decompress_sibling(path):
+    """The content a precompressed sibling was made from, or None if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        return gzip.decompress(data) if path.endswith(".gz") else brotli.decompress(data)
+    except Exception:  # A truncated or corrupt copy; gzip, zlib and brotli raise different errors
+        return None
+
+def compress_file(path):
+    """Write reproducible gzip and brotli copies of a file next to it.
+
+    Copies that already hold the file's content are kept, since decompressing
+    is far cheaper than compressing again; returns whether anything was written.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if all(decompress_sibling(sibling) == data for sibling in compressed_siblings(path)):
+        return False
+    encoded = {f"{path}.gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded[f"{path}.br"] = brotli.compress(data, quality=11)
+    for output_path, content in encoded.items():
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, output_path)
+    return True
+
+def remove_compressed_siblings(static_dir):
+    """Remove every precompressed sibling under ``static_dir``, for builds that skip compression."""
+    for dir_path, _, file_names in os.walk(static_dir):
+        for file_name in file_names:
+            source_name, ext = os.path.splitext(file_name)
+            if ext in COMPRESSED_EXTENSIONS and os.path.splitext(source_name)[1] in COMPRESSIBLE_EXTENSIONS:
+                os.remove(os.path.join(dir_path, file_name))
+
+def compression_candidates(path):
+    """Yield the compressible files at or under ``path``.
+
+    Siblings of files that are gone or no longer worth compressing are removed
+    on the way.
+    """
+    if os.path.isdir(path):
+        walk = os.walk(path)
+    else:
+        walk = [(os.path.dirname(path), [], [os.path.basename(path)])]
+    for dir_path, _, file_names in walk:
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            source_path, ext = os.path.splitext(file_path)
+            if ext in COMPRESSED_EXTENSIONS:
+                if not os.path.exists(source_path):
+                    os.remove(file_path)
+                continue
+            if file_name == BUILD_MANIFEST or ext not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            if os.path.getsize(file_path) < COMPRESSION_MIN_SIZE:
+                for sibling in compressed_siblings(file_path):
+                    if os.path.exists(sibling):
+                        os.remove(sibling)
+                continue
+            yield file_path
+
+class OutputCompressor:
+    """Precompresses generated files in threads while the build goes on.
+
+    zlib and brotli release the GIL. At most PIPELINE_WINDOW files per thread
+    are queued, so compressing a large tree does not list it all at once.
+    ``count`` is the number of files whose copies were (re)written.
+    """
 
-mcp = FastMCP("Demo 🚀")
+    def __init__(self, jobs=None):
+        self._pool = ThreadPoolExecutor(max_workers=jobs)
+        self._window = (jobs or os.cpu_count() or 1) * PIPELINE_WINDOW
+        self._pending = deque()
+        self.count = 0
+
+    def add(self, path):
+        """Compress ``path``, or every compressible file under it if it is a directory."""
+        for file_path in compression_candidates(path):
+            self._pending.append(self._pool.submit(compress_file, file_path))
+            if len(self._pending) > self._window:
+                self.count += self._pending.popleft().result()
+
+    def close(self):
+        while self._pending:
+            self.count += self._pending.popleft().result()
+        self._pool.shutdown()
+
+def generate_static_site(
+    base_dir, static_dir, force=False, jobs=1, index_mode="full", compress=True, offline=False,
+    lock=True, index_url=None, prefetch=True,
+):
+    """Generate the static site, rebuilding only solutions whose inputs changed.
+
+    The build streams through discovery (plan_solutions()), building
+    (build_solutions()) and the aggregate writers (publish_site()), one solution at a time, so
+    memory does not grow with the number of solutions. Each solution is hashed
+    (scripts, cover image, site_config and generator version) and compared
+    against the manifest of the previous build. Unchanged solutions reuse their
+    cached record; the aggregate pages are always regenerated from the full
+    set of records.
+
+    ``index_mode`` is one of INDEX_MODES; "virtual" keeps index.html small for
+    very large collections. With ``compress``, compressible outputs get
+    precompressed .gz/.br siblings: those of rebuilt solutions as they are
+    emitted, and the whole site when the previous build was not compressed.
+    With ``offline``, external scripts are only checked against the local
+    script cache and locks are resolved from uv's cache. With ``lock``, each
+    local script's dependencies are locked with uv, against ``index_url``
+    instead of PyPI if given. Without ``prefetch``, external scripts are not
+    checked at all.
+    """
+    os.makedirs(static_dir, exist_ok=True)
+    entries = read_build_manifest(static_dir)
+    previous = next(entries)
+    locking = locking_options(lock, offline, index_url)
+    if force and locking is not None:
+        clear_lock_failures()
+    key = build_key(SITE_CONFIG, locking)
+    page_key = build_key(SITE_CONFIG)  # Version pages do not show locks
+    compressor = OutputCompressor(jobs if jobs > 1 else None) if compress else None
+    # Unchanged solutions kept the siblings of the last build, unless it skipped compression
+    compress_all = force or not previous.get("compressed")
+    if compressor is None and previous.get("compressed", True):
+        remove_compressed_siblings(static_dir)  # They would go stale as files change
+    assets = generate_assets(static_dir, None if compress_all else compressor)
+    emptied = set()  # Groups that lost solutions, pruned once the build has drained
+    planned = plan_solutions(
+        base_dir, static_dir, ManifestCursor(entries), key, assets, locking, page_key, force, emptied
+    )
+    publish_site(
+        base_dir, static_dir, build_solutions(planned, jobs=jobs), assets, index_mode, compressor, compress_all,
+        prefetch=prefetch, offline=offline, emptied=emptied,
+    )
+
+def locking_options(lock=True, offline=False, index_url=None):
+    """The ``locking`` argument of build_solution(), or None when scripts are not locked."""
+    if lock and shutil.which("uv") is None:
+        logger.warning("uv is not installed; scripts will not be locked")
+        return None
+    return {"index_url": index_url, "offline": offline} if lock else None
+
+def publish_site(
+    base_dir, static_dir, solutions, assets, index_mode="full", compressor=None, compress_all=True,
+    prefetch=True, offline=False, only_groups=None, emptied=None,
+):
+    """Stream solutions into the build manifest, the aggregate files and the index page.
+
+    ``solutions`` yields ``(link, digest, record, rebuilt)`` in link order, as
+    build_solutions() does. With a ``compressor``, rebuilt solutions are
+    precompressed as they pass, and then the pages shared by every solution,
+    or the whole site with ``compress_all``. ``only_groups`` limits the group
+    pages written (see GroupPages). Once ``solutions`` is exhausted, the groups
+    in ``emptied`` (see prune_output()) that have nothing left are removed.
+    """
+    if emptied is None:
+        emptied = set()
+    source_root = os.path.relpath(base_dir, static_dir).replace(os.sep, "/")
+    manifest = BuildManifestWriter(
+        static_dir, {"generator": generator_version(), "compressed": compressor is not None}
+    )
+    sitemap = SitemapWriter(static_dir)
+    search_index = SearchIndexWriter(static_dir)
+    tools = McpManifestWriter(static_dir, source_root)
+    groups = GroupPages(static_dir, assets, None if compress_all else compressor, only=only_groups)
+    aggregates = [sitemap, search_index, tools, groups]
+    if index_mode == "virtual":
+        # Only the first screen is in the HTML; the rest is windowed from catalog.json
+        catalog = CatalogWriter(static_dir)
+        aggregates.append(catalog)
+        cards = []
+    elif index_mode == "full":
+        cards = RecordSpool()
+    else:
+        cards = []  # The root page lists groups only
+    external = []
+
+    total = rebuilt = 0
+    for link, digest, solution_metadata, built in solutions:
+        if solution_metadata is None:
+            prune_output(static_dir, link, emptied)  # No scripts left to publish
+            continue
+        total += 1
+        rebuilt += built
+
+        manifest.add(link, digest, solution_metadata)
+        for aggregate in aggregates:
+            aggregate.add(solution_metadata)
+        if index_mode == "full" or (index_mode == "virtual" and len(cards) < INDEX_FIRST_SCREEN):
+            cards.append({field: solution_metadata.get(field) for field in INDEX_CARD_FIELDS})
+        if solution_metadata.get("external_source"):
+            external.append({
+                "external_source": solution_metadata["external_source"],
+                "external_sha256": solution_metadata.get("external_sha256"),
+            })
+        if built and compressor is not None and not compress_all:
+            compressor.add(os.path.join(static_dir, link))
+
+    logger.info("Rebuilt %d of %d solutions", rebuilt, total)
+    prune_groups(static_dir, emptied)
 
-{{ tool_definitions }}
+    # Generate index page and sitemap
+    top_groups = groups.close()
+    context = {
+        'solutions': cards,
+        'groups': top_groups if index_mode == "groups" else [],
+        'site_config': SITE_CONFIG,
+        'root': "",
+        'assets': assets,
+        'search_index_url': search_index.close(),
+        'index_mode': index_mode,
+    }
+    if index_mode == "virtual":
+        context['catalog_url'] = catalog.close()
+    render_to_file("index.html", os.path.join(static_dir, "index.html"), **context)
+    if index_mode == "full":
+        cards.close()
+
+    unchanged_sitemaps = sitemap.close()
+
+    # Publish the MCP server with its tool manifest
+    if prefetch:
+        prefetch_external_scripts(external, offline=offline)
+    for file_name in MCP_SERVER_FILES:
+        shutil.copyfile(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name),
+            os.path.join(static_dir, file_name),
+        )
+    tools.close()
+    logger.info("MCP server published with %s", os.path.join(static_dir, TOOL_MANIFEST))
 
-if __name__ == "__main__":
-    mcp.run()
-""").render(tool_definitions=tool_definitions))
-    print(f"mcp_server.py generated at {MCP_SERVER_PATH}")
+    if compressor is not None:
+        if compress_all:
+            compressor.add(static_dir)
+        else:
+            # The pages shared by every solution are rewritten on every build, mostly
+            # unchanged (see compress_file()); new assets were compressed as they were written
+            for entry in os.scandir(static_dir):
+                if entry.is_file() and entry.name not in unchanged_sitemaps:
+                    compressor.add(entry.path)
+        compressor.close()
+        logger.info("Compressed %d files", compressor.count)
+
+    manifest.close()
+
+def is_source_ignored(base_dir, path):
+    """True for paths outside the solutions: hidden directories (.atrium, .git) and docs."""
+    parts = os.path.relpath(path, base_dir).split(os.sep)
+    return any(part.startswith(".") for part in parts) or parts[0] == "docs"
+
+def changed_solutions(base_dir, paths):
+    """Links of the solution directories holding the changed ``paths``.
+
+    Returns None if a path is not inside an existing solution (files next to
+    the groups, a removed solution or script, a reserved name): telling what
+    that changes takes a full discovery.
+    """
+    links = set()
+    for path in paths:
+        parts = os.path.relpath(path, base_dir).split(os.sep)
+        # As in discover_group(), the shallowest directory below a group that holds scripts
+        for depth in range(2, len(parts) + 1):
+            solution_path = os.path.join(base_dir, *parts[:depth])
+            if not os.path.isdir(solution_path):
+                return None
+            if script_versions(solution_path):
+                break
+        else:
+            return None
+        if any(is_reserved_name(part) for part in parts[:depth]):
+            return None
+        links.add("/".join(parts[:depth]))
+    return links
+
+def update_static_site(base_dir, static_dir, links, index_mode="full", offline=False, lock=True, index_url=None):
+    """Rebuild only the solutions at ``links``, patching the aggregates from the build manifest.
+
+    Other solutions are neither discovered nor hashed: their records are
+    streamed from the manifest of the previous build, with the rebuilt or new
+    solutions merged in by link, and only the group pages on the way to them
+    are rendered again. Nothing is precompressed or prefetched.
+
+    Returns False, without writing anything, when the previous build cannot
+    be patched: there is none, another generator wrote it, or a link turns a
+    group into a solution or the other way round. generate_static_site() is
+    needed then.
+    """
+    entries = read_build_manifest(static_dir)
+    previous = next(entries)
+    if previous.get("generator") != generator_version():
+        return False
+    only_groups = set()
+    for link in links:
+        parts = link.split("/")
+        if os.path.exists(os.path.join(static_dir, link, CATALOG)):
+            return False  # The page of a group that became a solution
+        for depth in range(1, len(parts)):
+            group_path = "/".join(parts[:depth])
+            if os.path.exists(os.path.join(static_dir, group_path, "source.html")):
+                return False  # A solution that became a group
+            only_groups.add(group_path)
+
+    locking = locking_options(lock, offline, index_url)
+    key = build_key(SITE_CONFIG, locking)
+    page_key = build_key(SITE_CONFIG)
+    assets = generate_assets(static_dir)
+
+    def patched():
+        pending = sorted(links, key=link_key)
+
+        def rebuild(link, cached):
+            group_name = link.rsplit("/", 1)[0]
+            digest, task = plan_solution(
+                group_name, os.path.join(base_dir, link), static_dir, cached, key, assets, locking, page_key
+            )
+            if task is None:
+                return link, digest, cached["record"], False
+            return link, digest, build_solution(*task), True
+
+        for entry in entries:
+            entry_key = link_key(entry["link"])
+            while pending and link_key(pending[0]) < entry_key:
+                yield rebuild(pending.pop(0), None)
+            if pending and link_key(pending[0]) == entry_key:
+                yield rebuild(pending.pop(0), entry)
+            else:
+                yield entry["link"], entry["hash"], entry["record"], False
+        for link in pending:
+            yield rebuild(link, None)
+
+    publish_site(
+        base_dir, static_dir, patched(), assets, index_mode, prefetch=False, offline=offline,
+        only_groups=only_groups,
+    )
+    return True
+
+def serve(base_dir, static_dir, host="127.0.0.1", port=8000, watch=False, **options):
+    """Build the site, serve it locally and, with ``watch``, rebuild and reload on every change.
+
+    A change inside solutions only rebuilds those solutions and patches the
+    aggregate pages from the build manifest (see update_static_site()); any
+    other change runs a regular incremental build. Rebuilds run in this
+    process, so the ScriptRecords of unchanged scripts stay in memory (up to
+    SCRIPT_RECORD_CACHE_SIZE of them). Precompression and external script
+    checks are left to regular builds. ``options`` are passed to
+    generate_static_site().
+    """
+    options = dict(options, compress=False)
+    generate_static_site(base_dir, static_dir, **options)
+    server, hub = preview.start_server(static_dir, host, port)
+    logger.info("Serving %s at http://%s:%d/", static_dir, host, server.server_address[1])
+    if not watch:
+        threading.Event().wait()
+
+    # The first build already checked external scripts; later ones build serially
+    options.update(force=False, jobs=1, prefetch=False)
+    update_options = {
+        name: options[name] for name in ("index_mode", "offline", "lock", "index_url") if name in options
+    }
+
+    def rebuild(paths):
+        started = time.perf_counter()
+        links = changed_solutions(base_dir, paths)
+        try:
+            if links is None or not update_static_site(base_dir, static_dir, links, **update_options):
+                links = ["the site"]
+                generate_static_site(base_dir, static_dir, **options)
+        except Exception:
+            logger.exception("Rebuild failed; fix the error and save again")
+            return
+        hub.notify()
+        logger.info("Rebuilt %s in %.0f ms", ", ".join(sorted(links)), (time.perf_counter() - started) * 1000)
+
+    logger.info("Watching %s for changes", os.path.abspath(base_dir))
+    preview.watch(base_dir, rebuild, ignore=lambda path: is_source_ignored(base_dir, path))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the static site for this atrium.")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["build", "serve"],
+        default="build",
+        help="'serve' builds the site and serves it locally (default: build).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the build manifest and rebuild every solution.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for building solutions (0 uses every CPU).",
+    )
+    parser.add_argument(
+        "--index-mode",
+        choices=INDEX_MODES,
+        default="full",
+        help=(
+            "'virtual' server-renders only the first screen of cards and windows the rest from catalog.json; "
+            "'groups' only lists the groups, whose pages are generated in every mode."
+        ),
+    )
+    parser.add_argument(
+        "--no-compress",
+        action="store_true",
+        help="Skip writing precompressed .gz/.br copies of the generated files.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Do not download external scripts or packages; only use the local caches.",
+    )
+    parser.add_argument(
+        "--no-lock",
+        action="store_true",
+        help="Do not resolve and publish a uv lockfile for each script.",
+    )
+    parser.add_argument(
+        "--index-url",
+        help="Package index (URL or local directory) to lock dependencies against instead of PyPI.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="With serve: rebuild changed solutions and reload the browser on every change.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="With serve: address to listen on.")
+    parser.add_argument("--port", type=int, default=8000, help="With serve: port to listen on.")
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="Show debug output (metadata parsing, copied files).",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Only show warnings and errors.",
+    )
+    args = parser.parse_args(argv)
+    if args.verbose:
+        level = logging.DEBUG
+    elif args.quiet:
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    options = {
+        "force": args.force,
+        "jobs": jobs,
+        "index_mode": args.index_mode,
+        "compress": not args.no_compress,
+        "offline": args.offline,
+        "lock": not args.no_lock,
+        "index_url": args.index_url,
+    }
+    try:
+        if args.command == "serve":
+            try:
+                serve(BASE_DIR, STATIC_DIR, host=args.host, port=args.port, watch=args.watch, **options)
+            except KeyboardInterrupt:
+                pass
+        else:
+            generate_static_site(BASE_DIR, STATIC_DIR, **options)
+    except ReservedNameError as e:
+        logger.error("%s", e)
+        sys.exit(1)
 
 if __name__ == "__main__":
-    generate_static_site(BASE_DIR, STATIC_DIR)
+    main()
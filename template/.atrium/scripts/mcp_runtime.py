@@ -0,0 +1,1081 @@
+"""Runtime support for the generated MCP server (published next to mcp_server.py).
+
+Only the standard library is used here, so generate_index.py can share the
+script cache at build time.
+"""
+import asyncio
+import codecs
+import hashlib
+import json
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+logger = logging.getLogger("atrium")
+
+TOOL_MANIFEST = "mcp-tools.json"  # Written by generate_index.py next to mcp_server.py
+LOCK_SUFFIX = ".lock"  # uv reads a script's lockfile from <script>.py.lock
+
+FETCH_TIMEOUT = 30  # Seconds
+REVALIDATE_AFTER = 300  # Seconds a cached script is trusted before asking the server again
+PREFETCH_WORKERS = 8
+CANCEL_GRACE = 5  # Seconds a cancelled job has to exit before it is killed
+OUTPUT_CHUNK = 8192  # Bytes read from a job's output at a time
+WARM_TIMEOUT = 900  # Seconds allowed for resolving and installing one script's environment
+
+# PEP 723 inline metadata block, as in generate_index.py
+METADATA_BLOCK_RE = re.compile(
+    r"(?m)^# /// script$\s(?P<content>(^#(| .*)$\s)+)^# ///$"
+)
+
+def default_cache_dir():
+    """ATRIUM_CACHE_DIR, or an atrium directory under the user's cache directory."""
+    if os.environ.get("ATRIUM_CACHE_DIR"):
+        return os.environ["ATRIUM_CACHE_DIR"]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "atrium")
+
+def offline_mode():
+    """True when ATRIUM_OFFLINE is set to anything but an empty or false-like value."""
+    return os.environ.get("ATRIUM_OFFLINE", "").lower() not in ("", "0", "false", "no")
+
+def env_int(name, default):
+    """Integer value of an environment variable, or ``default`` if unset or invalid."""
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+def write_atomic(path, data):
+    """Write bytes to ``path`` through a temporary file, so readers never see partial content."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class ScriptCacheError(RuntimeError):
+    """A script could not be provided from a local copy, the network or the cache."""
+
+class IntegrityError(ScriptCacheError):
+    """A script does not match the sha256 pinned for it."""
+
+class ScriptCache:
+    """Content-addressed local store of the scripts the MCP server runs.
+
+    Script bodies are stored once under ``objects/<sha256>.py``. For each URL,
+    ``refs/<sha256 of the URL>.json`` records the object it resolved to, the
+    server's ETag and Last-Modified validators, and when it was last checked.
+
+    A pinned script whose object exists is served without touching the
+    network, and so is one with a local copy registered by register_local()
+    (the built site or the source checkout) that matches the pin; the copy is
+    added to the store first. Otherwise a cached script is used as-is for
+    ``revalidate_after`` seconds, then revalidated with a conditional request;
+    if the server cannot be reached the cached copy is used. In offline mode
+    only the store and local copies are used. A lockfile published next to a
+    local copy is stored next to its object, where ``uv run`` finds it.
+    """
+
+    def __init__(self, root=None, offline=None, revalidate_after=REVALIDATE_AFTER, timeout=FETCH_TIMEOUT):
+        self.root = root or default_cache_dir()
+        self.offline = offline_mode() if offline is None else offline
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        self._local_copies = {}
+        self._imported = set()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def register_local(self, url, paths):
+        """Declare local files that may hold the script published at ``url``."""
+        self._local_copies[url] = list(paths)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, "objects", f"{digest}.py")
+
+    def ref_path(self, url):
+        return os.path.join(self.root, "refs", hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def load_ref(self, url):
+        """Return the cached ref for ``url`` if its object is still present, else None."""
+        try:
+            with open(self.ref_path(url), "r") as f:
+                ref = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if ref.get("url") != url or not os.path.exists(self.object_path(ref.get("sha256", ""))):
+            return None
+        return ref
+
+    def save_ref(self, ref):
+        write_atomic(self.ref_path(ref["url"]), json.dumps(ref, sort_keys=True).encode())
+
+    def fetch(self, url, sha256=None):
+        """Return the local path of the script at ``url``, downloading it only when needed.
+
+        Raises IntegrityError if ``sha256`` is given and the script does not
+        match it, and ScriptCacheError if it is neither cached nor reachable.
+        """
+        if sha256:
+            sha256 = sha256.lower()
+            # Once per process, so a lock published with a newer build is picked up
+            if url in self._local_copies and url not in self._imported:
+                path = self._import_local(url, sha256)
+                if path is not None:
+                    return path
+            if os.path.exists(self.object_path(sha256)):
+                return self.object_path(sha256)
+
+        with self._url_lock(url):
+            ref = self.load_ref(url)
+            if ref is not None and (
+                self.offline or time.time() - ref.get("checked", 0) < self.revalidate_after
+            ):
+                return self._verified(url, ref["sha256"], sha256)
+            if self.offline:
+                raise ScriptCacheError(f"{url} is not cached and offline mode is enabled")
+
+            try:
+                ref = self._download(url, ref)
+            except OSError as e:  # URLError, HTTPError and socket timeouts
+                if ref is None:
+                    raise ScriptCacheError(f"Could not fetch {url}: {e}") from e
+                logger.warning("Could not revalidate %s (%s); using the cached copy", url, e)
+            return self._verified(url, ref["sha256"], sha256)
+
+    def prefetch(self, sources, max_workers=PREFETCH_WORKERS):
+        """Fetch ``(url, sha256)`` pairs concurrently.
+
+        Returns a dict mapping each URL to its local path, or to the exception
+        that prevented fetching it.
+        """
+        sources = list(sources)
+
+        def fetch_one(source):
+            url, sha256 = source
+            try:
+                return self.fetch(url, sha256=sha256)
+            except ScriptCacheError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(fetch_one, sources))
+        return {url: result for (url, _), result in zip(sources, results)}
+
+    def _import_local(self, url, sha256):
+        """Copy the first registered local file matching ``sha256`` (and its lock) into the store."""
+        self._imported.add(url)
+        for local_path in self._local_copies.get(url, []):
+            try:
+                with open(local_path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            if hashlib.sha256(data).hexdigest() == sha256:
+                path = self.object_path(sha256)
+                if not os.path.exists(path):
+                    write_atomic(path, data)
+                try:
+                    with open(local_path + LOCK_SUFFIX, "rb") as f:
+                        write_atomic(path + LOCK_SUFFIX, f.read())
+                except OSError:
+                    pass
+                logger.debug("Using local copy %s of %s", local_path, url)
+                return path
+            logger.debug("Local copy %s of %s does not match its pin", local_path, url)
+        return None
+
+    def _url_lock(self, url):
+        # One download per URL at a time; other URLs are fetched concurrently
+        with self._locks_guard:
+            return self._locks.setdefault(url, threading.Lock())
+
+    def _verified(self, url, digest, expected):
+        if expected and digest != expected:
+            raise IntegrityError(f"{url} has sha256 {digest}, but its metadata pins {expected}")
+        return self.object_path(digest)
+
+    def _download(self, url, ref):
+        headers = {}
+        if ref is not None:
+            if ref.get("etag"):
+                headers["If-None-Match"] = ref["etag"]
+            if ref.get("last_modified"):
+                headers["If-Modified-Since"] = ref["last_modified"]
+
+        try:
+            with urlopen(Request(url, headers=headers), timeout=self.timeout) as response:
+                data = response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except HTTPError as e:
+            if e.code != 304 or ref is None:
+                raise
+            ref = dict(ref, checked=time.time())
+            self.save_ref(ref)
+            logger.debug("%s not modified", url)
+            return ref
+
+        digest = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(self.object_path(digest)):
+            write_atomic(self.object_path(digest), data)
+        ref = {
+            "url": url,
+            "sha256": digest,
+            "etag": etag,
+            "last_modified": last_modified,
+            "checked": time.time(),
+        }
+        self.save_ref(ref)
+        logger.debug("Downloaded %s (%d bytes)", url, len(data))
+        return ref
+
+def command_argv(command, arguments, values):
+    """Build the command line for a Typer command from tool call values.
+
+    ``arguments`` are the argument records extracted by generate_index.py:
+    CLI arguments are passed positionally, options as ``--name value`` (or
+    ``--flag``/``--no-flag`` for booleans). Options left at None are omitted.
+    """
+    argv = [command] if command else []
+    for argument in arguments:
+        value = values.get(argument["name"])
+        if value is None:
+            continue
+        values_list = value if isinstance(value, (list, tuple)) else [value]
+        if argument.get("kind") == "argument":
+            argv.extend(str(v) for v in values_list)
+            continue
+        option = "--" + argument["name"].replace("_", "-")
+        if isinstance(value, bool):
+            argv.append(option if value else "--no-" + option[2:])
+            continue
+        for v in values_list:
+            argv.extend([option, str(v)])
+    return argv
+
+class JobError(RuntimeError):
+    """A job request that cannot be served: unknown job ID or a full queue."""
+
+class OutputBuffer:
+    """One output stream of a job.
+
+    Bytes are kept in memory up to ``memory_limit`` and spill to a temporary
+    file beyond it; bytes past ``disk_limit`` are counted but dropped.
+    """
+
+    def __init__(self, memory_limit, disk_limit):
+        self.disk_limit = disk_limit
+        self.size = 0  # Bytes stored
+        self.dropped = 0  # Bytes discarded beyond disk_limit
+        self._file = tempfile.SpooledTemporaryFile(max_size=memory_limit)
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        with self._lock:
+            kept = max(0, min(len(data), self.disk_limit - self.size))
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(data[:kept])
+            self.size += kept
+            self.dropped += len(data) - kept
+
+    def read(self, offset=0, limit=None):
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(-1 if limit is None else limit)
+
+    def tail(self, limit):
+        """The last ``limit`` bytes as text, with a marker if anything precedes them."""
+        start = max(0, self.size - limit)
+        text = self.read(start).decode("utf-8", errors="replace")
+        if start or self.dropped:
+            text = f"[... {start + self.dropped} bytes not shown; use job_output to read them]\n" + text
+        return text
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+@dataclass
+class Job:
+    """One tool call running (or waiting to run) as a subprocess."""
+    id: str
+    tool: str
+    argv: list
+    stdout: OutputBuffer
+    stderr: OutputBuffer
+    status: str = "queued"  # queued, running, succeeded, failed or cancelled
+    submitted: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    returncode: int = None
+    error: str = ""
+    cached: bool = False  # Result replayed from the ResultCache instead of run
+    prepare: object = field(default=None, repr=False)
+    on_finish: object = field(default=None, repr=False)
+    future: object = field(default=None, repr=False)
+    process: object = field(default=None, repr=False)
+    loop: object = field(default=None, repr=False)  # Event loop that owns ``process``
+    listeners: list = field(default_factory=list, repr=False)
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def summary(self):
+        return {
+            "job_id": self.id,
+            "tool": self.tool,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "returncode": self.returncode,
+            "error": self.error,
+            "cached": self.cached,
+        }
+
+class JobManager:
+    """Runs tool subprocesses on a bounded pool and keeps their results for a while.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queued`` more
+    wait for a worker; submissions beyond that raise JobError. Each worker
+    runs its subprocess with asyncio and reads stdout and stderr in chunks as
+    they arrive, passing them to listeners (see result()) and to an
+    OutputBuffer that keeps ``memory_limit`` bytes in memory and spills up to
+    ``disk_limit`` bytes to disk. Results show the last ``output_limit`` bytes
+    of each stream; job_output() pages through the rest. Finished jobs are
+    forgotten after ``result_ttl`` seconds, or earlier once more than
+    ``max_finished`` of them are kept. Each limit defaults to an ATRIUM_*
+    environment variable (see the defaults below).
+    """
+
+    def __init__(
+        self,
+        max_workers=None,
+        max_queued=None,
+        result_ttl=None,
+        output_limit=None,
+        max_finished=None,
+        memory_limit=None,
+        disk_limit=None,
+    ):
+        self.max_workers = max_workers or env_int("ATRIUM_MAX_JOBS", min(4, os.cpu_count() or 1))
+        self.max_queued = max_queued if max_queued is not None else env_int("ATRIUM_MAX_QUEUED", 64)
+        self.result_ttl = result_ttl or env_int("ATRIUM_JOB_TTL", 3600)
+        self.output_limit = output_limit or env_int("ATRIUM_JOB_OUTPUT_LIMIT", 64 * 1024)
+        self.max_finished = max_finished or env_int("ATRIUM_MAX_FINISHED_JOBS", 256)
+        self.memory_limit = memory_limit or env_int("ATRIUM_JOB_MEMORY_LIMIT", 256 * 1024)
+        self.disk_limit = disk_limit or env_int("ATRIUM_JOB_DISK_LIMIT", 64 * 1024 * 1024)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="atrium-job")
+        self._jobs = {}  # Insertion ordered, so the oldest jobs come first
+        self._lock = threading.Lock()
+
+    def submit(self, argv, tool="", prepare=None, on_finish=None):
+        """Queue ``argv`` for execution and return the new job's summary.
+
+        ``prepare`` is called on the worker thread before the subprocess
+        starts, for set-up that should not block the tool call itself.
+        ``on_finish(job)`` is called on the worker thread once the job ended.
+        """
+        with self._lock:
+            self._evict()
+            pending = sum(1 for job in self._jobs.values() if job.finished is None)
+            if pending >= self.max_workers + self.max_queued:
+                raise JobError(f"{pending} jobs are already queued or running; try again later")
+            job = Job(
+                id=uuid.uuid4().hex,
+                tool=tool,
+                argv=list(argv),
+                stdout=OutputBuffer(self.memory_limit, self.disk_limit),
+                stderr=OutputBuffer(self.memory_limit, self.disk_limit),
+                prepare=prepare,
+                on_finish=on_finish,
+            )
+            self._jobs[job.id] = job
+            job.future = self._pool.submit(self._run, job)
+            return job.summary()
+
+    def record(self, argv, tool, returncode, stdout, stderr):
+        """Add an already finished job (a cached result) and return its summary."""
+        with self._lock:
+            self._evict()
+            now = time.time()
+            job = Job(
+                id=uuid.uuid4().hex,
+                tool=tool,
+                argv=list(argv),
+                stdout=OutputBuffer(self.memory_limit, self.disk_limit),
+                stderr=OutputBuffer(self.memory_limit, self.disk_limit),
+                started=now,
+                returncode=returncode,
+                cached=True,
+            )
+            job.stdout.write(stdout)
+            job.stderr.write(stderr)
+            self._finish(job, "succeeded" if returncode == 0 else "failed")
+            self._jobs[job.id] = job
+            return job.summary()
+
+    def status(self, job_id):
+        with self._lock:
+            self._evict()
+            return self._get(job_id).summary()
+
+    def result(self, job_id, wait=0, on_output=None):
+        """Summary plus output of a job, waiting up to ``wait`` seconds for it to finish.
+
+        While waiting, ``on_output(stream, text)`` is called from the job's
+        worker thread with each chunk of output as it arrives.
+        """
+        with self._lock:
+            job = self._get(job_id)
+            if on_output is not None and wait > 0 and job.finished is None:
+                job.listeners.append(on_output)
+        try:
+            if wait > 0:
+                job.done.wait(wait)
+        finally:
+            with self._lock:
+                if on_output in job.listeners:
+                    job.listeners.remove(on_output)
+        with self._lock:
+            return dict(
+                job.summary(),
+                stdout=job.stdout.tail(self.output_limit),
+                stderr=job.stderr.tail(self.output_limit),
+                stdout_bytes=job.stdout.size + job.stdout.dropped,
+                stderr_bytes=job.stderr.size + job.stderr.dropped,
+            )
+
+    def output(self, job_id, stream="stdout", offset=0, limit=None):
+        """Read a stored slice of a job's stdout or stderr, for output beyond result()'s tail."""
+        if stream not in ("stdout", "stderr"):
+            raise JobError(f"Unknown stream {stream!r}; expected 'stdout' or 'stderr'")
+        limit = max(4, min(limit or self.output_limit, self.output_limit))  # At least one UTF-8 character
+        with self._lock:
+            job = self._get(job_id)
+            buffer = getattr(job, stream)
+            finished = job.finished is not None
+        data = buffer.read(offset, limit)
+        # Stop before a character split by the page boundary; the next page starts with it
+        text = codecs.getincrementaldecoder("utf-8")(errors="replace").decode(data)
+        next_offset = offset + (len(text.encode("utf-8")) if "\ufffd" not in text else len(data))
+        return {
+            "job_id": job_id,
+            "stream": stream,
+            "offset": offset,
+            "next_offset": next_offset,
+            "size": buffer.size,
+            "dropped": buffer.dropped,
+            "complete": finished and next_offset >= buffer.size,
+            "data": text,
+        }
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or terminate a running one."""
+        with self._lock:
+            job = self._get(job_id)
+            if job.status == "queued":
+                job.future.cancel()
+                self._finish(job, "cancelled")
+            elif job.status == "running":
+                job.status = "cancelled"  # _run records the end once the process exits
+                if job.process is None:  # Still preparing
+                    return job.summary()
+                self._signal(job, "terminate")
+                timer = threading.Timer(CANCEL_GRACE, self._signal, args=(job, "kill"))
+                timer.daemon = True
+                timer.start()
+            return job.summary()
+
+    def shutdown(self):
+        """Cancel queued jobs and terminate running ones."""
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.finished is None]
+        for job in running:
+            self.cancel(job.id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get(self, job_id):
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise JobError(f"Unknown job {job_id!r}; finished jobs expire after {self.result_ttl}s") from None
+
+    def _run(self, job):
+        with self._lock:
+            if job.status != "queued":
+                return
+            job.status = "running"
+            job.started = time.time()
+        if job.prepare is not None:
+            try:
+                job.prepare()
+            except Exception as e:
+                with self._lock:
+                    job.error = f"{type(e).__name__}: {e}"
+                    self._finish(job, "failed")
+                return
+
+        try:
+            returncode = asyncio.run(self._communicate(job))
+        except OSError as e:
+            returncode = None
+            job.error = str(e)
+        with self._lock:
+            job.returncode = returncode
+            job.process = None
+            if job.status != "cancelled":
+                job.status = "succeeded" if returncode == 0 else "failed"
+        # Before the job is marked done, so callers that waited for it see the callback's effect
+        if job.on_finish is not None:
+            try:
+                job.on_finish(job)
+            except Exception:
+                logger.exception("Completion callback for job %s failed", job.id)
+        with self._lock:
+            self._finish(job, job.status)
+        logger.info("Job %s (%s) %s", job.id, job.tool, job.status)
+
+    async def _communicate(self, job):
+        with self._lock:
+            if job.status != "running":  # Cancelled while preparing
+                return None
+        process = await asyncio.create_subprocess_exec(
+            *job.argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        with self._lock:
+            job.loop = asyncio.get_running_loop()
+            job.process = process
+            if job.status == "cancelled":  # Cancelled while starting
+                process.terminate()
+        await asyncio.gather(
+            self._pump(job, "stdout", process.stdout),
+            self._pump(job, "stderr", process.stderr),
+        )
+        return await process.wait()
+
+    async def _pump(self, job, stream, reader):
+        buffer = getattr(job, stream)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = await reader.read(OUTPUT_CHUNK)
+            if not chunk:
+                break
+            buffer.write(chunk)
+            text = decoder.decode(chunk)
+            with self._lock:
+                listeners = list(job.listeners)
+            for listener in listeners:
+                try:
+                    listener(stream, text)
+                except Exception:
+                    logger.exception("Output listener for job %s failed", job.id)
+
+    def _signal(self, job, method):
+        # The process belongs to the worker's event loop; signal it from there
+        def send():
+            if job.process is not None and job.process.returncode is None:
+                try:
+                    getattr(job.process, method)()
+                except ProcessLookupError:
+                    pass
+
+        loop = job.loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(send)
+            except RuntimeError:  # The loop closed in the meantime
+                pass
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        job.done.set()
+
+    def _evict(self):
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished is not None]
+        expired = [job for job in finished if now - job.finished > self.result_ttl]
+        expired += finished[: max(0, len(finished) - len(expired) - self.max_finished)]
+        for job in expired:
+            self._jobs.pop(job.id, None)
+            job.stdout.close()
+            job.stderr.close()
+
+class ResultCache:
+    """Memoized results of tool calls on scripts marked ``cacheable = true``.
+
+    Entries are keyed by the tool, the script's content hash and the
+    normalized arguments, so editing a script invalidates its results. They
+    live in an in-memory LRU of ``max_entries`` and as JSON files under
+    ``<root>/results``. Both expire after ``ttl`` seconds; on disk, the least
+    recently used files go once they exceed ``max_bytes`` in total. Results
+    larger than ``entry_limit`` bytes are not stored. Limits default to
+    ATRIUM_RESULT_* environment variables (see below).
+    """
+
+    def __init__(self, root=None, ttl=None, max_entries=None, max_bytes=None, entry_limit=None):
+        self.root = os.path.join(root or default_cache_dir(), "results")
+        self.ttl = ttl or env_int("ATRIUM_RESULT_TTL", 24 * 3600)
+        self.max_entries = max_entries or env_int("ATRIUM_RESULT_CACHE_ENTRIES", 256)
+        self.max_bytes = max_bytes or env_int("ATRIUM_RESULT_CACHE_BYTES", 256 * 1024 * 1024)
+        self.entry_limit = entry_limit or env_int("ATRIUM_RESULT_ENTRY_LIMIT", 1024 * 1024)
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(tool, script_sha256, arguments):
+        """Cache key for a call; ``arguments`` should already include defaults."""
+        normalized = json.dumps(
+            {"tool": tool, "script": script_sha256, "arguments": arguments},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def get(self, key):
+        """The stored result for ``key``, or None; updates the hit/miss counters."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry["stored"] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return entry
+            self._memory.pop(key, None)
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        with self._lock:
+            if entry is None or now - entry.get("stored", 0) >= self.ttl:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            self._remember(key, entry)
+        try:
+            os.utime(path)  # Recently used files are evicted last
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, returncode, stdout, stderr):
+        """Store a result (output as bytes); returns False if it is too large to keep."""
+        if len(stdout) + len(stderr) > self.entry_limit:
+            return False
+        entry = {
+            "returncode": returncode,
+            "stdout": stdout.decode("utf-8", errors="replace"),
+            "stderr": stderr.decode("utf-8", errors="replace"),
+            "stored": time.time(),
+        }
+        write_atomic(self._path(key), json.dumps(entry).encode("utf-8"))
+        with self._lock:
+            self.stats["stores"] += 1
+            self._remember(key, entry)
+        self._evict_disk()
+        return True
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, memory_entries=len(self._memory))
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        files = []
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        now = time.time()
+        for mtime, size, path in sorted(files):
+            if total <= self.max_bytes and now - mtime < self.ttl:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.stats["evictions"] += 1
+
+class EnvironmentPool:
+    """Resolves and installs script environments ahead of the first tool call.
+
+    uv keys a script's environment by the path of the script, not only by its
+    requirements, so each script is warmed with ``uv sync --script`` on the
+    very file a tool call runs: its copy in the ScriptCache store, next to
+    which the store also keeps the script's lockfile, if any. Warm-ups run on
+    their own pool of ``max_workers`` threads (ATRIUM_WARM_JOBS, default 2).
+
+    A script is re-warmed when its content or lock changes (unless ``rewarm``
+    is False, or ATRIUM_REWARM=0). status() reports each script as cold,
+    warming, warm or failed.
+    """
+
+    def __init__(self, scripts, max_workers=None, rewarm=None, timeout=WARM_TIMEOUT):
+        self.scripts = scripts
+        self.max_workers = max_workers or env_int("ATRIUM_WARM_JOBS", 2)
+        self.rewarm = bool(env_int("ATRIUM_REWARM", 1)) if rewarm is None else rewarm
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="atrium-warm")
+        self._states = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def warm_all(self, sources):
+        """Start warming ``(url, sha256)`` pairs in the background."""
+        for url, sha256 in sources:
+            self._state(url)
+            self._pool.submit(self.warm, url, sha256)
+
+    def ensure(self, url, sha256=None):
+        """Block until the environment for ``url`` is ready; returns its state."""
+        state = self._state(url)
+        if state["status"] == "warm" and not self.rewarm:
+            return dict(state)
+        return self.warm(url, sha256)
+
+    def warm(self, url, sha256=None):
+        """Prepare the environment for ``url`` unless it is already warm and unchanged."""
+        state = self._state(url)
+        with self._url_lock(url):
+            try:
+                path = self.scripts.fetch(url, sha256=sha256)
+                with open(path, "r", encoding="utf-8") as f:
+                    has_metadata = METADATA_BLOCK_RE.search(f.read()) is not None
+                try:
+                    with open(path + LOCK_SUFFIX, "r", encoding="utf-8") as f:
+                        lock = f.read()
+                except OSError:
+                    lock = ""
+                # Store paths are content hashes, so this changes with the script or its lock
+                environment = hashlib.sha256(f"{path}:{lock}".encode()).hexdigest()
+                if state["status"] == "warm" and state["environment"] == environment:
+                    return dict(state)
+
+                state.update(status="warming", error="")
+                started = time.monotonic()
+                if has_metadata:  # Scripts without metadata need no environment
+                    result = subprocess.run(
+                        ["uv", "sync", "--quiet", "--script", path],
+                        capture_output=True,
+                        text=True,
+                        timeout=self.timeout,
+                    )
+                    if result.returncode != 0:
+                        raise RuntimeError(result.stderr.strip() or f"uv exited with {result.returncode}")
+                state.update(
+                    status="warm",
+                    environment=environment,
+                    seconds=round(time.monotonic() - started, 3),
+                    warmed=time.time(),
+                )
+                logger.info("Warmed environment for %s in %.1fs", url, state["seconds"])
+            except (ScriptCacheError, OSError, RuntimeError, subprocess.SubprocessError) as e:
+                state.update(status="failed", error=str(e))
+                logger.warning("Could not warm environment for %s: %s", url, e)
+            return dict(state)
+
+    def status(self):
+        """Current state of every known script, by URL."""
+        with self._lock:
+            return {url: dict(state) for url, state in self._states.items()}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _state(self, url):
+        with self._lock:
+            return self._states.setdefault(
+                url, {"status": "cold", "environment": None, "seconds": None, "warmed": None, "error": ""}
+            )
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._locks.setdefault(url, threading.Lock())
+
+BUILTIN_TOOLS = [
+    {
+        "name": "job_status",
+        "description": "State of a job started by one of the script tools.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"job_id": {"type": "string"}},
+            "required": ["job_id"],
+        },
+    },
+    {
+        "name": "job_result",
+        "description": (
+            "State and output of a job, waiting up to `wait` seconds for it to finish. "
+            "While waiting, output is streamed as progress notifications."
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {"job_id": {"type": "string"}, "wait": {"type": "number", "default": 0}},
+            "required": ["job_id"],
+        },
+    },
+    {
+        "name": "job_output",
+        "description": "Read a job's stdout or stderr from `offset`, in pages; follow `next_offset` until `complete`.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string"},
+                "stream": {"type": "string", "enum": ["stdout", "stderr"], "default": "stdout"},
+                "offset": {"type": "integer", "default": 0},
+                "limit": {"type": "integer"},
+            },
+            "required": ["job_id"],
+        },
+    },
+    {
+        "name": "cancel_job",
+        "description": "Cancel a queued job or terminate a running one.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"job_id": {"type": "string"}},
+            "required": ["job_id"],
+        },
+    },
+    {
+        "name": "result_cache_status",
+        "description": "Hit, miss, store and eviction counters of the result cache for cacheable scripts.",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+    {
+        "name": "environment_status",
+        "description": "Warm-up state (cold, warming, warm or failed) of each script environment, by script URL.",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+]
+
+def runs_from_store(script):
+    """True if tool calls run a manifest script from the ScriptCache store rather than its URL."""
+    return bool(script.get("external") or script.get("sha256"))
+
+class ToolServer:
+    """Protocol-independent core of the MCP server, driven by the tool manifest.
+
+    The manifest written by generate_index.py lists ``scripts`` (URL, optional
+    sha256 pin, whether it is external, and for local scripts their path
+    relative to the site and to ``source_root``) and ``tools`` (name,
+    description, input schema, index of the script, Typer command and argument
+    kinds). It is read on first use, and a tool is only looked up when it is
+    listed or called, so startup does not grow with the catalog. tools/list is
+    served in pages of ``page_size`` tools (ATRIUM_TOOLS_PAGE_SIZE, default
+    500).
+
+    Pinned scripts run from the content-addressed store; local ones are added
+    to it from the copy published next to the manifest or from the source
+    checkout once their hash matches, so calls need no network round-trip.
+    """
+
+    def __init__(self, manifest_path, scripts=None, jobs=None, environments=None, results=None, page_size=None):
+        self.manifest_path = manifest_path
+        self.scripts = scripts or ScriptCache()
+        self.jobs = jobs or JobManager()
+        self.environments = environments or EnvironmentPool(self.scripts)
+        self.results = results or ResultCache(self.scripts.root)
+        self.page_size = page_size or env_int("ATRIUM_TOOLS_PAGE_SIZE", 500)
+        self._manifest = None
+        self._tool_index = None
+        self._lock = threading.Lock()
+        # Built-in tools; only job_result streams output
+        self._builtins = {
+            "job_status": lambda job_id, on_output=None: self.jobs.status(job_id),
+            "job_result": lambda job_id, wait=0, on_output=None: self.jobs.result(
+                job_id, wait=wait, on_output=on_output
+            ),
+            "job_output": lambda job_id, stream="stdout", offset=0, limit=None, on_output=None: self.jobs.output(
+                job_id, stream=stream, offset=offset, limit=limit
+            ),
+            "cancel_job": lambda job_id, on_output=None: self.jobs.cancel(job_id),
+            "environment_status": lambda on_output=None: self.environments.status(),
+            "result_cache_status": lambda on_output=None: self.results.status(),
+        }
+
+    @property
+    def manifest(self):
+        with self._lock:
+            if self._manifest is None:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+                self._tool_index = {tool["name"]: i for i, tool in enumerate(self._manifest["tools"])}
+                self._register_local_copies(self._manifest)
+            return self._manifest
+
+    def _register_local_copies(self, manifest):
+        # Local scripts are published next to the manifest, and usually also
+        # present in the source checkout the site was built from
+        site_root = os.path.dirname(os.path.abspath(self.manifest_path))
+        source_root = os.path.normpath(os.path.join(site_root, manifest.get("source_root", "../..")))
+        for script in manifest["scripts"]:
+            if script.get("path"):
+                self.scripts.register_local(script["url"], [
+                    os.path.join(site_root, script["path"]),
+                    os.path.join(source_root, script["path"]),
+                ])
+
+    @property
+    def name(self):
+        return self.manifest.get("name", "atrium")
+
+    def script_sources(self):
+        """``(url, sha256)`` of every script that runs from the store, for warming.
+
+        Unpinned local scripts run from their URL, whose environment cannot
+        be prepared ahead of time (see tool_command()).
+        """
+        return [
+            (script["url"], script.get("sha256"))
+            for script in self.manifest["scripts"]
+            if runs_from_store(script)
+        ]
+
+    def list_tools(self, cursor=None):
+        """One page of tool definitions and the cursor of the next page (None on the last).
+
+        Cursors are opaque to clients; here they are offsets into the built-in
+        tools followed by the manifest's tools. Raises ValueError for a cursor
+        that is not such an offset.
+        """
+        tools = self.manifest["tools"]
+        total = len(BUILTIN_TOOLS) + len(tools)
+        if cursor is None:
+            start = 0
+        elif isinstance(cursor, str) and cursor.isascii() and cursor.isdigit() and int(cursor) <= total:
+            start = int(cursor)
+        else:
+            raise ValueError(f"Invalid cursor {cursor!r}")
+        end = min(start + self.page_size, total)
+        page = BUILTIN_TOOLS[start:end] + [
+            {"name": t["name"], "description": t["description"], "inputSchema": t["inputSchema"]}
+            for t in tools[max(0, start - len(BUILTIN_TOOLS)) : max(0, end - len(BUILTIN_TOOLS))]
+        ]
+        return page, (str(end) if end < total else None)
+
+    def tool(self, name):
+        """Manifest entry of a script tool; raises KeyError for unknown names."""
+        manifest = self.manifest  # Also builds the name index
+        return manifest["tools"][self._tool_index[name]]
+
+    def input_schema(self, name):
+        if name in self._builtins:
+            return next(t["inputSchema"] for t in BUILTIN_TOOLS if t["name"] == name)
+        try:
+            return self.tool(name)["inputSchema"]
+        except KeyError:
+            return None
+
+    def tool_command(self, name, arguments):
+        """Resolve a script tool call to ``(argv, script, content_sha256)`` without running it.
+
+        ``content_sha256`` is the hash of the script that will run, when known.
+        """
+        try:
+            tool = self.tool(name)
+        except KeyError:
+            raise ValueError(f"Unknown tool {name!r}") from None
+        schema = tool["inputSchema"]
+        unknown = set(arguments) - set(schema.get("properties", {}))
+        if unknown:
+            raise ValueError(f"Unknown arguments for {name}: {', '.join(sorted(unknown))}")
+        missing = [arg for arg in schema.get("required", []) if arguments.get(arg) is None]
+        if missing:
+            raise ValueError(f"Missing required arguments for {name}: {', '.join(missing)}")
+
+        script = self.manifest["scripts"][tool["script"]]
+        path = script["url"]
+        content_sha256 = script.get("sha256")
+        # Pinned local scripts run from a verified local copy; the network is the fallback
+        if runs_from_store(script):
+            path = self.scripts.fetch(script["url"], sha256=script.get("sha256"))
+            content_sha256 = os.path.splitext(os.path.basename(path))[0]  # objects/<sha256>.py
+        argv = ["uv", "run", path] + command_argv(tool.get("command"), tool["arguments"], arguments)
+        return argv, script, content_sha256
+
+    def call_tool(self, name, arguments=None, on_output=None):
+        """Run a built-in tool, or submit a script tool as a job; returns a JSON-serializable dict.
+
+        ``on_output(stream, text)`` receives job output streamed while the call runs.
+        """
+        arguments = arguments or {}
+        if name in self._builtins:
+            return self._builtins[name](on_output=on_output, **arguments)
+        argv, script, content_sha256 = self.tool_command(name, arguments)
+
+        on_finish = None
+        if script.get("cacheable") and content_sha256:
+            # Defaults are part of the key, so omitting an argument and passing its default match
+            properties = self.tool(name)["inputSchema"].get("properties", {})
+            normalized = {
+                arg: arguments.get(arg, schema.get("default")) for arg, schema in properties.items()
+            }
+            key = self.results.key(name, content_sha256, normalized)
+            cached = self.results.get(key)
+            if cached is not None:
+                return self.jobs.record(
+                    argv,
+                    name,
+                    cached["returncode"],
+                    cached["stdout"].encode("utf-8"),
+                    cached["stderr"].encode("utf-8"),
+                )
+
+            def on_finish(job):
+                if job.status != "succeeded" or job.stdout.dropped or job.stderr.dropped:
+                    return
+                # Output too large to cache is not read back from its buffers at all
+                if job.stdout.size + job.stderr.size <= self.results.entry_limit:
+                    self.results.put(key, job.returncode, job.stdout.read(), job.stderr.read())
+
+        return self.jobs.submit(
+            argv,
+            tool=name,
+            prepare=(
+                (lambda: self.environments.ensure(script["url"], script.get("sha256")))
+                if runs_from_store(script) else None
+            ),
+            on_finish=on_finish,
+        )
+
+    def warm(self):
+        """Start warming every script environment, unless ATRIUM_WARM=0."""
+        if os.environ.get("ATRIUM_WARM", "1") != "0":
+            self.environments.warm_all(self.script_sources())
+
+    def shutdown(self):
+        self.jobs.shutdown()
+        self.environments.shutdown()
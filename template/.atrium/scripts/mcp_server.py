@@ -0,0 +1,78 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = ["mcp>=2.3"]
+# ///
+"""MCP server for this atrium, published by generate_index.py.
+
+Tools are read from mcp-tools.json next to this file, so the server itself
+never changes with the catalog. Run it with ``uv run mcp_server.py`` (stdio).
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+
+import mcp_types as types
+from mcp.server.lowlevel import Server
+from mcp.server.stdio import stdio_server
+from mcp.shared.exceptions import MCPError
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mcp_runtime import TOOL_MANIFEST, ToolServer
+
+TOOLS = ToolServer(os.path.join(os.path.dirname(os.path.abspath(__file__)), TOOL_MANIFEST))
+
+async def list_tools(ctx, params):
+    try:
+        tools, next_cursor = TOOLS.list_tools(params.cursor if params else None)
+    except ValueError as e:
+        raise MCPError(code=types.INVALID_PARAMS, message=str(e)) from None
+    return types.ListToolsResult(
+        tools=[
+            types.Tool(name=t["name"], description=t["description"], input_schema=t["inputSchema"])
+            for t in tools
+        ],
+        next_cursor=next_cursor,
+    )
+
+async def call_tool(ctx, params):
+    loop = asyncio.get_running_loop()
+    notifications = itertools.count(1)
+
+    def on_output(stream, text):
+        # Called from a job's worker thread; progress must increase, so it counts chunks
+        message = text if stream == "stdout" else f"[stderr] {text}"
+        asyncio.run_coroutine_threadsafe(
+            ctx.session.report_progress(next(notifications), message=message), loop
+        )
+
+    try:
+        # Tool calls may block (job_result waits), so they run off the event loop
+        result = await asyncio.to_thread(TOOLS.call_tool, params.name, params.arguments, on_output)
+    except Exception as e:
+        return types.CallToolResult(
+            content=[types.TextContent(type="text", text=f"{type(e).__name__}: {e}")], is_error=True
+        )
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=json.dumps(result))], structured_content=result
+    )
+
+async def main():
+    server = Server(
+        TOOLS.name,
+        on_list_tools=list_tools,
+        on_call_tool=call_tool,
+        get_tool_input_schema=TOOLS.input_schema,
+    )
+    TOOLS.warm()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+    finally:
+        TOOLS.shutdown()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")  # stderr; stdout is the protocol
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+"""Local preview server for the generated site, with file watching and live reload.
+
+Used by ``generate_index.py serve``. Only the standard library is required;
+when watchfiles is installed, changes are picked up through inotify (or the
+platform's equivalent) instead of polling.
+"""
+import http.server
+import logging
+import os
+import threading
+import time
+
+try:
+    import watchfiles
+except ImportError:  # Optional: without watchfiles, the tree is polled for changes
+    watchfiles = None
+
+logger = logging.getLogger("atrium")
+
+RELOAD_PATH = "/__atrium__/reload"  # Server-sent events; never a file of the site
+RELOAD_SCRIPT = (
+    '<script>new EventSource("' + RELOAD_PATH + '")'
+    '.addEventListener("reload", () => location.reload());</script>'
+).encode()
+KEEPALIVE_INTERVAL = 15  # Seconds between comments sent to idle reload streams
+POLL_INTERVAL = 0.2  # Seconds between scans of the tree without watchfiles
+DEBOUNCE = 50  # Milliseconds of quiet before a batch of changes is reported
+
+class ReloadHub:
+    """Counts completed builds and wakes the reload streams waiting for the next one."""
+
+    def __init__(self):
+        self.generation = 0
+        self._condition = threading.Condition()
+
+    def notify(self):
+        with self._condition:
+            self.generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Block until the generation differs from ``generation`` or ``timeout`` passes; returns it."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+class PreviewHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the site without caching, injecting the live reload client into HTML pages."""
+
+    hub = None  # Set on the subclass created by start_server()
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.send_reload_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            self.send_html(path)
+            return
+        super().do_GET()
+
+    def end_headers(self):
+        # Every rebuild changes pages in place, so nothing may be served from the browser cache
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def send_html(self, path):
+        with open(path, "rb") as f:
+            body = f.read()
+        end = body.rfind(b"</body>")
+        body = body[:end] + RELOAD_SCRIPT + body[end:] if end != -1 else body + RELOAD_SCRIPT
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_reload_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        generation = self.hub.generation
+        try:
+            while True:
+                latest = self.hub.wait(generation, KEEPALIVE_INTERVAL)
+                if latest == generation:
+                    self.wfile.write(b": keep-alive\n\n")  # Also notices closed tabs
+                else:
+                    self.wfile.write(f"event: reload\ndata: {latest}\n\n".encode())
+                    generation = latest
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+def start_server(static_dir, host="127.0.0.1", port=8000):
+    """Serve ``static_dir`` on a background thread; returns ``(server, hub)``."""
+    hub = ReloadHub()
+    handler = type("Handler", (PreviewHandler,), {"hub": hub})
+    server = http.server.ThreadingHTTPServer(
+        (host, port), lambda *args: handler(*args, directory=static_dir)
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="atrium-preview", daemon=True).start()
+    return server, hub
+
+def snapshot(root, ignore):
+    """``{path: (mtime_ns, size)}`` for every file under ``root`` not excluded by ``ignore``."""
+    files = {}
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names[:] = [name for name in dir_names if not ignore(os.path.join(dir_path, name))]
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            if ignore(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+def watch(root, on_change, ignore=lambda path: False, stop=None):
+    """Call ``on_change(paths)`` with each batch of files changed under ``root``.
+
+    Runs until ``stop`` (a threading.Event) is set. Paths for which
+    ``ignore(path)`` is true, and everything below them, are not reported.
+    """
+    stop = stop or threading.Event()
+    if watchfiles is not None:
+        for changes in watchfiles.watch(
+            root,
+            watch_filter=lambda change, path: not ignore(path),
+            debounce=DEBOUNCE,
+            stop_event=stop,
+        ):
+            on_change(sorted({path for _, path in changes}))
+        return
+
+    previous = snapshot(root, ignore)
+    while not stop.wait(POLL_INTERVAL):
+        current = snapshot(root, ignore)
+        changed = changed_paths(previous, current)
+        previous = current
+        if changed:
+            time.sleep(DEBOUNCE / 1000)  # Let editors finish writing (save to temp, rename)
+            previous = snapshot(root, ignore)
+            on_change(sorted(changed | changed_paths(current, previous)))
+
+def changed_paths(before, after):
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}